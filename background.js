@@ -1,6 +1,52 @@
 // Stocker les politiques par onglet
 let policiesByTab = {};
 
+// Dernier résumé reçu par liste d'URLs, avec son ETag: le serveur répond 304
+// (sans refaire le résumé) tant que ses résultats n'ont pas changé.
+// Les listes les moins récemment analysées sont oubliées au-delà de SUMMARIES_MAX
+const SUMMARIES_MAX = 30;
+let summariesByUrls = new Map();
+
+// Serveur surchargé (429/503): pas de nouvelle requête avant cette date (ms)
+let retryAfterUntil = 0;
+
+function rememberSummary(urlsKey, entry) {
+  summariesByUrls.delete(urlsKey);
+  summariesByUrls.set(urlsKey, entry);
+  while (summariesByUrls.size > SUMMARIES_MAX) {
+    summariesByUrls.delete(summariesByUrls.keys().next().value);
+  }
+}
+
+// Retry-After en secondes ou en date HTTP; 30 s si absent ou illisible
+function retryAfterMs(value) {
+  const seconds = Number(value);
+  if (value && Number.isFinite(seconds)) {
+    return Math.max(0, seconds) * 1000;
+  }
+  const date = Date.parse(value || "");
+  return Number.isNaN(date) ? 30000 : Math.max(0, date - Date.now());
+}
+
+// Dernier résumé connu pour ces URLs, ou message d'attente, tant que le serveur est surchargé
+function saveBusySummary(urls, previous) {
+  const wait = Math.ceil((retryAfterUntil - Date.now()) / 1000);
+  console.warn(`⏳ Serveur surchargé, nouvelle analyse possible dans ${wait} s`);
+  if (previous) {
+    chrome.storage.local.set({
+      policySummary: previous.summary,
+      lastUpdate: previous.updatedAt,
+      policyUrls: urls
+    });
+    return;
+  }
+  chrome.storage.local.set({
+    policySummary: `⏳ Serveur d'analyse surchargé\n\nNouvelle analyse possible dans ${wait} s.`,
+    lastUpdate: new Date().toISOString(),
+    policyUrls: urls
+  });
+}
+
 chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
   if (message.type === "foundPolicies") {
     const tabId = sender.tab?.id;
@@ -13,19 +59,51 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
 
     // Envoyer au backend Python
     console.log("🌐 Envoi au serveur Flask...");
+    const urlsKey = JSON.stringify(message.urls);
+    const previous = summariesByUrls.get(urlsKey);
+    if (previous) {
+      rememberSummary(urlsKey, previous);
+    }
+    if (Date.now() < retryAfterUntil) {
+      saveBusySummary(message.urls, previous);
+      return;
+    }
+    const headers = { "Content-Type": "application/json" };
+    if (previous) {
+      headers["If-None-Match"] = previous.etag;
+    }
     fetch("http://127.0.0.1:5000/analyze", {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers,
       body: JSON.stringify({ urls: message.urls })
     })
     .then(res => {
       console.log("📥 Réponse serveur reçue:", res.status);
+      if (res.status === 304 && previous) {
+        return { summary: previous.summary };
+      }
+      if (res.status === 429 || res.status === 503) {
+        retryAfterUntil = Date.now() + retryAfterMs(res.headers.get("Retry-After"));
+        saveBusySummary(message.urls, previous);
+        return null;
+      }
       if (!res.ok) {
         throw new Error(`HTTP error! status: ${res.status}`);
       }
-      return res.json();
+      return res.json().then(data => {
+        const etag = res.headers.get("ETag");
+        if (etag) {
+          rememberSummary(urlsKey, { etag, summary: data.summary, updatedAt: new Date().toISOString() });
+        } else {
+          summariesByUrls.delete(urlsKey);
+        }
+        return data;
+      });
     })
     .then(data => {
+      if (!data) {
+        return;
+      }
       console.log("✅ Résumé reçu :", data.summary);
       chrome.storage.local.set({ 
         policySummary: data.summary,
@@ -0,0 +1,228 @@
+"""Échéance des requêtes /analyze, résultats partiels et file d'admission, hors ligne
+
+Les pages sont servies en local (benchmarks/fixtures), certaines avec un délai
+avant la réponse ou au compte-gouttes; le faux client Groq respecte le délai
+qui lui est donné. Vérifie que:
+- une requête dont une page est trop lente répond à l'échéance, avec les
+  documents terminés et les manquants signalés ("partial", "missing");
+- une page servie au compte-gouttes est abandonnée à l'échéance;
+- une requête qui rejoint l'analyse d'une requête antérieure obtient le
+  résultat complet quand cette analyse est coupée par l'échéance antérieure
+  (l'analyse est relancée avec sa propre échéance);
+- un résumé IA coupé par l'échéance est signalé et le résultat partiel n'est
+  pas mis en cache: la demande suivante obtient le résultat complet;
+- un échec immédiat de Groq (401) n'est pas pris pour un dépassement
+  d'échéance: le résultat, sans résumé, est complet et mis en cache;
+- sous une rafale de pages lentes, les requêtes au-delà de la file sont
+  refusées tout de suite (503 + Retry-After) et les requêtes admises
+  répondent toutes avant leur échéance;
+- un client trop rapide reçoit 429 + Retry-After.
+
+Usage: python benchmarks/bench_admission.py [--deadline 1] [--burst 12]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from bench_stages import FakeGroqClient, install_offline_services
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIXTURE_PAGE = "privacy_policy.html"
+
+class SlowServer:
+    """Serveur HTTP local: /<délai>/<n> répond après <délai> secondes,
+    /drip/<n> envoie la page par petits morceaux espacés, /first/<n> répond
+    après `first_delay` secondes à sa première requête seulement"""
+
+    def __init__(self, first_delay):
+        with open(os.path.join(FIXTURES_DIR, FIXTURE_PAGE), encoding="utf-8") as f:
+            html = f.read()
+        requested = set()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                kind, number = self.path.strip("/").split("/")
+                body = html.replace("<main>", f"<main><p>Page {number}.</p>", 1).encode("utf-8")
+                if kind == "first":
+                    if self.path not in requested:
+                        requested.add(self.path)
+                        time.sleep(first_delay)
+                elif kind != "drip":
+                    time.sleep(float(kind))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if kind != "drip":
+                    self.wfile.write(body)
+                    return
+                for start in range(0, len(body), 256):
+                    self.wfile.write(body[start:start + 256])
+                    self.wfile.flush()
+                    time.sleep(0.1)
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                # Le client abandonne les pages trop lentes
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, name="pages", daemon=True).start()
+
+    def url(self, delay, number):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/{delay}/{number}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class TimeoutGroqClient(FakeGroqClient):
+    """Faux client Groq qui, comme le vrai, abandonne après `timeout` secondes"""
+
+    def create(self, model, messages, max_tokens, temperature, timeout):
+        if self.latency > timeout:
+            time.sleep(max(0, timeout))
+            raise TimeoutError("Délai dépassé")
+        return super().create(model, messages, max_tokens, temperature, timeout)
+
+class RejectingGroqClient(FakeGroqClient):
+    """Faux client Groq qui refuse aussitôt chaque appel (clé d'API invalide)"""
+
+    def create(self, model, messages, max_tokens, temperature, timeout):
+        error = RuntimeError("Invalid API Key")
+        error.status_code = 401
+        raise error
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"❌ {message}")
+    print(f"✅ {message}")
+
+def post(client, urls, address="127.0.0.1"):
+    """(réponse, durée en s) d'un /analyze structuré"""
+    started = time.monotonic()
+    response = client.post("/analyze", json={"urls": urls, "format": "structured"},
+                           environ_base={"REMOTE_ADDR": address})
+    return response, time.monotonic() - started
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deadline", type=float, default=1.0, help="échéance des requêtes (secondes)")
+    parser.add_argument("--burst", type=int, default=12, help="requêtes simultanées de la rafale")
+    args = parser.parse_args()
+
+    deadline = args.deadline
+    limit = deadline + main.REQUEST_DEADLINE_GRACE + 0.3
+    install_offline_services(0.0)
+    main.REQUEST_DEADLINE = deadline
+    main.admission = main.AdmissionControl(max_active=4, max_queue=4, max_wait=deadline, client_rate_per_minute=0)
+    app = main.create_app()
+    pages = SlowServer(deadline * 4)
+    try:
+        client = app.test_client()
+        main.groq_gateway.client = None
+
+        # Une page rapide, une page plus lente que l'échéance
+        response, elapsed = post(client, [pages.url(0, 1), pages.url(deadline * 4, 2)])
+        data = response.get_json()
+        documents = {document["url"]: document for document in data["documents"]}
+        check(response.status_code == 200 and elapsed < limit,
+              f"Réponse à l'échéance malgré une page lente ({elapsed:.2f} s)")
+        check(data["partial"] and data["analyzed_count"] == 1 and not documents[pages.url(0, 1)].get("missing"),
+              "Document terminé renvoyé, réponse marquée partielle")
+        check(documents[pages.url(deadline * 4, 2)]["missing"] == ["document"],
+              "Page lente signalée comme manquante")
+
+        response, elapsed = post(client, [pages.url("drip", 3)])
+        data = response.get_json()
+        check(elapsed < limit and data["documents"][0].get("missing") == ["document"],
+              f"Page au compte-gouttes abandonnée à l'échéance ({elapsed:.2f} s)")
+
+        # Analyse lancée par une requête antérieure et coupée par son échéance
+        url = pages.url("first", 5)
+        early = []
+        thread = threading.Thread(target=lambda: early.append(post(app.test_client(), [url])[0].get_json()))
+        thread.start()
+        time.sleep(deadline * 0.5)
+        relaunched = main.analysis_flights.counters["relaunched"]
+        response, elapsed = post(client, [url])
+        document = response.get_json()["documents"][0]
+        thread.join()
+        check(early[0]["documents"][0]["missing"] == ["document"], "Première requête: page coupée par son échéance")
+        check("missing" not in document and document["privacy_score"] is not None
+              and main.analysis_flights.counters["relaunched"] == relaunched + 1 and elapsed < limit,
+              f"Requête suivante: analyse relancée avec sa propre échéance, résultat complet ({elapsed:.2f} s)")
+
+        # Résumé IA plus lent que l'échéance
+        main.groq_gateway.client = TimeoutGroqClient(deadline * 2)
+        url = pages.url(0, 4)
+        response, elapsed = post(client, [url])
+        document = response.get_json()["documents"][0]
+        check(elapsed < limit and document["missing"] == ["ai_summary"] and document["ai_summary"] is None,
+              f"Résumé IA coupé par l'échéance et signalé ({elapsed:.2f} s)")
+        check(main.analysis_cache.get(main.get_cache_key(url)) is None, "Résultat partiel pas mis en cache")
+        main.groq_gateway.client = TimeoutGroqClient(0.0)
+        document = post(client, [url])[0].get_json()["documents"][0]
+        check(document["ai_summary"] and "missing" not in document
+              and main.analysis_cache.get(main.get_cache_key(url)) is not None,
+              "Demande suivante complète, puis mise en cache")
+        main.groq_gateway.client = RejectingGroqClient()
+        url = pages.url(0, 6)
+        document = post(client, [url])[0].get_json()["documents"][0]
+        check(document["ai_summary"] is None and "missing" not in document
+              and main.analysis_cache.get(main.get_cache_key(url)) is not None,
+              "Échec immédiat de Groq (401): résultat complet sans résumé, mis en cache")
+        main.groq_gateway.client = None
+
+        # Rafale de pages lentes: 4 admises, 4 en file, le reste refusé tout de suite
+        outcomes = []
+        lock = threading.Lock()
+
+        def burst(number):
+            response, elapsed = post(app.test_client(), [pages.url(deadline * 0.6, 100 + number)])
+            with lock:
+                outcomes.append((response.status_code, response.headers.get("Retry-After"), elapsed))
+
+        threads = [threading.Thread(target=burst, args=(number,)) for number in range(args.burst)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        accepted = [elapsed for status, _, elapsed in outcomes if status == 200]
+        refused = [(retry_after, elapsed) for status, retry_after, elapsed in outcomes if status == 503]
+        stats = main.admission.stats()
+        print(f"📊 {len(accepted)} admise(s), {len(refused)} refusée(s), file: {stats}")
+        check(len(accepted) + len(refused) == args.burst and len(refused) >= args.burst - 8,
+              "Requêtes au-delà de la file refusées (503)")
+        check(all(retry_after and int(retry_after) >= 1 for retry_after, _ in refused), "Refus avec Retry-After")
+        check(min(elapsed for _, elapsed in refused) < 0.1, "Refus immédiat quand la file est pleine")
+        check(max(accepted) < limit, f"Requêtes admises servies avant l'échéance (max {max(accepted):.2f} s)")
+        check(stats["active"] == 0 and stats["waiting"] == 0, "Toutes les places libérées")
+
+        # Débit par client
+        main.admission = main.AdmissionControl(client_rate_per_minute=60, client_burst=2)
+        statuses = [post(client, [pages.url(0, 200)], address="10.0.0.1")[0] for _ in range(3)]
+        other = post(client, [pages.url(0, 200)], address="10.0.0.2")[0]
+        check([response.status_code for response in statuses] == [200, 200, 429]
+              and statuses[-1].headers.get("Retry-After") == "1" and other.status_code == 200,
+              "Client trop rapide limité (429 + Retry-After), les autres servis")
+    finally:
+        pages.close()
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,82 @@
+"""Débit du scoring vectoriel des lots (BatchScorer, score_documents)
+
+Mesure, sur un seul cœur, le débit du scoring (occurrences déjà comptées)
+document par document et en version vectorielle: la version vectorielle doit
+traiter au moins --min-speedup fois plus de documents par seconde. La parité
+des deux versions est vérifiée par tests/test_batch_scoring.py.
+
+Usage: python benchmarks/bench_batch_scoring.py [--documents 20000] [--min-speedup 10]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def load_fixture_texts():
+    texts = []
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+            texts.append(main.extract_page_text(f.read()))
+    return texts
+
+def random_texts(count, seed=5):
+    """Textes faits de mots-clés, de contextes et des termes des bonnes pratiques"""
+    rng = random.Random(seed)
+    words = [keyword for config in main.KEYWORD_CATEGORIES.values() for keyword in config["keywords"]]
+    words += ["we collect", "your", "is shared", "are used", "gdpr", "encrypt", "right to erasure", "the", "and", "."]
+    for _ in range(count):
+        yield " ".join(rng.choice(words) for _ in range(rng.randint(0, 300)))
+
+def best_of(func, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def check_throughput(texts, min_speedup):
+    """Débit du scoring seul: le parcours des mots-clés, commun aux deux versions, est fait avant"""
+    pack = main.RULE_PACKS["en"]
+    scorer = pack.batch_scorer
+    states = [pack.matcher.scan_state(main.keyword_chunks(text, pack=pack)) for text in texts]
+    practices = [main.privacy_practices(text, pack) for text in texts]
+    
+    def scalar():
+        for state, document_practices in zip(states, practices):
+            _, risk_score = main.score_keyword_matches(pack.matcher.matches(state), pack)
+            main.get_risk_level(main.calculate_privacy_score(risk_score, *document_practices))
+    
+    def vector():
+        scorer.score(*scorer.count_matrices(states), practices)
+    
+    scalar_seconds = best_of(scalar)
+    vector_seconds = best_of(vector)
+    
+    speedup = scalar_seconds / vector_seconds
+    print(f"⏱️ Scoring de {len(texts)} documents: document par document {len(texts) / scalar_seconds:,.0f} doc/s, "
+          f"vectoriel {len(texts) / vector_seconds:,.0f} doc/s (x{speedup:.1f})")
+    if speedup < min_speedup:
+        raise SystemExit(f"❌ Accélération x{speedup:.1f} inférieure à x{min_speedup}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--min-speedup", type=float, default=10)
+    args = parser.parse_args()
+
+    if main.load_numpy() is None:
+        raise SystemExit("❌ NumPy n'est pas installé (pip install numpy)")
+    texts = load_fixture_texts() + list(random_texts(args.documents))
+    check_throughput(texts, args.min_speedup)
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,88 @@
+"""Cache d'analyses partagé entre processus serveur (AnalysisCache): vidage vu par tous les workers
+
+Chaque processus serveur garde sa propre couche mémoire au-dessus du fichier
+SQLite partagé. Deux processus (celui du benchmark et un processus fils, comme
+deux workers) ouvrent le même fichier temporaire. Vérifie que:
+- un résultat lu par le fils est servi depuis sa mémoire;
+- après un vidage par le parent (/clear-cache reçu par un autre worker), le
+  fils ne sert plus ce résultat de sa mémoire, et sert le nouveau résultat
+  écrit ensuite par le parent.
+Mesure le coût d'une lecture en mémoire (vérification de la génération comprise).
+
+Usage: python benchmarks/bench_cache.py [--runs 20000]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+def open_cache(db_path):
+    return main.AnalysisCache(db_path, timedelta(hours=1), timedelta(0), main.CACHE_MAX_BYTES, 1000)
+
+def worker(db_path, requests, replies):
+    """Second worker: répond à chaque clé reçue par (valeur lue, lue en mémoire)"""
+    cache = open_cache(db_path)
+    for key in iter(requests.get, None):
+        disk_hits = cache.counters["disk_hits"]
+        found = cache.get(key)
+        replies.put((found[0] if found else None, found is not None and cache.counters["disk_hits"] == disk_hits))
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"❌ {message}")
+    print(f"✅ {message}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20000, help="lectures mesurées")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "cache.sqlite3")
+        cache = open_cache(db_path)
+        context = multiprocessing.get_context("spawn")
+        requests, replies = context.Queue(), context.Queue()
+        child = context.Process(target=worker, args=(db_path, requests, replies), daemon=True)
+        child.start()
+        try:
+            def ask(key):
+                requests.put(key)
+                return replies.get(timeout=30)
+
+            cache.set("page", {"score": 1})
+            check(ask("page") == ({"score": 1}, False), "Second worker: résultat lu sur disque")
+            check(ask("page") == ({"score": 1}, True), "Second worker: résultat servi depuis sa mémoire")
+
+            cache.clear()
+            check(ask("page") == (None, False), "Cache vidé par un autre worker: résultat plus servi depuis la mémoire")
+            cache.set("page", {"score": 2})
+            check(ask("page") == ({"score": 2}, False) and ask("page") == ({"score": 2}, True),
+                  "Nouveau résultat lu sur disque puis servi depuis la mémoire")
+        finally:
+            requests.put(None)
+            child.join(timeout=10)
+
+        # Coût d'une lecture en mémoire, vérification de la génération comprise
+        started = time.perf_counter()
+        for _ in range(args.runs):
+            cache.get("page")
+        elapsed = (time.perf_counter() - started) / args.runs * 1_000_000
+        memory_only = main.AnalysisCache(None, timedelta(hours=1), timedelta(0), main.CACHE_MAX_BYTES, 0)
+        memory_only.set("page", {"score": 2})
+        started = time.perf_counter()
+        for _ in range(args.runs):
+            memory_only.get("page")
+        baseline = (time.perf_counter() - started) / args.runs * 1_000_000
+        print(f"⏱️ Lecture en mémoire: {elapsed:.1f} µs avec vérification de la génération, "
+              f"{baseline:.1f} µs sans stockage partagé")
+        cache.db.close()
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,126 @@
+"""Coût d'une requête /analyze répétée (ETag, If-None-Match) et de /analyze/cached, hors ligne
+
+Les pages sont servies en local (benchmarks/fixtures) et comptées. Mesure le
+coût d'une requête répétée: réponse complète depuis le cache, 304, et
+/analyze/cached (réponse complète et 304); le 304 doit être au moins
+--min-speedup fois moins coûteux qu'une réponse complète. Le comportement
+des ETags et de /analyze/cached est vérifié par tests/test_conditional.py.
+
+Les durées sont celles du traitement par l'application Flask (sans client
+HTTP), dont une part fixe est commune aux deux réponses.
+
+Usage: python benchmarks/bench_conditional.py [--runs 200] [--min-speedup 1.5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from bench_stages import FIXTURE_PAGES, install_offline_services
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+class CountingServer:
+    """Serveur HTTP local: /<n>.html est une page du corpus; compte les requêtes"""
+
+    def __init__(self):
+        pages = []
+        for name in FIXTURE_PAGES:
+            with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+                pages.append(f.read())
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                number = int(self.path.strip("/").split(".")[0])
+                body = pages[number % len(pages)].replace("<main>", f"<main><p>Page {number}.</p>", 1).encode("utf-8")
+                server.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="pages", daemon=True).start()
+
+    def url(self, number):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/{number}.html"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"❌ {message}")
+    print(f"✅ {message}")
+
+def median_us(funcs, runs):
+    """Durée médiane (µs) de chaque fonction, appelées en alternance pour subir les mêmes perturbations"""
+    durations = [[] for _ in funcs]
+    for _ in range(runs):
+        for func, measured in zip(funcs, durations):
+            started = time.perf_counter()
+            func()
+            measured.append(time.perf_counter() - started)
+    return [sorted(measured)[len(measured) // 2] * 1_000_000 for measured in durations]
+
+def dispatch(body, headers=None, path="/analyze"):
+    """Traitement d'une requête par l'application seule (sans le coût du client de test)"""
+    with main.app.test_request_context(path, method="POST", json=body, headers=headers or {}):
+        return main.app.full_dispatch_request()
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200, help="requêtes mesurées par cas (la médiane est retenue)")
+    parser.add_argument("--min-speedup", type=float, default=1.5)
+    args = parser.parse_args()
+
+    install_offline_services(0.0)
+    main.cache_refresher = main.CacheRefresher(None)
+    pages = CountingServer()
+    try:
+        client = main.app.test_client()
+        urls = [pages.url(number) for number in range(3)]
+        body = {"urls": urls}
+        etag = client.post("/analyze", json=body).headers["ETag"]
+
+        # Coût d'une requête répétée (les messages de cache des analyses sont masqués)
+        cached_etag = client.post("/analyze/cached", json=body).headers["ETag"]
+        full_bytes = len(client.post("/analyze", json=body).data)
+        check(dispatch(body, {"If-None-Match": etag}).status_code == 304
+              and dispatch(body, {"If-None-Match": cached_etag}, path="/analyze/cached").status_code == 304,
+              "ETags toujours valides pour la mesure")
+        with contextlib.redirect_stdout(io.StringIO()):
+            full, conditional, cached, cached_conditional = median_us([
+                lambda: dispatch(body),
+                lambda: dispatch(body, {"If-None-Match": etag}),
+                lambda: dispatch(body, path="/analyze/cached"),
+                lambda: dispatch(body, {"If-None-Match": cached_etag}, path="/analyze/cached"),
+            ], args.runs)
+        print(f"⏱️ {len(urls)} URLs en cache: réponse complète {full:.0f} µs ({full_bytes} octets), "
+              f"304 {conditional:.0f} µs (0 octet, {full / conditional:.1f}x moins), "
+              f"/analyze/cached {cached:.0f} µs, /analyze/cached 304 {cached_conditional:.0f} µs")
+        check(full / conditional >= args.min_speedup,
+              f"304 au moins {args.min_speedup:g}x moins coûteux qu'une réponse complète depuis le cache")
+    finally:
+        pages.close()
+
+if __name__ == "__main__":
+    main_cli()
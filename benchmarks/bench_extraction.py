@@ -0,0 +1,88 @@
+"""Temps de l'extraction de données structurées sur des textes adverses (extract_structured_data)
+
+Mesure le moteur par phrase sur des textes adverses de taille croissante
+(nombreux déclencheurs sans terminaison, longues suites d'espaces, une seule
+phrase géante), et les anciennes regex (.*? paresseux, re.findall) appliquées
+au texte entier sur le plus petit. La parité avec les anciennes regex, le
+classement des phrases critiques et la croissance linéaire du temps sont
+vérifiés par tests/test_extraction.py.
+
+Usage: python benchmarks/bench_extraction.py [--max-size 64000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+# Anciens patterns, appliqués au texte entier avec re.IGNORECASE
+LEGACY_PATTERNS = {
+    "retention_periods": r"(?:retain|store|keep).*?(?:for|during)\s+(\d+\s+(?:days|months|years))",
+    "data_types": r"(?:collect|gather|obtain).*?(email|name|address|phone|ip address|location|payment)",
+    "sharing_entities": r"(?:share|disclose|transfer).*?(?:with|to)\s+([\w\s]+?)(?:,|\.|\s+to)",
+}
+
+def legacy_extract(text, sentence_scoped=True):
+    """Anciennes regex, phrase par phrase (référence de parité) ou sur tout le texte"""
+    windows = main.extraction_windows(text) if sentence_scoped else [(0, len(text))]
+    found = {name: {} for name in LEGACY_PATTERNS}
+    for start, end in windows:
+        window = text[start:end]
+        for name, pattern in LEGACY_PATTERNS.items():
+            for value in re.findall(pattern, window, re.IGNORECASE):
+                if name == "data_types":
+                    value = value.lower()
+                elif name == "sharing_entities":
+                    value = value.strip()
+                    if len(value) <= 3:
+                        continue
+                found[name].setdefault(value, None)
+    return {name: list(values) for name, values in found.items() if values}
+
+# Textes adverses: chaque fonction produit un texte d'environ `size` caractères
+ADVERSARIAL_INPUTS = {
+    "déclencheurs de rétention sans durée": lambda size: "we keep for 3 day " * (size // 18),
+    "partages sans terminaison": lambda size: "share to with " * (size // 14) + ";",
+    "longue suite d'espaces": lambda size: "share with a" + " " * size + "x;",
+    "collectes sans donnée": lambda size: "we collect and gather and obtain " * (size // 33),
+    "phrase géante": lambda size: " ".join(
+        random.Random(size).choice(["share", "with", "to", "keep", "for", "data", "collect", "3", "days"])
+        for _ in range(size // 5)
+    ),
+}
+
+def timed(func, text, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+def measure_adversarial(max_size):
+    """Une ligne par texte adverse: ancienne version sur la plus petite taille, moteur sur chaque taille"""
+    sizes = [max_size // 8, max_size // 4, max_size // 2, max_size]
+    for label, build in ADVERSARIAL_INPUTS.items():
+        small = build(sizes[0])
+        legacy_ms = timed(lambda text: legacy_extract(text, sentence_scoped=False), small, runs=1)
+        line = [f"{label}: ancien {legacy_ms:.1f} ms à {len(small)} car.;"]
+        for size in sizes:
+            text = build(size)
+            line.append(f"{len(text)} car. {timed(main.extract_structured_data, text):.1f} ms")
+        print("⏱️ " + " ".join(line))
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-size", type=int, default=64000)
+    args = parser.parse_args()
+
+    measure_adversarial(args.max_size)
+
+if __name__ == "__main__":
+    main_cli()
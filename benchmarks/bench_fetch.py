@@ -0,0 +1,177 @@
+"""Téléchargement des pages (PageFetcher): requêtes conditionnelles et corps plafonné, hors ligne
+
+Les pages sont servies en local et chaque requête est enregistrée avec ses
+en-têtes conditionnels. Vérifie que:
+- une page servie avec un ETag (ou un Last-Modified) est revalidée par une
+  requête conditionnelle (If-None-Match, If-Modified-Since); la réponse 304
+  réutilise le texte gardé dans FetchCache, sans corps lu;
+- une page modifiée (nouvel ETag) est téléchargée et extraite à nouveau;
+- une page dont le texte n'est plus dans FetchCache est demandée sans
+  en-tête conditionnel; un texte expiré est encore revalidé;
+- le fetcher ne garde que les validateurs, pas de texte;
+- un corps plus grand que le plafond (--max-kb) n'est lu que jusqu'au
+  plafond: le texte s'arrête avant la fin de la page.
+
+Usage: python benchmarks/bench_fetch.py [--max-kb 256] [--page-mb 4]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from bench_stages import FIXTURE_PAGES, install_offline_services, load_corpus
+
+LAST_MODIFIED = "Mon, 03 Mar 2025 10:00:00 GMT"
+LARGE_PARAGRAPH = "<p>Paragraph {}: we keep your personal data for 30 days after you close your account.</p>\n"
+LARGE_END = "End of the oversized policy."
+
+class ValidatingServer:
+    """Serveur HTTP local: /etag/<n> porte un ETag (`self.versions[n]`), /modified/<n> un
+    Last-Modified, /large une page de `large_size` octets; enregistre chaque requête"""
+
+    def __init__(self, corpus, large_size):
+        pages = [corpus[name] for name in FIXTURE_PAGES]
+        paragraphs = []
+        size = 0
+        while size < large_size:
+            paragraphs.append(LARGE_PARAGRAPH.format(len(paragraphs)))
+            size += len(paragraphs[-1])
+        self.large = f"<html><body><main>{''.join(paragraphs)}<p>{LARGE_END}</p></main></body></html>".encode("utf-8")
+        self.versions = {}
+        self.requests = []  # (chemin, If-None-Match, If-Modified-Since, statut)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                kind, _, number = self.path.strip("/").partition("/")
+                headers = {}
+                if kind == "large":
+                    body = server.large
+                else:
+                    number = int(number)
+                    version = server.versions.get(number, 1)
+                    html = pages[number % len(pages)]
+                    body = html.replace("<main>", f"<main><p>Page {number}, version {version}.</p>", 1).encode("utf-8")
+                    if kind == "etag":
+                        headers["ETag"] = f'"{number}-{version}"'
+                    else:
+                        headers["Last-Modified"] = LAST_MODIFIED
+                if_none_match = self.headers.get("If-None-Match")
+                if_modified_since = self.headers.get("If-Modified-Since")
+                status = 200
+                if (if_none_match and if_none_match == headers.get("ETag")) or \
+                        (if_modified_since and if_modified_since == headers.get("Last-Modified")):
+                    status = 304
+                server.requests.append((self.path, if_none_match, if_modified_since, status))
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if status == 304:
+                    self.end_headers()
+                    return
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                # Le client cesse de lire au plafond et ferme la connexion
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, name="pages", daemon=True).start()
+
+    def url(self, path):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/{path}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"❌ {message}")
+    print(f"✅ {message}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-kb", type=int, default=256, help="plafond du corps lu (Ko)")
+    parser.add_argument("--page-mb", type=float, default=4, help="taille de la page trop grande (Mo)")
+    args = parser.parse_args()
+
+    install_offline_services(0.0)
+    max_bytes = args.max_kb * 1024
+    pages = ValidatingServer(load_corpus(), int(args.page_mb * 1024 * 1024))
+    fetcher = main.page_fetcher = main.PageFetcher(max_bytes=max_bytes)
+    main.fetch_cache = main.FetchCache()
+    download = main.download_page_content
+    try:
+        # ETag: If-None-Match, 304 et texte réutilisé
+        url = pages.url("etag/1")
+        text = download(url)
+        read = fetcher.counters["bytes"]
+        check(text and "Page 1, version 1" in text and pages.requests[-1] == ("/etag/1", None, None, 200),
+              "Première requête sans en-tête conditionnel")
+        check(download(url) == text and pages.requests[-1] == ("/etag/1", '"1-1"', None, 304),
+              "ETag: requête conditionnelle (If-None-Match), 304 et même texte")
+        check(fetcher.counters["not_modified"] == 1 and fetcher.counters["bytes"] == read,
+              "304: aucun corps lu ni extrait")
+
+        pages.versions[1] = 2
+        changed = download(url)
+        check("Page 1, version 2" in changed and pages.requests[-1] == ("/etag/1", '"1-1"', None, 200),
+              "Page modifiée (nouvel ETag): téléchargée et extraite à nouveau")
+        check(download(url) == changed and pages.requests[-1] == ("/etag/1", '"1-2"', None, 304),
+              "Nouvel ETag retenu pour la revalidation suivante")
+
+        # Last-Modified: If-Modified-Since
+        url = pages.url("modified/2")
+        text = download(url)
+        check(download(url) == text and pages.requests[-1] == ("/modified/2", None, LAST_MODIFIED, 304),
+              "Last-Modified: requête conditionnelle (If-Modified-Since), 304 et même texte")
+
+        # Texte absent de FetchCache: requête inconditionnelle; texte expiré: revalidé
+        main.clear_page_contents()
+        check(download(url) == text and pages.requests[-1] == ("/modified/2", None, None, 200),
+              "Texte absent du cache: requête sans en-tête conditionnel")
+        main.fetch_cache = main.FetchCache(ttl=timedelta(0))
+        url = pages.url("etag/3")
+        text = main.fetch_page_content(url)
+        check(main.fetch_page_content(url) == text and pages.requests[-1] == ("/etag/3", '"3-1"', None, 304),
+              "Texte expiré: revalidé par une requête conditionnelle")
+        check(all(len(validators) == 2 for validators in fetcher.validators.values()),
+              f"Fetcher: validateurs seuls, sans texte ({fetcher.stats()['validators']} pages)")
+
+        # Corps plafonné
+        truncated = fetcher.counters["truncated"]
+        read = fetcher.counters["bytes"]
+        started = time.perf_counter()
+        text = download(pages.url("large"))
+        elapsed = (time.perf_counter() - started) * 1000
+        read = fetcher.counters["bytes"] - read
+        print(f"⏱️ Page de {len(pages.large)} octets: {read} lus en {elapsed:.0f} ms, {len(text)} caractères de texte")
+        check(fetcher.counters["truncated"] == truncated + 1 and max_bytes <= read < max_bytes + 64 * 1024,
+              f"Page trop grande: lecture arrêtée au plafond ({args.max_kb} Ko)")
+        check(text.startswith("Paragraph 0:") and LARGE_END not in text,
+              "Texte de la page trop grande arrêté avant la fin")
+    finally:
+        pages.close()
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,190 @@
+"""Cache des pages téléchargées (FetchCache): budget en octets, échecs et compression, hors ligne
+
+Les pages sont servies en local (benchmarks/fixtures, chacune rendue unique);
+certaines adresses répondent 404, 500 ou trop lentement. Vérifie que:
+- le cache reste dans son budget en octets, évince les pages les moins
+  récemment utilisées, et garde plusieurs fois plus de pages que ne le
+  permettrait le texte non compressé;
+- un échec est gardé (texte vide) pendant la durée de son type d'erreur:
+  la page n'est pas re-téléchargée avant, et l'est après, sans /clear-cache;
+- une page d'abord inaccessible est analysée par /analyze une fois le site
+  rétabli et la durée de l'échec écoulée;
+- la taille, le nombre d'entrées et le taux de succès sont publiés dans
+  /health et /metrics.
+Mesure le coût d'un accès au cache (décompression) par taille de page.
+
+Usage: python benchmarks/bench_fetch_cache.py [--budget-kb 256] [--runs 50]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from bench_stages import FIXTURE_PAGES, VERY_LARGE_PAGE, install_offline_services, load_corpus
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# Durées des échecs raccourcies pour le test: chaque type a la sienne
+ERROR_DURATIONS = {
+    "timeout": timedelta(seconds=0.3),
+    "connection": timedelta(seconds=0.3),
+    "http_5xx": timedelta(seconds=0.3),
+    "http_4xx": timedelta(seconds=1.2),
+    "request": timedelta(seconds=0.3),
+    "unexpected": timedelta(seconds=0.3),
+}
+
+class FlakyServer:
+    """Serveur HTTP local: /page/<n> est une page du corpus, /status/<code>/<n> répond
+    <code> tant que `self.down` contient n, /slow/<n> répond après 1 s; compte les requêtes"""
+
+    def __init__(self, corpus):
+        pages = [corpus[name] for name in FIXTURE_PAGES]
+        self.requests = {}
+        self.down = set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                number = int(parts[-1])
+                server.requests[self.path] = server.requests.get(self.path, 0) + 1
+                if parts[0] == "slow":
+                    time.sleep(1)
+                if parts[0] == "status" and number in server.down:
+                    self.send_response(int(parts[1]))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                html = corpus[VERY_LARGE_PAGE] if parts[0] == "large" else pages[number % len(pages)]
+                body = html.replace("<main>", f"<main><p>Page {number}.</p>", 1).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                # Le client abandonne les pages trop lentes
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, name="pages", daemon=True).start()
+
+    def url(self, path):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/{path}"
+
+    def count(self, url):
+        return self.requests.get("/" + url.split("/", 3)[3], 0)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"❌ {message}")
+    print(f"✅ {message}")
+
+def median_us(func, runs):
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return sorted(durations)[len(durations) // 2] * 1_000_000
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-kb", type=int, default=256, help="budget du cache (Ko)")
+    parser.add_argument("--runs", type=int, default=50, help="accès mesurés par page (la médiane est retenue)")
+    args = parser.parse_args()
+
+    install_offline_services(0.0)
+    corpus = load_corpus()
+    budget = args.budget_kb * 1024
+    main.fetch_cache = main.FetchCache(budget, error_ttls=ERROR_DURATIONS)
+    main.page_fetcher = main.PageFetcher(timeout=0.3, max_validators=0)
+    pages = FlakyServer(corpus)
+    try:
+        # Budget en octets: bien plus de pages que de texte non compressé
+        urls = [pages.url(f"page/{number}") for number in range(200)]
+        for url in urls:
+            main.fetch_page_content(url)
+        stats = main.fetch_cache.stats()
+        print(f"📊 {stats['entries']} pages, {stats['bytes']} octets ({stats['text_bytes']} décompressés, "
+              f"x{stats['compression_ratio']}), {stats['evictions']} évincées")
+        check(stats["bytes"] <= budget and stats["evictions"] > 0, "Cache maintenu dans son budget en octets")
+        check(stats["text_bytes"] > 2 * budget, "Plus de deux fois plus de texte gardé que le budget (compression)")
+        fetched = pages.count(urls[-1])
+        check(main.fetch_page_content(urls[-1]) and pages.count(urls[-1]) == fetched, "Page récente servie depuis le cache")
+        check(main.fetch_cache.get(urls[0]) is None, "Page la moins récemment utilisée évincée")
+
+        # Échecs gardés selon leur type
+        pages.down.update({1, 2})
+        down, missing, slow = pages.url("status/500/1"), pages.url("status/404/2"), pages.url("slow/3")
+        # La page lente d'abord: les autres échecs ne doivent pas expirer pendant son délai
+        check(main.fetch_page_content(slow) == "" and main.fetch_page_content(down) == ""
+              and main.fetch_page_content(missing) == "", "Échecs (délai dépassé, 500, 404): texte vide")
+        negative_hits = main.fetch_cache.counters["negative_hits"]
+        for url in (down, missing, slow):
+            main.fetch_page_content(url)
+        check(main.fetch_cache.counters["negative_hits"] == negative_hits + 3
+              and all(pages.count(url) == 1 for url in (down, missing, slow)),
+              "Échecs récents servis depuis le cache, sans nouveau téléchargement")
+        pages.down.clear()
+        time.sleep(0.4)
+        check(main.fetch_page_content(down) and pages.count(down) == 2,
+              "Erreur 500: site rétabli re-téléchargé après 0.3 s, sans /clear-cache")
+        check(main.fetch_page_content(missing) == "" and pages.count(missing) == 1,
+              "Erreur 404: toujours en cache après 0.3 s")
+        time.sleep(0.9)
+        check(main.fetch_page_content(missing) and pages.count(missing) == 2, "Erreur 404: re-téléchargée après 1.2 s")
+
+        # Via /analyze: "Contenu insuffisant" tant que le site est en panne, puis analyse normale
+        client = main.app.test_client()
+        pages.down.add(4)
+        url = pages.url("status/503/4")
+        document = client.post("/analyze", json={"urls": [url], "format": "structured"}).get_json()["documents"][0]
+        check(document["error"], "/analyze: site en panne signalé")
+        pages.down.clear()
+        time.sleep(0.4)
+        document = client.post("/analyze", json={"urls": [url], "format": "structured"}).get_json()["documents"][0]
+        check(not document["error"] and document["privacy_score"] is not None,
+              "/analyze: page analysée une fois le site rétabli")
+
+        health = client.get("/health").get_json()["fetch_cache"]
+        metrics = client.get("/metrics").get_data(as_text=True)
+        check({"entries", "bytes", "hit_rate", "negative_entries"} <= set(health)
+              and "trustadvisor_fetch_cache_bytes" in metrics
+              and 'trustadvisor_fetch_cache_lookups_total{result="negative_hit"}' in metrics,
+              f"Taille, entrées et taux de succès publiés (hit_rate {health['hit_rate']})")
+
+        # Coût d'un accès au cache: décompression du texte
+        main.fetch_cache = main.FetchCache()
+        for path in ("page/0", "page/1", "large/0"):
+            url = pages.url(path)
+            text = main.fetch_page_content(url)
+            entry = main.fetch_cache.entries[url]
+            elapsed = median_us(lambda: main.fetch_page_content(url), args.runs)
+            print(f"⏱️ {len(text.encode('utf-8')):>7} octets de texte, {entry[1]:>6} en cache: accès {elapsed:.0f} µs")
+    finally:
+        pages.close()
+
+if __name__ == "__main__":
+    main_cli()
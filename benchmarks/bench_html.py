@@ -0,0 +1,79 @@
+"""Benchmark de l'extraction HTML -> texte (extract_page_text)
+
+Mesure temps et pic mémoire de l'extracteur événementiel et de l'ancienne
+extraction BeautifulSoup (arbre complet, decompose, get_text) sur de grandes
+pages (100 Ko à 3 Mo). La parité des deux extractions est vérifiée par
+tests/test_html_extractor.py.
+
+Usage: python benchmarks/bench_html.py [--runs 5]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+import main
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def reference_extract(html, limit=main.MAX_TEXT_LENGTH):
+    """Ancienne extraction de référence (BeautifulSoup)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe']):
+        element.decompose()
+    text = soup.get_text(separator=' ', strip=True)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[\r\n]+', '\n', text)
+    return text[:limit]
+
+def streaming_extract(html, limit=main.MAX_TEXT_LENGTH, chunk_size=None):
+    extractor = main.HTMLTextExtractor(limit)
+    if chunk_size:
+        for start in range(0, len(html), chunk_size):
+            extractor.feed(html[start:start + chunk_size])
+    else:
+        extractor.feed(html)
+    return extractor.close()
+
+def load_fixture():
+    with open(os.path.join(FIXTURES_DIR, "privacy_policy.html"), encoding="utf-8") as f:
+        return f.read()
+
+def large_page(size):
+    """Page de `size` octets environ: beaucoup de balisage et de scripts autour du texte"""
+    page = load_fixture()
+    body = page[page.index("<main>"):page.index("</main>")]
+    noise = "<script>" + "var x = 1;" * 400 + "</script><nav>" + "<a href='#'>link</a>" * 50 + "</nav>"
+    block = f"<div class='section'>{noise}{body}</div>"
+    return "<html><body>" + block * (size // len(block) + 1) + "</body></html>"
+
+def measure(func, html, runs):
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(runs):
+        func(html)
+    return (time.perf_counter() - start) / runs * 1000, peak / 1024 / 1024
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in (100 * 1024, 1024 * 1024, 3 * 1024 * 1024):
+        html = large_page(size)
+        ref_ms, ref_mb = measure(reference_extract, html, args.runs)
+        new_ms, new_mb = measure(streaming_extract, html, args.runs)
+        print(f"📄 {len(html) / 1024 / 1024:.2f} Mo: BeautifulSoup {ref_ms:.1f} ms / {ref_mb:.1f} Mo"
+              f" -> flux {new_ms:.1f} ms / {new_mb:.1f} Mo (x{ref_ms / new_ms:.0f})")
+
+if __name__ == "__main__":
+    main_cli()
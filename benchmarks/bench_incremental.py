@@ -0,0 +1,172 @@
+"""Analyse incrémentale par blocs et changements entre versions d'une page, hors ligne
+
+Le texte d'une page est découpé en blocs (coupures choisies d'après le texte,
+voir main.iter_blocks) dont les résultats partiels sont mis en cache. Vérifie
+que:
+- la fusion des résultats partiels des blocs donne exactement le résultat de
+  analyze_content, sur le corpus de benchmarks/fixtures et la très grande page;
+- une phrase ajoutée ne fait ré-analyser que le ou les blocs qui la
+  contiennent, et la ré-analyse est plus rapide qu'une analyse complète;
+- /analyze signale la phrase ajoutée, la nouvelle valeur extraite et le score
+  de risque précédent ("changes"), et le résumé texte les affiche;
+- une page inchangée garde les changements de sa dernière modification.
+
+Usage: python benchmarks/bench_incremental.py [--runs 5]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from bench_stages import VERY_LARGE_PAGE, install_offline_services, load_corpus
+
+FIXTURE_PAGE = "privacy_policy.html"
+ADDED_SENTENCE = "We may sell or share your personal data with data brokers for marketing purposes."
+# Les phrases critiques sont citées sans leur point final
+ADDED_EXCERPT = ADDED_SENTENCE.rstrip(".")
+
+class PageServer:
+    """Serveur HTTP local: sert `self.html`, modifiable entre deux requêtes"""
+
+    def __init__(self, html):
+        self.html = html
+        page = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                body = page.html.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="page", daemon=True).start()
+
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/privacy"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"❌ {message}")
+    print(f"✅ {message}")
+
+def block_counters():
+    counters = main.dedup_stats()
+    return counters["blocks_reused"], counters["blocks_analyzed"]
+
+def expire(url):
+    """Le résultat en cache a expiré: la page est téléchargée et analysée à nouveau"""
+    main.analysis_cache.clear()
+    main.clear_page_contents()
+    main.page_fetcher.clear()
+
+def median_ms(func, runs, before):
+    durations = []
+    for _ in range(runs):
+        before()
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return sorted(durations)[len(durations) // 2] * 1000
+
+def insert_sentence(text, sentence):
+    """Le texte avec `sentence` insérée après la première fin de phrase du milieu du texte"""
+    position = text.index(". ", len(text) // 2) + 1
+    return text[:position] + " " + sentence + text[position:]
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="mesures par analyse (la médiane est retenue)")
+    args = parser.parse_args()
+
+    install_offline_services(0.0)
+    corpus = load_corpus()
+
+    texts = {name: main.extract_page_text(html) for name, html in corpus.items()}
+    for name, text in texts.items():
+        pack = main.select_rule_pack(text)
+        main.block_cache.clear()
+        blocks = main.split_blocks(text)
+        check(main.analyze_content_blocks(blocks, pack) == main.analyze_content(text),
+              f"{name}: fusion des {len(blocks)} blocs identique à l'analyse complète")
+
+    # Une phrase ajoutée au milieu de la très grande page
+    text = texts[VERY_LARGE_PAGE]
+    pack = main.select_rule_pack(text)
+    edited = insert_sentence(text, ADDED_SENTENCE)
+    blocks, edited_blocks = main.split_blocks(text), main.split_blocks(edited)
+    main.block_cache.clear()
+    main.analyze_content_blocks(blocks, pack)
+    reused, analyzed = block_counters()
+    result = main.analyze_content_blocks(edited_blocks, pack)
+    reused, analyzed = block_counters()[0] - reused, block_counters()[1] - analyzed
+    check(result == main.analyze_content(edited), "Résultat de la page modifiée identique à l'analyse complète")
+    check(1 <= analyzed <= 2 and reused == len(set(key for key, _ in edited_blocks)) - analyzed,
+          f"Page modifiée: {analyzed} bloc(s) ré-analysé(s), {reused} repris")
+
+    full = median_ms(lambda: main.analyze_content(edited), args.runs, lambda: None)
+
+    def reanalyze():
+        main.analyze_content_blocks(main.split_blocks(edited), pack)
+
+    def forget_edit():
+        main.block_cache.clear()
+        main.analyze_content_blocks(blocks, pack)
+
+    incremental = median_ms(reanalyze, args.runs, forget_edit)
+    print(f"⏱️ {VERY_LARGE_PAGE}: analyse complète {full:.1f} ms, ré-analyse après modification {incremental:.1f} ms")
+    check(incremental < full / 2, "Ré-analyse d'une page modifiée plus rapide qu'une analyse complète")
+
+    # Changements entre deux versions, via /analyze
+    html = corpus[FIXTURE_PAGE]
+    page = PageServer(html)
+    try:
+        client = main.app.test_client()
+        url = page.url()
+        request = {"urls": [url], "format": "structured"}
+        document = client.post("/analyze", json=request).get_json()["documents"][0]
+        check(document["changes"] is None, "Première version: aucun changement")
+
+        page.html = html.replace("</main>", f"<p>{ADDED_SENTENCE}</p></main>", 1)
+        expire(url)
+        reused, analyzed = block_counters()
+        document = client.post("/analyze", json=request).get_json()["documents"][0]
+        changes = document["changes"]
+        print(f"📊 Changements: {changes}")
+        check(block_counters()[1] - analyzed <= 2 and block_counters()[0] > reused,
+              "Seuls les blocs modifiés sont ré-analysés")
+        check(changes and ADDED_EXCERPT in changes["added"] and not changes["removed"],
+              "Phrase ajoutée signalée")
+        check(changes["data_added"] == {"sharing_entities": ["data brokers for marketing purposes"]}
+              and not changes["data_removed"], "Nouveau destinataire des données signalé")
+        check(changes["risk_score_before"] < document["risk_score"], "Score de risque précédent signalé")
+
+        expire(url)
+        document = client.post("/analyze", json=request).get_json()["documents"][0]
+        check(document["changes"] == changes, "Page inchangée: changements de la dernière modification conservés")
+        summary = client.post("/analyze", json={"urls": [url]}).get_json()["summary"]
+        check("CHANGEMENTS DEPUIS LE" in summary and f"➕ Nouveau: \"{ADDED_EXCERPT}\"" in summary,
+              "Changements affichés dans le résumé")
+    finally:
+        page.close()
+
+if __name__ == "__main__":
+    main_cli()
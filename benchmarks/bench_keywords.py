@@ -0,0 +1,89 @@
+"""Micro-benchmark du moteur de mots-clés (analyze_keywords_advanced)
+
+Compare le temps du moteur en une passe à celui de l'ancienne implémentation
+(un str.count et trois regex par mot-clé). La parité des résultats est
+vérifiée par tests/test_keywords.py.
+
+Usage: python benchmarks/bench_keywords.py [--runs 200]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+import main
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# L'ancienne implémentation ne connaît que les mots-clés anglais
+ENGLISH = main.RULE_PACKS["en"]
+
+def legacy_score_keyword_match(text_lower, keyword):
+    """Ancienne implémentation de référence"""
+    count = text_lower.count(keyword)
+    context_patterns = [
+        rf"we\s+\w+\s+{keyword}",
+        rf"your\s+{keyword}",
+        rf"{keyword}\s+(?:is|are)\s+(?:collected|used|shared)",
+    ]
+    context_bonus = sum(1 for pattern in context_patterns if re.search(pattern, text_lower))
+    return count + (context_bonus * 0.5)
+
+def legacy_analyze_keywords(text):
+    """Ancienne implémentation de référence"""
+    text_lower = text.lower()
+    results = {}
+    risk_score = 0
+    for category, config in main.KEYWORD_CATEGORIES.items():
+        found_items = []
+        category_score = 0
+        for keyword in config["keywords"]:
+            score = legacy_score_keyword_match(text_lower, keyword)
+            if score > 0:
+                is_critical = keyword in config["critical"]
+                found_items.append({"keyword": keyword, "count": int(score), "critical": is_critical})
+                item_risk = score * config["weight"]
+                if is_critical:
+                    item_risk *= 2
+                category_score += item_risk
+        if found_items:
+            found_items.sort(key=lambda x: (x["critical"], x["count"]), reverse=True)
+            results[category] = {"items": found_items[:5], "score": category_score}
+            risk_score += category_score
+    return results, risk_score
+
+def load_policy_text():
+    """Texte extrait de la politique de référence, limité à 15k caractères"""
+    with open(os.path.join(FIXTURES_DIR, "privacy_policy.html"), encoding="utf-8") as f:
+        soup = BeautifulSoup(f.read(), "html.parser")
+    for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe']):
+        element.decompose()
+    text = re.sub(r'\s+', ' ', soup.get_text(separator=' ', strip=True))
+    return ((text + " ") * 2)[:15000]
+
+def timed(func, text, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        func(text)
+    return (time.perf_counter() - start) / runs * 1000
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    text = load_policy_text()
+    legacy_ms = timed(legacy_analyze_keywords, text, args.runs)
+    engine_ms = timed(lambda text: main.analyze_keywords_advanced(text, pack=ENGLISH), text, args.runs)
+    print(f"📄 Texte: {len(text)} caractères, {len(ENGLISH.matcher.keywords)} mots-clés")
+    print(f"🐢 Ancienne implémentation: {legacy_ms:.3f} ms/document")
+    print(f"🚀 Moteur en une passe:     {engine_ms:.3f} ms/document")
+    print(f"📈 Accélération: x{legacy_ms / engine_ms:.1f}")
+
+if __name__ == "__main__":
+    main_cli()
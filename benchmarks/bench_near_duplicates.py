@@ -0,0 +1,127 @@
+"""Rappel et latence de l'index des quasi-doublons (NearDuplicateIndex)
+
+Remplit un index SQLite temporaire avec des signatures synthétiques (un
+million par défaut), puis mesure la latence d'une recherche (p50/p99). Vérifie
+ensuite, sur les pages de référence, que des variantes générées à partir du
+même modèle (autre éditeur, autre domaine, autres dates) sont retrouvées avec
+un résumé dont les noms ont été remplacés, et que des documents différents ne
+le sont pas.
+
+Usage: python benchmarks/bench_near_duplicates.py [--entries 1000000] [--lookups 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Budget de latence d'une recherche (p99, en ms) pour un index plein
+MAX_LOOKUP_P99_MS = 5.0
+
+VARIANTS = [
+    ("Acme Widgets", "acme-widgets.io", "March 3, 2024"),
+    ("Northwind Traders", "northwind.example", "July 21, 2025"),
+    ("Globex Corporation", "globex.net", "October 9, 2023"),
+]
+
+def load_fixture_texts():
+    texts = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+            texts[name] = main.extract_page_text(f.read())
+    return texts
+
+def variant(text, company, domain, date):
+    """Même modèle de politique, autre éditeur"""
+    text = text.replace("Example Corp", company).replace("example.com", domain)
+    return main.re.sub(r"(?:January|February|March|April|May|June|July|August|September|October|November|December) \d{1,2}, \d{4}", date, text)
+
+def fill(index, entries, seed=7):
+    """Signatures aléatoires (documents tous différents), insérées par lots"""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    batch = 10000
+    for first in range(0, entries, batch):
+        documents, bands = [], []
+        for doc_id in range(first + 1, min(entries, first + batch) + 1):
+            signature = [rng.getrandbits(58) for _ in range(index.bins)]
+            documents.append((doc_id, f"synthetic-{doc_id}", time.time(), index.pack(signature), '{"domain": "", "names": []}', "",
+                              index.model, index.prompt_version))
+            bands.extend((band_hash, doc_id) for band_hash in index.band_hashes(signature))
+        index.db.execute("BEGIN")
+        index.db.executemany("INSERT INTO near_duplicates (id, content_key, created_at, signature, entities, summary, model, prompt_version) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", documents)
+        index.db.executemany("INSERT INTO near_duplicate_bands (band_hash, document_id) VALUES (?, ?)", bands)
+        index.db.execute("COMMIT")
+    print(f"📥 {entries} documents indexés en {time.perf_counter() - start:.1f} s")
+
+def check_latency(index, lookups, seed=11):
+    rng = random.Random(seed)
+    durations = []
+    for _ in range(lookups):
+        signature = [rng.getrandbits(58) for _ in range(index.bins)]
+        start = time.perf_counter()
+        index.find(signature)
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    p50 = durations[len(durations) // 2] * 1000
+    p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))] * 1000
+    print(f"⏱️ Recherche: p50 {p50:.3f} ms, p99 {p99:.3f} ms ({lookups} recherches)")
+    if p99 > MAX_LOOKUP_P99_MS:
+        raise SystemExit(f"❌ p99 {p99:.3f} ms au-delà du budget de {MAX_LOOKUP_P99_MS} ms")
+
+def signature(text, url):
+    entities = main.extract_entities(text, url)
+    return main.minhash_signature(main.template_words(text, entities)), entities
+
+def check_recall(index):
+    texts = load_fixture_texts()
+    for name, text in texts.items():
+        fixture_signature, entities = signature(text, f"https://www.example.com/{name}")
+        summary = "1. 🎯 Example Corp (example.com) partage les données avec ses partenaires."
+        index.add(f"fixture-{name}", fixture_signature, entities, summary)
+    
+    found = 0
+    for name, text in texts.items():
+        for company, domain, date in VARIANTS:
+            copy = variant(text, company, domain, date)
+            copy_signature, entities = signature(copy, f"https://{domain}/{name}")
+            match = index.find(copy_signature)
+            if not match:
+                raise SystemExit(f"❌ Variante {company} de {name} non retrouvée")
+            similarity, previous, summary = match
+            patched = main.patch_entities(summary, previous, entities)
+            if company not in patched or domain not in patched or "Example Corp" in patched:
+                raise SystemExit(f"❌ Résumé mal adapté pour {company} ({name}): {patched!r}")
+            found += 1
+    
+    # Documents différents: chaque page comparée à un texte de même taille tiré des autres
+    names = list(texts)
+    for name in names:
+        others = " ".join(texts[other] for other in names if other != name)
+        if index.find(signature(others[:len(texts[name])], "https://www.example.com/")[0]):
+            raise SystemExit(f"❌ Faux positif pour un document différent de {name}")
+    print(f"✅ {found} variantes retrouvées et adaptées, aucun faux positif")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = main.NearDuplicateIndex(os.path.join(directory, "near_duplicates.sqlite3"))
+        fill(index, args.entries)
+        check_latency(index, args.lookups)
+        check_recall(index)
+        index.db.close()
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,172 @@
+"""Rafraîchissement en arrière-plan et préchauffage du cache (CacheRefresher), hors ligne
+
+Avec un cache aux durées raccourcies (--ttl secondes, rafraîchissement dans
+la dernière moitié) et des pages servies en local avec un ETag, vérifie que:
+- une page à préchauffer est analysée avant toute demande;
+- une page demandée souvent est rafraîchie avant d'expirer, par une requête
+  conditionnelle (réponse 304), et reste servie depuis le cache;
+- une page demandée une seule fois n'est pas rafraîchie: périmée, elle est
+  servie telle quelle pendant son rafraîchissement;
+- aucun rafraîchissement n'a lieu pendant une analyse demandée par un
+  utilisateur, et le débit des rafraîchissements respecte la limite;
+- un seul processus rafraîchit (verrou de fichier).
+
+Usage: python benchmarks/bench_refresh.py [--ttl 2]
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from bench_stages import install_offline_services
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+class EtagServer:
+    """Serveur HTTP local: /<n>.html est une page du corpus, avec ETag et réponses 304"""
+
+    def __init__(self):
+        pages = []
+        for name in sorted(os.listdir(FIXTURES_DIR)):
+            with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+                pages.append(f.read())
+        self.counters = {"requests": 0, "not_modified": 0}
+        counters = self.counters
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                number = int(self.path.strip("/").split(".")[0])
+                body = pages[number % len(pages)].replace("<main>", f"<main><p>Page {number}.</p>", 1).encode("utf-8")
+                etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                counters["requests"] += 1
+                if self.headers.get("If-None-Match") == etag:
+                    counters["not_modified"] += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="pages", daemon=True).start()
+
+    def url(self, number):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/{number}.html"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"❌ {message}")
+    print(f"✅ {message}")
+
+def request(url):
+    """Une demande /analyze (sans le serveur HTTP): comptée par le planificateur"""
+    return list(main.iter_analysis_results([url]))[0]
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ttl", type=float, default=2.0, help="durée de vie des résultats (secondes)")
+    args = parser.parse_args()
+
+    ttl = args.ttl
+    install_offline_services(0.0)
+    main.analysis_cache = main.AnalysisCache(None, timedelta(seconds=ttl), timedelta(seconds=60),
+                                             main.CACHE_MAX_BYTES, 0)
+    main.document_cache = main.AnalysisCache(None, timedelta(seconds=ttl), timedelta(0), main.CACHE_MAX_BYTES, 0)
+    pages = EtagServer()
+    directory = tempfile.mkdtemp()
+    refresher = main.CacheRefresher(os.path.join(directory, "refresh.sqlite3"), interval=ttl,
+                                    ahead=timedelta(seconds=ttl / 2), min_hits=2, per_minute=6000)
+    refresher.open_db()
+    main.cache_refresher = refresher
+    try:
+        popular, rare, seed = pages.url(1), pages.url(2), pages.url(3)
+        refresher.pin([seed])
+        popular_key, rare_key, seed_key = (main.get_cache_key(url) for url in (popular, rare, seed))
+        for _ in range(3):
+            request(popular)
+        request(rare)
+
+        refresher.run_pass()
+        check(main.analysis_cache.created_at(seed_key) is not None and refresher.counters["prewarmed"] == 1,
+              "Page préchauffée avant toute demande")
+        check(refresher.counters["refreshed"] == 0, "Aucun rafraîchissement tant que les résultats sont récents")
+
+        time.sleep(ttl * 0.6)
+        before = {key: main.analysis_cache.created_at(key) for key in (popular_key, rare_key, seed_key)}
+        not_modified = pages.counters["not_modified"]
+        refresher.run_pass()
+        after = {key: main.analysis_cache.created_at(key) for key in before}
+        check(after[popular_key] > before[popular_key] and after[seed_key] > before[seed_key],
+              "Pages populaire et préchauffée rafraîchies avant leur expiration")
+        check(after[rare_key] == before[rare_key], "Page peu demandée laissée telle quelle")
+        check(pages.counters["not_modified"] == not_modified + 2, "Rafraîchissements par requête conditionnelle (304)")
+
+        time.sleep(ttl * 0.5)
+        hits, stale_hits = main.analysis_cache.counters["hits"], main.analysis_cache.counters["stale_hits"]
+        request(popular)
+        check(main.analysis_cache.counters["hits"] == hits + 1, "Page populaire servie fraîche depuis le cache après l'échéance initiale")
+        request(rare)
+        check(main.analysis_cache.counters["stale_hits"] == stale_hits + 1,
+              "Page peu demandée servie périmée pendant son rafraîchissement")
+
+        # Une analyse utilisateur en cours: la passe est reportée
+        for _ in range(3):
+            request(pages.url(4))
+        time.sleep(ttl * 0.6)
+        release = threading.Event()
+        busy, _ = main.analysis_flights.submit("utilisateur", None, release.wait)
+        refreshed, deferred = refresher.counters["refreshed"], refresher.counters["deferred"]
+        refresher.run_pass()
+        release.set()
+        busy.result()
+        check(refresher.counters["refreshed"] == refreshed and refresher.counters["deferred"] == deferred + 1,
+              "Rafraîchissements reportés pendant une analyse utilisateur")
+
+        # Limite de débit: 60 par minute, soit un par seconde (plus un d'avance)
+        limited = main.CacheRefresher(refresher.db_path, interval=2.5, ahead=timedelta(seconds=ttl * 10),
+                                      min_hits=2, per_minute=60)
+        limited.db = refresher.db
+        limited.lock_file = True
+        for number in range(10, 16):
+            for _ in range(3):
+                request(pages.url(number))
+        refresher.flush()
+        started = time.monotonic()
+        limited.run_pass()
+        elapsed = time.monotonic() - started
+        done = limited.counters["refreshed"] + limited.counters["prewarmed"]
+        check(done <= 1 + elapsed + 0.5 and limited.counters["deferred"] == 1,
+              f"Débit limité: {done} rafraîchissements en {elapsed:.1f} s, le reste reporté")
+
+        other = main.CacheRefresher(refresher.db_path)
+        check(refresher.is_leader() and not other.is_leader(), "Un seul processus rafraîchit")
+    finally:
+        pages.close()
+
+if __name__ == "__main__":
+    main_cli()
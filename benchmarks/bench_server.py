@@ -0,0 +1,216 @@
+"""Test de charge du serveur de production (python main.py serve) selon le nombre de workers
+
+Lance le serveur (gunicorn, application préchargée) avec 1, 2, 4... workers et
+envoie pendant --duration secondes des requêtes /analyze concurrentes. Chaque
+requête demande une page différente (les pages de benchmarks/fixtures servies
+en local, chacune rendue unique): aucun résultat ne vient du cache, chaque
+requête télécharge, extrait et analyse sa page. Groq est désactivé et le cache
+SQLite est un fichier temporaire: aucun accès réseau ni clé d'API.
+
+Le débit doit croître avec le nombre de workers, jusqu'au nombre de cœurs:
+avec N workers (N ≤ cœurs), au moins --min-efficiency × N fois le débit d'un
+seul worker. Le générateur de charge tourne sur la même machine et prend sa
+part du CPU.
+
+Usage: python benchmarks/bench_server.py [--workers 1,2,4] [--duration 10] [--concurrency 16]
+       [--min-efficiency 0.6]
+"""
+import argparse
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT_DIR, "benchmarks", "fixtures")
+FIXTURE_PAGES = ["cookie_policy.html", "privacy_policy.html", "terms_of_service.html"]
+DOCUMENT_PATH = re.compile(r"/doc/(\d+)")
+
+STARTUP_TIMEOUT = 30
+
+class DocumentServer:
+    """Serveur HTTP local: /doc/<n> est une page du corpus avec une phrase propre à n"""
+
+    def __init__(self):
+        pages = []
+        for name in FIXTURE_PAGES:
+            with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+                pages.append(f.read())
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                match = DOCUMENT_PATH.fullmatch(self.path)
+                if not match:
+                    self.send_error(404)
+                    return
+                number = int(match.group(1))
+                html = pages[number % len(pages)]
+                body = html.replace("<main>", f"<main><p>Document {number}.</p>", 1).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, name="documents", daemon=True).start()
+
+    def url(self, number):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/doc/{number}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(workers, threads, port, cache_db):
+    """Lance main.py serve et attend que /health réponde
+
+    Toutes les requêtes viennent de la même adresse et chaque thread peut
+    traiter une analyse: ni limite par client, ni refus faute de place.
+    """
+    env = dict(os.environ, GROQ_API_KEY="", TRUSTADVISOR_CACHE_DB=cache_db, TRUSTADVISOR_CLIENT_RPM="0",
+               TRUSTADVISOR_MAX_ACTIVE=str(threads), TRUSTADVISOR_MAX_QUEUE=str(threads))
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT_DIR, "main.py"), "serve",
+         "--workers", str(workers), "--threads", str(threads), "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    pids = set()
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"❌ Le serveur s'est arrêté au démarrage (code {process.returncode})")
+        try:
+            pids.add(requests.get(f"http://127.0.0.1:{port}/health", timeout=1).json()["pid"])
+        except requests.RequestException:
+            time.sleep(0.1)
+            continue
+        if len(pids) >= workers:
+            return process
+    # Tous les workers n'ont pas forcément répondu: le serveur répond, on continue
+    if pids:
+        return process
+    stop_server(process)
+    raise SystemExit("❌ Le serveur ne répond pas")
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=STARTUP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+def run_load(port, documents, duration, concurrency):
+    """Requêtes /analyze concurrentes pendant `duration` secondes: (réussites, échecs, durées)"""
+    lock = threading.Lock()
+    counter = iter(range(10 ** 9))
+    durations = []
+    failures = [0]
+    stop_at = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < stop_at:
+            with lock:
+                number = next(counter)
+            started = time.perf_counter()
+            try:
+                response = session.post(f"http://127.0.0.1:{port}/analyze",
+                                        json={"urls": [documents.url(number)]}, timeout=60)
+                ok = response.status_code == 200 and response.json()["analyzed_count"] == 1
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    durations.append(elapsed)
+                else:
+                    failures[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return durations, failures[0], time.monotonic() - started
+
+def percentile(sorted_values, fraction):
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="nombres de workers testés, séparés par des virgules")
+    parser.add_argument("--threads", type=int, default=8, help="threads par worker")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=16, help="requêtes simultanées")
+    parser.add_argument("--min-efficiency", type=float, default=0.6)
+    args = parser.parse_args()
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        raise SystemExit("❌ gunicorn n'est pas installé (pip install gunicorn)")
+
+    cores = os.cpu_count() or 1
+    documents = DocumentServer()
+    results = {}
+    try:
+        for workers in [int(value) for value in args.workers.split(",")]:
+            with tempfile.TemporaryDirectory() as directory:
+                process = start_server(workers, args.threads, free_port(), os.path.join(directory, "cache.sqlite3"))
+                try:
+                    port = int(process.args[process.args.index("--port") + 1])
+                    durations, failures, elapsed = run_load(port, documents, args.duration, args.concurrency)
+                finally:
+                    stop_server(process)
+            durations.sort()
+            if not durations:
+                raise SystemExit(f"❌ Aucune requête réussie avec {workers} worker(s)")
+            results[workers] = len(durations) / elapsed
+            print(f"⏱️ {workers} worker(s): {results[workers]:.1f} req/s, "
+                  f"p50 {percentile(durations, 0.5) * 1000:.0f} ms, p99 {percentile(durations, 0.99) * 1000:.0f} ms, "
+                  f"{failures} échec(s)")
+            if failures:
+                raise SystemExit(f"❌ {failures} requête(s) en échec avec {workers} worker(s)")
+    finally:
+        documents.close()
+
+    baseline_workers = min(results)
+    baseline = results[baseline_workers] / baseline_workers
+    failed = []
+    for workers, rps in results.items():
+        expected = baseline * min(workers, cores) * args.min_efficiency
+        print(f"📈 {workers} worker(s): x{rps / results[baseline_workers]:.2f} ({min(workers, cores)} cœur(s) utilisables)")
+        if workers != baseline_workers and rps < expected:
+            failed.append(f"{workers} worker(s): {rps:.1f} req/s < {expected:.1f} req/s attendus")
+    if failed:
+        raise SystemExit("❌ Débit insuffisant:\n" + "\n".join(failed))
+    print(f"✅ Débit proportionnel aux workers jusqu'à {cores} cœur(s)")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,284 @@
+"""Benchmark par étape de l'analyse, hors ligne, avec détection des régressions
+
+Chronomètre séparément l'extraction HTML (celle de fetch_page_content),
+analyze_keywords_advanced, extract_structured_data, extract_critical_sentences,
+la génération du résumé (build_analysis_result + render_summary), la passerelle
+Groq et l'aller-retour complet /analyze. Le corpus est celui de
+benchmarks/fixtures (petites et moyennes pages) plus une très grande page
+(~2 Mo) construite à partir de ces pages. /analyze télécharge les pages depuis
+un serveur HTTP local et résume avec un faux client Groq, caches vidés à
+chaque appel: aucun accès réseau ni clé d'API n'est nécessaire.
+
+Les résultats (débit, p50/p95/p99 en ms) sont écrits en JSON. Avec --baseline,
+le script échoue si la médiane d'une mesure dépasse celle de référence de plus
+de --threshold (25 % par défaut).
+
+Usage: python benchmarks/bench_stages.py [--runs 30] [--output resultats.json]
+       [--save-baseline reference.json | --baseline reference.json [--threshold 0.25]]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Pages du corpus, de la plus petite à la plus grande
+FIXTURE_PAGES = ["cookie_policy.html", "privacy_policy.html", "terms_of_service.html"]
+VERY_LARGE_PAGE = "very_large.html"
+VERY_LARGE_SIZE = 2 * 1024 * 1024
+
+# Écart minimal (ms) pour signaler une régression: en dessous, c'est du bruit de mesure
+MIN_REGRESSION_MS = 0.05
+
+class FakeGroqClient:
+    """Client factice avec l'interface de groq.Groq utilisée par GroqGateway"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, max_tokens, temperature, timeout):
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = messages[-1]["content"]
+        content = (
+            "1. 🎯 Objectif: décrire la collecte et l'utilisation des données.\n"
+            "2. ⚠️ Partage avec des tiers à des fins publicitaires.\n"
+            "3. ✅ Droits d'accès et de suppression."
+        )
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4),
+        )
+
+def load_corpus():
+    """{nom: html} pour les pages enregistrées et la très grande page"""
+    corpus = {}
+    for name in FIXTURE_PAGES:
+        with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+            corpus[name] = f.read()
+    corpus[VERY_LARGE_PAGE] = very_large_page(corpus, VERY_LARGE_SIZE)
+    return corpus
+
+def very_large_page(corpus, size):
+    """Page de `size` octets environ: les corps des pages du corpus noyés dans du balisage et des scripts"""
+    bodies = "".join(html[html.index("<main>"):html.index("</main>") + len("</main>")] for html in corpus.values())
+    noise = "<script>" + "var x = 1;" * 400 + "</script><nav>" + "<a href='#'>link</a>" * 50 + "</nav>"
+    block = f"<div class='section'>{noise}{bodies}</div>"
+    return "<html><body>" + block * (size // len(block) + 1) + "</body></html>"
+
+class FixtureServer:
+    """Serveur HTTP local qui sert le corpus (une page par chemin)"""
+
+    def __init__(self, corpus):
+        pages = {f"/{name}": html.encode("utf-8") for name, html in corpus.items()}
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # En-têtes et corps partent sans attendre l'ACK
+
+            def do_GET(self):
+                body = pages.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                # Le client coupe la connexion dès qu'il a assez de texte (arrêt anticipé)
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, name="fixtures", daemon=True).start()
+
+    def url(self, name):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/{name}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def memory_cache(ttl=timedelta(hours=1)):
+    """Cache sans stockage SQLite, pour ne pas toucher au cache du serveur"""
+    return main.AnalysisCache(None, ttl, timedelta(0), main.CACHE_MAX_BYTES, 0)
+
+def install_offline_services(llm_latency):
+    """Remplace le client Groq et les caches du module par des versions locales"""
+    client = FakeGroqClient(llm_latency)
+    main.groq_client = client
+    main.groq_gateway = main.GroqGateway(client, memory_cache(), requests_per_minute=10 ** 9,
+                                         split_sections=main.groq_sections, section_weight=main.keyword_density)
+    main.analysis_cache = memory_cache()
+    main.document_cache = memory_cache()
+    main.block_cache = memory_cache()
+    main.document_versions = memory_cache()
+    main.redirect_cache = memory_cache()
+    main.near_duplicates = main.NearDuplicateIndex(None)
+    # Toutes les requêtes viennent de la même adresse: pas de limite par client
+    main.admission = main.AdmissionControl(client_rate_per_minute=0)
+
+def reset_caches():
+    """Chaque aller-retour /analyze refait tout le travail (téléchargement compris)"""
+    main.analysis_cache.clear()
+    main.document_cache.clear()
+    main.block_cache.clear()
+    main.document_versions.clear()
+    main.redirect_cache.clear()
+    main.groq_gateway.cache.clear()
+    main.clear_page_contents()
+    main.page_fetcher.clear()
+
+def percentile(sorted_values, fraction):
+    """Percentile au rang le plus proche"""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+def measure(func, runs, size=None, before=None):
+    """Appelle func() `runs` fois (après un appel de chauffe) et résume les durées"""
+    if before:
+        before()
+    func()
+    durations = []
+    for _ in range(runs):
+        if before:
+            before()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    total = sum(durations)
+    stats = {
+        "runs": runs,
+        "ops_per_s": round(runs / total, 2) if total else None,
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(durations, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 4),
+        "mean_ms": round(total / runs * 1000, 4),
+    }
+    if size is not None:
+        stats["bytes"] = size
+        stats["mb_per_s"] = round(size * runs / total / 1024 / 1024, 2) if total else None
+    return stats
+
+def run_benchmarks(corpus, server, runs):
+    """{"étape/page": statistiques} pour chaque étape et chaque page du corpus"""
+    client = main.app.test_client()
+    results = {}
+    for name, html in corpus.items():
+        url = server.url(name)
+        text = main.extract_page_text(html)
+        analysis = main.analyze_content(text)
+        ai_summary = main.groq_gateway.summarize(text, "127.0.0.1")
+
+        def summary():
+            result = main.build_analysis_result(url, text, *analysis, ai_summary)
+            return main.render_summary(result)
+
+        def round_trip():
+            response = client.post("/analyze", json={"urls": [url]})
+            if response.status_code != 200 or response.get_json()["analyzed_count"] != 1:
+                raise SystemExit(f"❌ /analyze a échoué pour {name}: {response.status_code} {response.get_data(as_text=True)[:200]}")
+
+        stages = [
+            ("parse", lambda: main.extract_page_text(html), len(html.encode("utf-8")), None),
+            ("keywords", lambda: main.analyze_keywords_advanced(text), len(text), None),
+            ("structured_data", lambda: main.extract_structured_data(text), len(text), None),
+            ("critical_sentences", lambda: main.extract_critical_sentences(text), len(text), None),
+            ("summary", summary, None, None),
+            ("groq", lambda: main.groq_gateway.summarize(text, "127.0.0.1"), None, main.groq_gateway.cache.clear),
+            ("analyze", round_trip, len(html.encode("utf-8")), reset_caches),
+        ]
+        for stage, func, size, before in stages:
+            results[f"{stage}/{name}"] = measure(func, runs, size, before)
+    return results
+
+def find_regressions(results, baseline, threshold):
+    """Mesures dont la médiane dépasse celle de référence de plus de `threshold`"""
+    regressions = []
+    for key, stats in results.items():
+        reference = baseline.get("results", {}).get(key)
+        if not reference:
+            continue
+        limit = reference["p50_ms"] * (1 + threshold)
+        if stats["p50_ms"] > limit and stats["p50_ms"] - reference["p50_ms"] > MIN_REGRESSION_MS:
+            regressions.append((key, reference["p50_ms"], stats["p50_ms"]))
+    return regressions
+
+def print_table(results):
+    print(f"{'mesure':<44} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'op/s':>10} {'Mo/s':>8}")
+    for key, stats in results.items():
+        mb_per_s = stats.get("mb_per_s")
+        print(f"{key:<44} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f} {stats['p99_ms']:>10.3f}"
+              f" {stats['ops_per_s']:>10.1f} {mb_per_s if mb_per_s is not None else '':>8}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="latence simulée du faux client Groq (secondes)")
+    parser.add_argument("--output", help="fichier JSON des résultats (sinon sur la sortie standard)")
+    parser.add_argument("--baseline", help="résultats de référence: échoue en cas de régression")
+    parser.add_argument("--save-baseline", help="enregistre les résultats comme référence")
+    parser.add_argument("--threshold", type=float, default=0.25, help="ralentissement toléré de la médiane (0.25 = 25 %%)")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    install_offline_services(args.llm_latency)
+    server = FixtureServer(corpus)
+    try:
+        # Les messages du serveur (une ligne par analyse) fausseraient la sortie JSON
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results = run_benchmarks(corpus, server, args.runs)
+    finally:
+        server.close()
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "runs": args.runs,
+        "threshold": args.threshold,
+        "results": results,
+    }
+    print_table(results)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if not args.output and not args.save_baseline:
+        print(json.dumps(report))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            for key, reference, current in regressions:
+                print(f"❌ Régression {key}: {reference:.3f} ms -> {current:.3f} ms (x{current / reference:.2f})")
+            sys.exit(1)
+        print(f"✅ Aucune régression au-delà de {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main_cli()
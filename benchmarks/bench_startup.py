@@ -0,0 +1,179 @@
+"""Démarrage à froid: temps d'import de main.py et délai avant la première réponse
+
+Mesure l'import de main.py avec python -X importtime (total et dépendances les
+plus coûteuses) et vérifie que groq, numpy et requests ne sont pas importés au
+démarrage. Lance ensuite le serveur de production (python main.py serve, un
+worker) dans chaque mode de préchauffage et mesure:
+- le délai entre le lancement du processus et la première réponse de /health;
+- la durée de la première analyse /analyze (envoyée --delay secondes après),
+  comparée à celle des analyses suivantes.
+Avec "preload" et "background", la première analyse ne doit pas coûter plus
+de --max-first-ratio fois une analyse ordinaire. Les pages analysées sont
+servies en local (voir bench_server.py), sans Groq.
+
+Les résultats sont écrits en JSON; avec --baseline, le script échoue si une
+mesure dépasse celle de référence de plus de --threshold (25 % par défaut).
+
+Usage: python benchmarks/bench_startup.py [--runs 3] [--delay 2] [--output resultats.json]
+       [--save-baseline reference.json | --baseline reference.json [--threshold 0.25]]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from bench_server import ROOT_DIR, DocumentServer, free_port, stop_server
+
+# Importés au premier usage seulement
+LAZY_MODULES = ["groq", "numpy", "requests"]
+WARM_UP_MODES = ["off", "background", "preload"]
+STEADY_ANALYSES = 5
+STARTUP_TIMEOUT = 60
+# Écart minimal (ms) pour signaler une régression: en dessous, c'est du bruit de mesure
+MIN_REGRESSION_MS = 20
+
+def measure_import():
+    """(durée totale en ms, {module: ms cumulées} des imports directs, modules importés)"""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                               cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    total = 0
+    direct = {}
+    children = {}  # Un module est listé après ses imports: ceux du niveau 1 attendent leur parent
+    imported = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        milliseconds = int(cumulative) / 1000
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        imported.add(name.split(".")[0])
+        if level == 1:
+            children[name] = milliseconds
+        elif level == 0:
+            if name == "main":
+                total, direct = milliseconds, children
+            children = {}
+    return total, direct, imported
+
+def start(mode, port, cache_db):
+    """Lance le serveur, attend la première réponse de /health: (processus, délai en ms)"""
+    env = dict(os.environ, GROQ_API_KEY="", TRUSTADVISOR_CACHE_DB=cache_db, TRUSTADVISOR_CLIENT_RPM="0")
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT_DIR, "main.py"), "serve",
+         "--workers", "1", "--port", str(port), "--warm-up", mode],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"❌ Le serveur s'est arrêté au démarrage (code {process.returncode})")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process, (time.perf_counter() - started) * 1000
+        except requests.RequestException:
+            time.sleep(0.01)
+    stop_server(process)
+    raise SystemExit("❌ Le serveur ne répond pas")
+
+def analyze(port, url):
+    started = time.perf_counter()
+    response = requests.post(f"http://127.0.0.1:{port}/analyze", json={"urls": [url]}, timeout=60)
+    if response.status_code != 200 or response.json()["analyzed_count"] != 1:
+        raise SystemExit(f"❌ /analyze a échoué: {response.status_code} {response.text[:200]}")
+    return (time.perf_counter() - started) * 1000
+
+def measure_mode(mode, documents, delay):
+    """{"first_response_ms", "first_analyze_ms", "steady_analyze_ms"} pour un démarrage"""
+    with tempfile.TemporaryDirectory() as directory:
+        port = free_port()
+        process, first_response = start(mode, port, os.path.join(directory, "cache.sqlite3"))
+        try:
+            time.sleep(delay)
+            # Une page différente par analyse: aucune ne vient du cache
+            first = analyze(port, documents.url(time.time_ns()))
+            steady = sorted(analyze(port, documents.url(time.time_ns())) for _ in range(STEADY_ANALYSES))
+        finally:
+            stop_server(process)
+    return {
+        "first_response_ms": round(first_response, 1),
+        "first_analyze_ms": round(first, 1),
+        "steady_analyze_ms": round(steady[len(steady) // 2], 1),
+    }
+
+def median_of_runs(runs):
+    return {key: sorted(run[key] for run in runs)[len(runs) // 2] for key in runs[0]}
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="démarrages par mode (la médiane est retenue)")
+    parser.add_argument("--delay", type=float, default=2, help="attente entre la première réponse et la première analyse (s)")
+    parser.add_argument("--max-first-ratio", type=float, default=1.5)
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    parser.add_argument("--baseline", help="résultats de référence: échoue en cas de régression")
+    parser.add_argument("--save-baseline", help="enregistre les résultats comme référence")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        raise SystemExit("❌ gunicorn n'est pas installé (pip install gunicorn)")
+
+    imports = [measure_import() for _ in range(args.runs)]
+    import_ms = sorted(total for total, _, _ in imports)[len(imports) // 2]
+    _, direct, imported = imports[-1]
+    heaviest = sorted(direct.items(), key=lambda item: item[1], reverse=True)[:5]
+    print(f"📦 import main: {import_ms:.0f} ms (" + ", ".join(f"{name} {ms:.0f} ms" for name, ms in heaviest) + ")")
+    eager = [name for name in LAZY_MODULES if name in imported]
+    if eager:
+        raise SystemExit(f"❌ Importés au démarrage: {', '.join(eager)}")
+    print(f"✅ {', '.join(LAZY_MODULES)} chargés au premier usage seulement")
+
+    results = {"import/main": {"import_ms": import_ms}}
+    documents = DocumentServer()
+    try:
+        for mode in WARM_UP_MODES:
+            stats = results[f"serve/{mode}"] = median_of_runs(
+                [measure_mode(mode, documents, args.delay) for _ in range(args.runs)]
+            )
+            print(f"⏱️ {mode:<10} première réponse {stats['first_response_ms']:>7.0f} ms, "
+                  f"première analyse {stats['first_analyze_ms']:>6.0f} ms, "
+                  f"analyse ordinaire {stats['steady_analyze_ms']:>6.0f} ms")
+    finally:
+        documents.close()
+
+    report = {"runs": args.runs, "delay": args.delay, "threshold": args.threshold, "results": results}
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    failures = []
+    for mode in ("background", "preload"):
+        stats = results[f"serve/{mode}"]
+        if stats["first_analyze_ms"] > stats["steady_analyze_ms"] * args.max_first_ratio:
+            failures.append(f"{mode}: première analyse {stats['first_analyze_ms']:.0f} ms, "
+                            f"analyse ordinaire {stats['steady_analyze_ms']:.0f} ms")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        for key, stats in results.items():
+            for name, value in stats.items():
+                reference = baseline.get(key, {}).get(name)
+                if reference and value > reference * (1 + args.threshold) and value - reference > MIN_REGRESSION_MS:
+                    failures.append(f"Régression {key} {name}: {reference:.0f} ms -> {value:.0f} ms")
+    if failures:
+        raise SystemExit("❌ " + "\n❌ ".join(failures))
+    print("✅ Première analyse sans surcoût d'initialisation une fois préchauffé")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,411 @@
+"""Téléchargement des pages (PageFetcher) et extraction de leur texte au fil de la lecture (HTMLTextExtractor)
+
+Module indépendant de main: PageFetcher peut être testé avec un serveur HTTP
+local, sans ouvrir les caches ni construire l'application.
+"""
+import codecs
+import html.entities
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from limits import DeadlineExceeded
+
+# Configuration
+FETCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
+}
+FETCH_TIMEOUT = 15
+FETCH_MAX_BYTES = int(os.getenv("TRUSTADVISOR_FETCH_MAX_BYTES", 3 * 1024 * 1024))
+FETCH_MAX_PER_HOST = int(os.getenv("TRUSTADVISOR_FETCH_MAX_PER_HOST", 4))
+FETCH_MAX_VALIDATORS = 500  # Pages dont on garde ETag/Last-Modified (le texte est dans FetchCache)
+# Texte conservé par document, analysé en entier par morceaux (borne la mémoire et le temps)
+MAX_TEXT_LENGTH = int(os.getenv("TRUSTADVISOR_MAX_TEXT_LENGTH", 300_000))
+
+class PageFetcher:
+    """Téléchargement des pages: session partagée, pools et limites par hôte, corps plafonné
+
+    Les durées de téléchargement et d'extraction sont ajoutées aux
+    histogrammes de `metrics` (main.Metrics) et chaque redirection suivie est
+    signalée à `on_redirect(source, cible)`, s'ils sont fournis.
+
+    Les validateurs (ETag, Last-Modified) sont conservés pour revalider une
+    page avec une requête conditionnelle, si l'appelant fournit le texte déjà
+    extrait (`cached_text`, pris dans FetchCache): une réponse 304 le
+    réutilise sans nouveau téléchargement ni parsing. Sans texte, la requête
+    est inconditionnelle.
+    """
+
+    def __init__(self, session=None, timeout=FETCH_TIMEOUT, max_bytes=FETCH_MAX_BYTES,
+                 max_per_host=FETCH_MAX_PER_HOST, max_validators=FETCH_MAX_VALIDATORS, metrics=None, on_redirect=None):
+        self._session = session
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_per_host = max_per_host
+        self.max_validators = max_validators
+        self.metrics = metrics
+        self.on_redirect = on_redirect
+        self.lock = threading.Lock()
+        self.host_slots = {}
+        self.validators = OrderedDict()  # url -> (etag, last_modified)
+        self.counters = {"requests": 0, "not_modified": 0, "early_stops": 0, "truncated": 0, "bytes": 0}
+
+    @property
+    def session(self):
+        """Session HTTP, créée au premier téléchargement"""
+        with self.lock:
+            if self._session is None:
+                self._session = self.create_session(self.max_per_host)
+            return self._session
+
+    @staticmethod
+    def create_session(max_per_host):
+        import requests
+        session = requests.Session()
+        session.headers.update(FETCH_HEADERS)
+        # Un pool de connexions par hôte (jusqu'à 100 hôtes gardés ouverts)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=100, pool_maxsize=max_per_host)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def host_slot(self, url):
+        """Sémaphore limitant les téléchargements simultanés vers un même hôte"""
+        host = urlsplit(url).netloc.lower()
+        with self.lock:
+            slot = self.host_slots.get(host)
+            if slot is None:
+                slot = self.host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def fetch_text(self, url, deadline=None, cached_text=None):
+        """Retourne le texte extrait de la page (lève requests.RequestException en cas d'échec)
+
+        `cached_text` est le texte gardé de la page, renvoyé si le serveur
+        confirme qu'elle n'a pas changé (304). Avec une échéance
+        (time.monotonic), chaque attente est bornée par le temps restant et
+        DeadlineExceeded est levée quand elle est atteinte.
+        """
+        import requests
+        timeout = self.timeout
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                raise DeadlineExceeded(url)
+        headers = {}
+        cached = None
+        if cached_text:
+            with self.lock:
+                cached = self.validators.get(url)
+        if cached:
+            etag, last_modified = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        started = time.perf_counter()
+        parse_seconds = 0.0
+        slot = self.host_slot(url)
+        if not slot.acquire(timeout=timeout):
+            if timeout < self.timeout:
+                raise DeadlineExceeded(url)
+            raise requests.Timeout(f"Trop de requêtes simultanées vers {urlsplit(url).netloc}")
+        try:
+            with self.session.get(url, headers=headers, timeout=timeout,
+                                  allow_redirects=True, stream=True) as response:
+                self.count("requests")
+                if response.status_code == 304 and cached:
+                    self.count("not_modified")
+                    with self.lock:
+                        self.validators.move_to_end(url)
+                    return cached_text
+                
+                response.raise_for_status()
+                if self.on_redirect:
+                    for hop in [url, *(previous.url for previous in response.history)]:
+                        self.on_redirect(hop, response.url)
+                text, parse_seconds = self.read_text(response, deadline)
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except requests.Timeout:
+            # Délai écourté par l'échéance de la requête: ce n'est pas une page trop lente
+            if timeout < self.timeout:
+                raise DeadlineExceeded(url) from None
+            raise
+        finally:
+            slot.release()
+            # L'extraction se fait pendant la lecture du corps: elle est mesurée à part
+            self.observe("fetch", time.perf_counter() - started - parse_seconds)
+
+        with self.lock:
+            if etag or last_modified:
+                self.validators[url] = (etag, last_modified)
+                self.validators.move_to_end(url)
+                while len(self.validators) > self.max_validators:
+                    self.validators.popitem(last=False)
+            else:
+                self.validators.pop(url, None)
+        return text
+
+    def read_text(self, response, deadline=None):
+        """Lit le corps en flux dans l'extracteur et s'arrête dès que le texte est complet
+
+        Retourne le texte et le temps passé à l'extraire (secondes). Une page
+        servie au compte-gouttes est abandonnée à l'échéance (DeadlineExceeded).
+        """
+        extractor = HTMLTextExtractor()
+        decoder = None
+        size = 0
+        parse_seconds = 0.0
+        for chunk in self.iter_body(response, deadline):
+            if decoder is None:
+                decoder = html_decoder(chunk, response.encoding)
+            size += len(chunk)
+            started = time.perf_counter()
+            extractor.feed(decoder.decode(chunk))
+            parse_seconds += time.perf_counter() - started
+            if extractor.done:
+                self.count("early_stops")
+                break
+            if size >= self.max_bytes:
+                self.count("truncated")
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                raise DeadlineExceeded(response.url)
+        self.count("bytes", size)
+        started = time.perf_counter()
+        if decoder is not None:
+            extractor.feed(decoder.decode(b"", final=True))
+        text = extractor.close()
+        parse_seconds += time.perf_counter() - started
+        self.observe("parse", parse_seconds)
+        return text, parse_seconds
+
+    @staticmethod
+    def iter_body(response, deadline, chunk_size=64 * 1024):
+        """Morceaux du corps décompressé
+
+        Sans échéance, chaque morceau est rempli avant d'être rendu. Avec une
+        échéance, chaque lecture rend ce qui est déjà arrivé (read1): une page
+        servie au compte-gouttes est contrôlée à chaque paquet reçu.
+        """
+        read1 = getattr(response.raw, "read1", None)  # urllib3 >= 2.3
+        if deadline is None or read1 is None:
+            yield from response.iter_content(chunk_size=chunk_size)
+            return
+        import requests
+        import urllib3
+        while True:
+            # Erreurs converties comme le fait iter_content (le délai reste un délai)
+            try:
+                chunk = read1(chunk_size, decode_content=True)
+            except urllib3.exceptions.ReadTimeoutError as e:
+                raise requests.ReadTimeout(e) from e
+            except urllib3.exceptions.HTTPError as e:
+                raise requests.ConnectionError(e) from e
+            if not chunk:
+                return
+            yield chunk
+
+    def observe(self, stage, seconds):
+        if self.metrics:
+            self.metrics.observe(stage, seconds)
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def clear(self):
+        with self.lock:
+            self.validators.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"validators": len(self.validators), **self.counters}
+
+META_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+
+def html_decoder(head, encoding):
+    """Décodeur incrémental pour l'encodage HTTP, sinon celui du <meta>, sinon UTF-8"""
+    if not encoding:
+        match = META_CHARSET_PATTERN.search(head[:4096])
+        encoding = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+# Balises supprimées avec leur contenu
+REMOVED_TAGS = {'script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe'}
+
+# Balises dont les chaînes ne sont pas du texte (sauf les sections CDATA)
+NON_TEXT_CONTAINERS = {'script', 'style', 'template', 'rt', 'rp'}
+
+# Balises vides (fermées implicitement)
+VOID_TAGS = {
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr', 'image',
+    'img', 'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid', 'param', 'source',
+    'spacer', 'track', 'wbr',
+}
+
+# Entités nommées, avec ou sans point-virgule final
+HTML_ENTITIES = {}
+for entity_name, entity_value in sorted(html.entities.html5.items()):
+    HTML_ENTITIES.setdefault(entity_name.rstrip(";"), entity_value)
+
+DECIMAL_REFERENCE = re.compile("^([0-9]+)(.*)")
+HEX_REFERENCE = re.compile("^([0-9a-f]+)(.*)")
+
+def numeric_character(code):
+    """Caractère d'une référence numérique (&#...;), selon les règles HTML5"""
+    if code == 0 or code > 0x10FFFF or 0xD800 <= code <= 0xDFFF:
+        return "\ufffd"
+    if 0x80 <= code <= 0x9F:
+        # Références encodées en Windows-1252 au lieu d'Unicode
+        try:
+            return bytes([code]).decode("cp1252")
+        except UnicodeDecodeError:
+            pass
+    return chr(code)
+
+class HTMLTextExtractor(HTMLParser):
+    """Extraction de texte événementielle, sans construire d'arbre
+
+    Produit le même texte que BeautifulSoup(html, 'html.parser') après
+    suppression de REMOVED_TAGS, get_text(' ', strip=True) et réduction des
+    espaces. Le contenu des balises ignorées est sauté au fil de l'eau et la
+    lecture s'arrête dès que max_chars caractères ont été produits.
+    """
+
+    def __init__(self, max_chars=MAX_TEXT_LENGTH):
+        super().__init__(convert_charrefs=False)
+        self.max_chars = max_chars
+        self.open_tags = []
+        self.open_counts = {}
+        self.removed_depth = 0
+        self.container_depth = 0
+        self.closed_void_tags = []
+        self.pending = []
+        self.words = []
+        self.length = -1  # longueur du texte produit (les séparateurs compris)
+        self.done = False
+
+    def feed(self, data):
+        # Par tranches, pour s'arrêter rapidement une fois le budget atteint
+        for start in range(0, len(data), 64 * 1024):
+            if self.done:
+                return
+            super().feed(data[start:start + 64 * 1024])
+
+    def close(self):
+        """Termine l'analyse et retourne le texte extrait"""
+        if not self.done:
+            super().close()
+            self.flush()
+        return " ".join(self.words)[:self.max_chars]
+
+    def flush(self, cdata=False):
+        """Termine la chaîne en cours (chaque balise, commentaire ou déclaration en termine une)"""
+        if not self.pending:
+            return
+        data = "".join(self.pending)
+        self.pending = []
+        if self.removed_depth or (self.container_depth and not cdata) or self.done:
+            return
+        for word in data.split():
+            self.words.append(word)
+            self.length += len(word) + 1
+        if self.length >= self.max_chars:
+            self.done = True
+
+    def push(self, tag):
+        self.open_tags.append(tag)
+        self.open_counts[tag] = self.open_counts.get(tag, 0) + 1
+        if tag in REMOVED_TAGS:
+            self.removed_depth += 1
+        if tag in NON_TEXT_CONTAINERS:
+            self.container_depth += 1
+
+    def pop_to(self, tag):
+        """Ferme la balise ouverte la plus récente de ce nom et celles ouvertes après elle"""
+        if not self.open_counts.get(tag):
+            return
+        while True:
+            closed = self.open_tags.pop()
+            self.open_counts[closed] -= 1
+            if closed in REMOVED_TAGS:
+                self.removed_depth -= 1
+            if closed in NON_TEXT_CONTAINERS:
+                self.container_depth -= 1
+            if closed == tag:
+                return
+
+    def handle_starttag(self, tag, attrs):
+        self.flush()
+        self.push(tag)
+        if tag in VOID_TAGS:
+            self.pop_to(tag)
+            self.closed_void_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.flush()
+        self.push(tag)
+        self.pop_to(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.closed_void_tags:
+            # </br> après <br>: balise déjà fermée, ce n'est pas une coupure de texte
+            self.closed_void_tags.remove(tag)
+            return
+        self.flush()
+        self.pop_to(tag)
+
+    def handle_data(self, data):
+        if not self.done:
+            self.pending.append(data)
+
+    def handle_charref(self, name):
+        base, pattern = 10, DECIMAL_REFERENCE
+        if name.startswith(("x", "X")):
+            base, pattern, name = 16, HEX_REFERENCE, name[1:]
+        try:
+            code, extra = int(name, base), ""
+        except ValueError:
+            # Référence sans point-virgule suivie de texte: seule la partie numérique compte
+            match = pattern.search(name)
+            code, extra = (int(match.group(1), base), match.group(2)) if match else (None, name)
+        if code is not None:
+            self.handle_data(numeric_character(code))
+        self.handle_data(extra)
+
+    def handle_entityref(self, name):
+        self.handle_data(HTML_ENTITIES.get(name, f"&{name}"))
+
+    def unknown_decl(self, data):
+        self.flush()
+        if data.upper().startswith("CDATA["):
+            # Les sections CDATA font partie du texte
+            self.handle_data(data[len("CDATA["):])
+            self.flush(cdata=True)
+
+    def handle_comment(self, data):
+        self.flush()
+
+    def handle_decl(self, decl):
+        self.flush()
+
+    def handle_pi(self, data):
+        self.flush()
+
+def extract_page_text(html):
+    """Extrait le texte utile d'une page HTML"""
+    extractor = HTMLTextExtractor()
+    extractor.feed(html)
+    return extractor.close()
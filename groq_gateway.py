@@ -0,0 +1,281 @@
+"""Accès à Groq (GroqGateway): cache des réponses, limites de débit et de concurrence, délais, map-reduce
+
+Module indépendant de main: la passerelle peut être testée avec un faux
+client (client.chat.completions.create) et un cache en mémoire.
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from limits import DeadlineExceeded, TokenBucket
+
+# Configuration
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GROQ_PROMPT_VERSION = "2"  # À incrémenter à chaque changement de prompt
+GROQ_TIMEOUT = float(os.getenv("TRUSTADVISOR_GROQ_TIMEOUT", 20))  # Délai maximal par résumé (secondes)
+# Textes longs: sections résumées en parallèle (map) puis notes fusionnées (reduce)
+GROQ_SECTION_LENGTH = int(os.getenv("TRUSTADVISOR_GROQ_SECTION_LENGTH", 6000))
+GROQ_MAX_SECTIONS = int(os.getenv("TRUSTADVISOR_GROQ_MAX_SECTIONS", 6))
+GROQ_REDUCE_SHARE = 0.4  # Part du délai réservée à la fusion
+GROQ_MAX_CONCURRENCY = int(os.getenv("TRUSTADVISOR_GROQ_CONCURRENCY", 4))
+GROQ_REQUESTS_PER_MINUTE = max(0.0, float(os.getenv("TRUSTADVISOR_GROQ_RPM", 30)))  # 0 = résumés IA désactivés
+GROQ_MAX_RETRIES = 3
+
+def build_groq_prompt(domain, excerpt):
+    return f"""Analyse cette politique de confidentialité et fournis un résumé en français.
+
+Politique de {domain}:
+{excerpt}
+
+Fournis un résumé structuré avec:
+1. 🎯 Objectif principal de la politique (1 ligne)
+2. ⚠️ Points d'attention (2-3 points critiques maximum)
+3. ✅ Points positifs (si pertinents, 1-2 maximum)
+
+Sois concis, précis et direct. Utilise un langage simple."""
+
+GROQ_SECTION_MAX_TOKENS = 200
+GROQ_EMPTY_SECTION = "RAS"  # Réponse attendue pour une section sans clause notable
+
+def build_groq_section_prompt(domain, section, index, count):
+    return f"""Voici la partie {index}/{count} de la politique de confidentialité de {domain}:
+{section}
+
+Relève en français, en 3 à 5 puces courtes, les clauses importantes pour l'utilisateur:
+vente ou partage de données, durées de conservation, droits, transferts, sécurité.
+Réponds uniquement "{GROQ_EMPTY_SECTION}" si cette partie n'en contient aucune."""
+
+def build_groq_reduce_prompt(domain, notes):
+    return f"""Voici des notes prises sur les différentes parties de la politique de confidentialité de {domain}:
+{notes}
+
+À partir de ces notes, fournis un résumé structuré en français avec:
+1. 🎯 Objectif principal de la politique (1 ligne)
+2. ⚠️ Points d'attention (2-3 points critiques maximum)
+3. ✅ Points positifs (si pertinents, 1-2 maximum)
+
+Sois concis, précis et direct. Utilise un langage simple."""
+
+def fixed_sections(text, min_length, max_length):
+    """Bornes (début, fin) de sections de `max_length` caractères (coupure par défaut)"""
+    return [(start, min(start + max_length, len(text))) for start in range(0, len(text), max_length)]
+
+class GroqGateway:
+    """Accès à Groq: cache des réponses par contenu, limites de débit et de concurrence, délais
+
+    Un résumé qui ne peut pas être obtenu (échec ou délai propre au résumé
+    dépassé) vaut None: le document est alors présenté avec l'analyse par
+    mots-clés seule. Un résumé interrompu par l'échéance de la requête lève
+    DeadlineExceeded: le résultat est partiel. Un débit nul
+    (TRUSTADVISOR_GROQ_RPM=0) désactive les résumés.
+
+    `cache` offre get(clé) -> (valeur, ...) ou None, set(clé, valeur) et
+    stats() (main.AnalysisCache). Les textes longs sont coupés par
+    `split_sections(texte, longueur minimale, longueur maximale)`, qui donne
+    les bornes (début, fin) des sections; s'il y en a trop, celles de plus
+    fort `section_weight(section)` sont gardées. Par défaut: coupures à
+    longueur fixe, premières sections gardées.
+    """
+
+    def __init__(self, client, cache, model=GROQ_MODEL, prompt_version=GROQ_PROMPT_VERSION,
+                 timeout=GROQ_TIMEOUT, max_concurrency=GROQ_MAX_CONCURRENCY,
+                 requests_per_minute=GROQ_REQUESTS_PER_MINUTE, max_retries=GROQ_MAX_RETRIES,
+                 section_length=GROQ_SECTION_LENGTH, max_sections=GROQ_MAX_SECTIONS,
+                 split_sections=None, section_weight=None):
+        self.client = client
+        self.cache = cache
+        self.model = model
+        self.prompt_version = prompt_version
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.section_length = section_length
+        self.max_sections = max_sections
+        self.split_sections = split_sections or fixed_sections
+        self.section_weight = section_weight
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.bucket = TokenBucket(requests_per_minute / 60, max(1, max_concurrency))
+        self.section_pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="groq")
+        self.lock = threading.Lock()
+        self.counters = {
+            "calls": 0, "cache_hits": 0, "retries": 0, "failures": 0, "deadline_exceeded": 0,
+            "sections": 0, "sections_dropped": 0,
+            "prompt_tokens": 0, "completion_tokens": 0, "latency_ms": 0.0,
+        }
+
+    def cache_key(self, kind, content):
+        """Empreinte du texte normalisé envoyé au modèle, du type de prompt, de sa version et du modèle"""
+        normalized = " ".join(content.split()).lower()
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        return f"{self.model}:{self.prompt_version}:{kind}:{digest}"
+
+    def summarize(self, text, domain, deadline=None):
+        """Résumé IA du texte, ou None (pas de client, échec ou délai propre au résumé dépassé)
+
+        Un texte plus long qu'une section est découpé en sections (les plus
+        chargées en mots-clés si elles sont trop nombreuses), résumées en
+        parallèle; leurs notes sont ensuite fusionnées en un seul résumé. Les
+        sections pas terminées à temps sont ignorées. L'échéance donnée (celle
+        de la requête) ne peut qu'écourter le délai propre au résumé; si c'est
+        elle qui interrompt le résumé, DeadlineExceeded est levée.
+        """
+        if not self.client or not self.bucket.rate:
+            return None
+        
+        limit = time.monotonic() + self.timeout
+        request_bound = deadline is not None and deadline < limit
+        deadline = deadline if request_bound else limit
+        try:
+            sections = self.select_sections(text)
+            if len(sections) == 1:
+                return self.complete("summary", build_groq_prompt(domain, sections[0]), sections[0], deadline)
+            
+            notes = self.summarize_sections(sections, domain, deadline)
+            if not notes:
+                return None
+            combined = "\n\n".join(notes)
+            return self.complete("reduce", build_groq_reduce_prompt(domain, combined), combined, deadline)
+        except DeadlineExceeded:
+            if request_bound:
+                raise
+            return None
+
+    def select_sections(self, text):
+        """Sections du texte (split_sections), au plus max_sections, dans l'ordre du texte"""
+        sections = [text[start:end] for start, end in
+                    self.split_sections(text, self.section_length // 4, self.section_length)]
+        if len(sections) <= self.max_sections:
+            return sections
+        if not self.section_weight:
+            return sections[:self.max_sections]
+        weights = [self.section_weight(section) for section in sections]
+        kept = sorted(range(len(sections)), key=lambda i: weights[i], reverse=True)[:self.max_sections]
+        return [sections[i] for i in sorted(kept)]
+
+    def summarize_sections(self, sections, domain, deadline):
+        """Notes de chaque section obtenues avant la part du délai réservée à la fusion"""
+        map_deadline = time.monotonic() + (deadline - time.monotonic()) * (1 - GROQ_REDUCE_SHARE)
+        futures = [
+            self.section_pool.submit(
+                self.complete, "section", build_groq_section_prompt(domain, section, index, len(sections)),
+                section, map_deadline, GROQ_SECTION_MAX_TOKENS
+            )
+            for index, section in enumerate(sections, 1)
+        ]
+        done, not_done = wait(futures, timeout=max(0, map_deadline - time.monotonic()))
+        for future in not_done:
+            future.cancel()
+        self.count("sections", len(sections))
+        self.count("sections_dropped", len(not_done))
+        notes = []
+        cut = bool(not_done)
+        for future in futures:
+            if future not in done:
+                continue
+            try:
+                note = future.result()
+            except DeadlineExceeded:
+                cut = True
+                continue
+            if note and note.strip() != GROQ_EMPTY_SECTION:
+                notes.append(note)
+        # Aucune note, faute de temps: le résumé n'a pas pu être fait
+        if cut and not notes:
+            raise DeadlineExceeded(domain)
+        return notes
+
+    def complete(self, kind, prompt, content, deadline, max_tokens=300):
+        """Réponse du modèle (depuis le cache si ce contenu a déjà été traité), None en cas
+        d'échec; DeadlineExceeded si l'échéance est atteinte avant la réponse"""
+        key = self.cache_key(kind, content)
+        cached = self.cache.get(key)
+        if cached:
+            self.count("cache_hits")
+            return cached[0]["summary"]
+        
+        response = self.call_with_limits(prompt, deadline, max_tokens)
+        if response:
+            self.cache.set(key, {"summary": response})
+        return response
+
+    def call_with_limits(self, prompt, deadline, max_tokens):
+        """Réponse du modèle, None en cas d'échec (erreur non temporaire, essais épuisés);
+        DeadlineExceeded si l'échéance est atteinte ou le serait avant l'essai suivant"""
+        if not self.slots.acquire(timeout=max(0, deadline - time.monotonic())):
+            self.count("deadline_exceeded")
+            raise DeadlineExceeded("groq")
+        try:
+            for attempt in range(self.max_retries + 1):
+                if not self.bucket.acquire(deadline):
+                    self.count("deadline_exceeded")
+                    raise DeadlineExceeded("groq")
+                remaining = deadline - time.monotonic()
+                try:
+                    return self.call(prompt, remaining, max_tokens)
+                except Exception as e:
+                    delay = self.retry_delay(e, attempt)
+                    now = time.monotonic()
+                    if now >= deadline or (delay is not None and attempt < self.max_retries and now + delay >= deadline):
+                        self.count("deadline_exceeded")
+                        print(f"⏱️ Résumé Groq interrompu par l'échéance: {e}")
+                        raise DeadlineExceeded("groq") from e
+                    if delay is None or attempt == self.max_retries:
+                        self.count("failures")
+                        print(f"❌ Erreur Groq: {e}")
+                        return None
+                    self.count("retries")
+                    time.sleep(delay)
+        finally:
+            self.slots.release()
+
+    def call(self, prompt, timeout, max_tokens):
+        started = time.monotonic()
+        self.count("calls")
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "Tu es un expert en protection des données qui analyse les politiques de confidentialité de manière critique et objective."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=max_tokens,
+                temperature=0.3,
+                timeout=timeout
+            )
+        finally:
+            self.count("latency_ms", (time.monotonic() - started) * 1000)
+        
+        usage = getattr(response, "usage", None)
+        if usage:
+            self.count("prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+            self.count("completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+        return response.choices[0].message.content
+
+    @staticmethod
+    def retry_delay(error, attempt):
+        """Attente avant nouvel essai (limite de débit ou erreur serveur), None si inutile"""
+        status = getattr(error, "status_code", None)
+        if status != 429 and not (status and status >= 500):
+            return None
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return 0.5 * 2 ** attempt + random.uniform(0, 0.25)
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def stats(self):
+        with self.lock:
+            calls = self.counters["calls"]
+            return {
+                **self.counters,
+                "latency_ms": round(self.counters["latency_ms"], 1),
+                "avg_latency_ms": round(self.counters["latency_ms"] / calls, 1) if calls else 0.0,
+                "cache": self.cache.stats(),
+            }
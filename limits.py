@@ -0,0 +1,36 @@
+"""Échéances des requêtes et limitation de débit (serveur, téléchargement des pages, Groq)"""
+import threading
+import time
+
+class DeadlineExceeded(Exception):
+    """Échéance de la requête atteinte avant la fin d'une étape"""
+
+class TokenBucket:
+    """Limiteur de débit: `rate` jetons par seconde, au plus `capacity` en réserve
+
+    Un débit nul (ou négatif) ne délivre aucun jeton: acquire() refuse aussitôt.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = max(0.0, rate)
+        self.capacity = capacity
+        self.tokens = capacity if self.rate else 0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, deadline):
+        """Prend un jeton, en attendant au plus jusqu'à `deadline` (time.monotonic)"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                if not self.rate:
+                    return False
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
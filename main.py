@@ -1,30 +1,157 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, request, jsonify, Response, send_file, stream_with_context
 from flask_cors import CORS
-import requests
-from bs4 import BeautifulSoup
 import re
-from groq import Groq
+import string
 from dotenv import load_dotenv
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import multiprocessing
+import argparse
+import gc
+import sys
+import uuid
 from functools import lru_cache
 import hashlib
+import heapq
+import json
+import math
+import sqlite3
+import threading
+import time
+import bisect
+import zlib
+from collections import Counter, OrderedDict
+from itertools import chain, combinations
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+# Modules du projet (après load_dotenv: ils lisent leur configuration à l'import)
+from fetcher import (FETCH_MAX_BYTES, MAX_TEXT_LENGTH, HTMLTextExtractor, PageFetcher,
+                     extract_page_text, html_decoder)
+from groq_gateway import GROQ_MAX_CONCURRENCY, GROQ_MODEL, GROQ_PROMPT_VERSION, GROQ_REQUESTS_PER_MINUTE, GroqGateway
+from limits import DeadlineExceeded, TokenBucket
+
+# Routes de l'API, enregistrées sur l'application par create_app()
+api = Blueprint("api", __name__)
 
 # Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-groq_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+GROQ_SECTION_SPREAD = 32  # Une fin de phrase sur 32 coupe une section de résumé (voir groq_sections)
+GROQ_CACHE_DURATION = timedelta(days=30)
+GROQ_CACHE_MAX_BYTES = 4 * 1024 * 1024
 
 # Cache des résultats (évite de re-analyser les mêmes URLs)
-analysis_cache = {}
 CACHE_DURATION = timedelta(hours=24)
+CACHE_STALE_DURATION = timedelta(hours=6)  # Résultat périmé servi pendant le rafraîchissement
+CACHE_MAX_BYTES = int(os.getenv("TRUSTADVISOR_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+CACHE_DB_PATH = os.getenv("TRUSTADVISOR_CACHE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_cache.sqlite3"))
+CACHE_DB_MAX_ENTRIES = int(os.getenv("TRUSTADVISOR_CACHE_DB_MAX_ENTRIES", 50000))
+REDIRECT_CACHE_MAX_BYTES = 1024 * 1024
+
+# Index des quasi-doublons (politiques générées à partir d'un même modèle)
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("TRUSTADVISOR_NEAR_DUPLICATE_THRESHOLD", 0.9))
+NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv("TRUSTADVISOR_NEAR_DUPLICATE_MAX_ENTRIES", 1_000_000))
+NEAR_DUPLICATE_BINS = 64
+NEAR_DUPLICATE_BANDS = 8  # 8 bandes de 8: ~99 % de chances de trouver un document similaire à 90 %
+NEAR_DUPLICATE_MAX_CANDIDATES = 50
+NEAR_DUPLICATE_MAX_WORDS = 20000
+
+# Rafraîchissement en arrière-plan des entrées populaires, avant leur expiration
+REFRESH_ENABLED = os.getenv("TRUSTADVISOR_REFRESH", "1") != "0"
+REFRESH_INTERVAL = float(os.getenv("TRUSTADVISOR_REFRESH_INTERVAL", 60))  # Secondes entre deux passes
+REFRESH_AHEAD = timedelta(hours=2)  # Rafraîchir une entrée populaire quand il lui reste moins que cela
+REFRESH_MIN_HITS = 3.0  # Accès (pondérés par leur ancienneté) pour qu'une entrée soit populaire
+REFRESH_HALF_LIFE = timedelta(hours=24)  # Demi-vie du poids d'un accès
+REFRESH_PER_MINUTE = max(0.0, float(os.getenv("TRUSTADVISOR_REFRESH_RPM", 6)))  # 0 = aucun rafraîchissement
+REFRESH_MAX_TRACKED = 10000  # Clés suivies sur disque (les plus récemment demandées)
+# Pages à préchauffer au démarrage et à garder fraîches (une URL par ligne, # pour commenter)
+PREWARM_FILE = os.getenv("TRUSTADVISOR_PREWARM_FILE")
+
+# Pool de threads partagé par toutes les requêtes
+ANALYSIS_WORKERS = int(os.getenv("TRUSTADVISOR_WORKERS", 8))
+
+# Serveur de production (python main.py serve): gunicorn, workers préforkés
+SERVER_HOST = os.getenv("TRUSTADVISOR_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("TRUSTADVISOR_PORT", 5000))
+SERVER_PROCESSES = int(os.getenv("TRUSTADVISOR_SERVER_PROCESSES", os.cpu_count() or 2))
+SERVER_THREADS = int(os.getenv("TRUSTADVISOR_SERVER_THREADS", 8))  # Requêtes simultanées par worker
+SERVER_TIMEOUT = 120  # Un worker bloqué plus longtemps est redémarré
+
+# Requêtes /analyze: échéance globale (attente dans la file comprise) et admission bornée par worker.
+# Les threads au-delà des places actives et en file répondent vite (refus, /health).
+REQUEST_DEADLINE = float(os.getenv("TRUSTADVISOR_REQUEST_DEADLINE", 25))  # Secondes
+REQUEST_DEADLINE_GRACE = 0.5  # Attente accordée après l'échéance aux étapes CPU déjà commencées
+ADMISSION_MAX_ACTIVE = int(os.getenv("TRUSTADVISOR_MAX_ACTIVE", max(1, SERVER_THREADS // 2)))
+ADMISSION_MAX_QUEUE = int(os.getenv("TRUSTADVISOR_MAX_QUEUE", SERVER_THREADS // 4))
+ADMISSION_MAX_WAIT = 5.0  # Attente maximale dans la file (secondes)
+CLIENT_REQUESTS_PER_MINUTE = max(0.0, float(os.getenv("TRUSTADVISOR_CLIENT_RPM", 60)))  # Par adresse IP, 0 = sans limite
+CLIENT_BURST = 10
+CLIENT_MAX_TRACKED = 10000  # Adresses suivies (les plus récentes)
+
+# Analyse en masse (CLI et API /jobs)
+BATCH_FETCH_CONCURRENCY = int(os.getenv("TRUSTADVISOR_BATCH_CONCURRENCY", 16))
+BATCH_PROCESSES = int(os.getenv("TRUSTADVISOR_BATCH_PROCESSES", os.cpu_count() or 2))
+BATCH_SCORE_SIZE = 64  # Documents notés ensemble (score_documents)
+BATCH_HTML_EXTENSIONS = (".html", ".htm")
+JOBS_DIR = os.getenv("TRUSTADVISOR_JOBS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs"))
+# Seuls les répertoires sous cette racine peuvent être analysés via l'API
+JOBS_INPUT_ROOT = os.path.abspath(os.getenv("TRUSTADVISOR_JOBS_INPUT_ROOT", os.path.dirname(os.path.abspath(__file__))))
+
+# Textes téléchargés gardés en mémoire, compressés, dans un budget en octets
+FETCH_CACHE_MAX_BYTES = int(os.getenv("TRUSTADVISOR_FETCH_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+FETCH_CACHE_DURATION = timedelta(hours=1)
+FETCH_CACHE_COMPRESSION = 6  # Niveau zlib: une fois par téléchargement, et décompression plus rapide qu'au niveau 1
+FETCH_CACHE_ENTRY_OVERHEAD = 200  # Octets comptés par entrée en plus du texte compressé (URL, objets)
+# Échecs gardés en cache (texte vide) selon leur type (voir fetch_error_type): un site
+# brièvement indisponible est réessayé vite, une page introuvable moins souvent
+FETCH_ERROR_DURATIONS = {
+    "timeout": timedelta(seconds=30),
+    "connection": timedelta(minutes=1),
+    "http_5xx": timedelta(minutes=1),
+    "http_4xx": timedelta(minutes=10),
+    "request": timedelta(minutes=5),
+    "unexpected": timedelta(minutes=1),
+}
+ANALYSIS_CHUNK_LENGTH = 20_000
+# Blocs du texte analysés séparément: une nouvelle version d'une page ne ré-analyse que ses blocs modifiés.
+# Un bloc se termine après une fin de phrase choisie d'après son contenu (une sur BLOCK_SPREAD en moyenne).
+BLOCK_MIN_LENGTH = 512
+BLOCK_MAX_LENGTH = 8192
+BLOCK_SPREAD = 8
+BLOCK_SENTENCE_END = re.compile(r"[.!?](?=\s)")
+BLOCK_CACHE_DURATION = timedelta(days=180)  # Les blocs d'une version servent encore à la suivante
+BLOCK_CACHE_MAX_BYTES = 16 * 1024 * 1024
+BLOCK_CACHE_MAX_ENTRIES = int(os.getenv("TRUSTADVISOR_BLOCK_CACHE_MAX_ENTRIES", 500_000))
+VERSION_DURATION = timedelta(days=365)  # Dernière version connue de chaque page (détection des changements)
+VERSION_MAX_BYTES = 4 * 1024 * 1024
+CHANGES_MAX_ITEMS = 5  # Phrases ajoutées / retirées citées dans les changements
+CHANGES_DATA_LABELS = {
+    "data_types": "Données collectées",
+    "retention_periods": "Durées de rétention",
+    "sharing_entities": "Partage avec",
+}
+CRITICAL_SENTENCES_LIMIT = 5  # Phrases critiques gardées par document (et par bloc)
+# Valeurs gardées par champ de données structurées dans un résultat (les premières du texte);
+# un champ coupé est listé dans structured_data_truncated
+STRUCTURED_VALUES_LIMIT = int(os.getenv("TRUSTADVISOR_STRUCTURED_VALUES_LIMIT", 1000))
+
+# Seuils des histogrammes de durée par étape (secondes)
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Paramètres d'URL qui ne changent pas le document servi
+TRACKING_PARAMETERS = {
+    "gclid", "gbraid", "wbraid", "dclid", "fbclid", "msclkid", "yclid", "twclid", "ttclid", "igshid",
+    "li_fat_id", "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ref_src", "spm",
+}
+TRACKING_PARAMETER_PREFIXES = ("utm_",)
+DEFAULT_PORTS = {"http": 80, "https": 443}
 
-# Catégories de mots-clés optimisées avec scoring
+# Catégories de mots-clés optimisées avec scoring (pack anglais; les autres
+# langues reprennent ces catégories et leurs poids, voir RULE_PACK_DEFINITIONS)
 KEYWORD_CATEGORIES = {
     "🍪 Cookies & Tracking": {
         "keywords": ["cookie", "tracking pixel", "web beacon", "analytics", "local storage", 
@@ -34,8 +161,7 @@ KEYWORD_CATEGORIES = {
     },
     "🔐 Données Personnelles": {
         "keywords": ["personal data", "personal information", "personally identifiable", 
-                    "sensitive data", "biometric", "health data", "financial data",
-                    "données personnelles", "informations personnelles"],
+                    "sensitive data", "biometric", "health data", "financial data"],
         "weight": 2.0,
         "critical": ["sensitive data", "biometric", "health data", "financial data"]
     },
@@ -47,8 +173,7 @@ KEYWORD_CATEGORIES = {
     },
     "✅ Droits Utilisateur": {
         "keywords": ["right to access", "right to delete", "right to opt-out", 
-                    "withdraw consent", "data portability", "right to object",
-                    "droit d'accès", "droit de suppression"],
+                    "withdraw consent", "data portability", "right to object"],
         "weight": 1.8,
         "critical": ["right to delete", "opt-out"]
     },
@@ -84,87 +209,1235 @@ KEYWORD_CATEGORIES = {
     }
 }
 
-# Patterns pour extraire des informations structurées
+# Patterns pour extraire des informations structurées: un déclencheur, puis la
+# première cible qui le suit dans la même phrase (patterns en minuscules,
+# appliqués au texte replié par fold_ascii_case). Pour le partage, la cible est
+# "with|to" suivi d'une entité ([\w\s]+) terminée par ",", "." ou " to".
 EXTRACTION_PATTERNS = {
-    "retention_periods": r"(?:retain|store|keep).*?(?:for|during)\s+(\d+\s+(?:days|months|years))",
-    "data_types": r"(?:collect|gather|obtain).*?(email|name|address|phone|ip address|location|payment)",
-    "sharing_entities": r"(?:share|disclose|transfer).*?(?:with|to)\s+([\w\s]+?)(?:,|\.|\s+to)",
+    "retention_periods": (r"retain|store|keep", r"(?:for|during)\s+(\d+\s+(?:days|months|years))"),
+    "data_types": (r"collect|gather|obtain", r"email|name|address|phone|ip address|location|payment"),
+    "sharing_entities": (r"share|disclose|transfer", r"(?:with|to)\s+"),
 }
 
-def get_cache_key(url):
-    """Génère une clé de cache pour l'URL"""
-    return hashlib.md5(url.encode()).hexdigest()
+# Dépendances lourdes chargées au premier usage (démarrage à froid rapide): groq
+# (httpx, pydantic) au premier résumé, requests au premier téléchargement, NumPy
+# au premier lot. TRUSTADVISOR_WARM_UP choisit quand les charger d'avance:
+# "preload" avant d'accepter les requêtes, "background" dans un thread après le
+# démarrage, "off" au premier usage (voir prepare_runtime).
+WARM_UP_MODES = ("preload", "background", "off")
+WARM_UP_MODE = os.getenv("TRUSTADVISOR_WARM_UP", "preload")
+
+class LazyGroqClient:
+    """Client Groq construit au premier accès (importer groq coûte plusieurs centaines de ms)"""
 
-def is_cache_valid(cache_entry):
-    """Vérifie si le cache est encore valide"""
-    if not cache_entry:
-        return False
-    timestamp = cache_entry.get("timestamp")
-    if not timestamp:
-        return False
-    return datetime.now() - timestamp < CACHE_DURATION
-
-@lru_cache(maxsize=100)
-def fetch_page_content(url):
-    """Récupère le contenu d'une page avec cache"""
+    def __init__(self, **options):
+        self.options = options
+        self.lock = threading.Lock()
+        self.client = None
+
+    def load(self):
+        with self.lock:
+            if self.client is None:
+                from groq import Groq
+                self.client = Groq(**self.options)
+            return self.client
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+# Les relances sont gérées par GroqGateway (délai global, respect du Retry-After)
+groq_client = LazyGroqClient(api_key=GROQ_API_KEY, max_retries=0) if GROQ_API_KEY else None
+
+np = None  # Importé par load_numpy()
+numpy_missing = False
+
+@lru_cache(maxsize=None)
+def load_numpy():
+    """NumPy, importé au premier lot à scorer; None s'il n'est pas installé (calcul document par document)"""
+    global np, numpy_missing
+    if np is None and not numpy_missing:
+        try:
+            import numpy as np
+        except ImportError:
+            numpy_missing = True
+            print("⚠️ NumPy n'est pas installé: scores calculés document par document (pip install numpy)")
+    return np
+
+def canonicalize_url(url):
+    """Forme canonique d'une URL: schéma et hôte en minuscules, sans port par défaut,
+    sans fragment ni paramètres de suivi, paramètres restants triés"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
-        }
-        
-        response = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
-        response.raise_for_status()
-        
-        # Parser avec BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Supprimer les éléments non pertinents
-        for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe']):
-            element.decompose()
-        
-        # Extraire le texte
-        text = soup.get_text(separator=' ', strip=True)
-        
-        # Nettoyer le texte
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'[\r\n]+', '\n', text)
-        
-        return text[:15000]  # Limiter à 15k caractères
+        host, port = parts.hostname or "", parts.port
+    except ValueError:
+        return url
+    if ":" in host:
+        host = f"[{host}]"
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMETERS and not name.lower().startswith(TRACKING_PARAMETER_PREFIXES)
+    ))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+def url_key(url):
+    return hashlib.md5(url.encode()).hexdigest()
+
+def get_cache_key(url):
+    """Génère une clé de cache pour l'URL: sa forme canonique, ou la page vers laquelle elle redirige"""
+    canonical = canonicalize_url(url)
+    target = resolve_redirect(canonical)
+    count_dedup("urls")
+    if canonical != url:
+        count_dedup("canonicalized")
+    if target != canonical:
+        count_dedup("redirects_resolved")
+    return url_key(target)
+
+def get_content_key(text):
+    """Empreinte du texte extrait normalisé (espaces et casse ignorés)"""
+    normalized = " ".join(text.split()).lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+# Réutilisation des analyses entre URLs (exposé dans /health)
+dedup_lock = threading.Lock()
+dedup_counters = {"urls": 0, "canonicalized": 0, "redirects_resolved": 0, "content_hits": 0, "content_misses": 0,
+                  "blocks_reused": 0, "blocks_analyzed": 0}
+
+def count_dedup(name, amount=1):
+    with dedup_lock:
+        dedup_counters[name] += amount
+
+def dedup_stats():
+    with dedup_lock:
+        counters = dict(dedup_counters)
+    urls = counters["urls"]
+    analyses = counters["content_hits"] + counters["content_misses"]
+    blocks = counters["blocks_reused"] + counters["blocks_analyzed"]
+    return {
+        **counters,
+        "url_rewrite_ratio": round((counters["canonicalized"] + counters["redirects_resolved"]) / urls, 3) if urls else 0.0,
+        "content_dedup_ratio": round(counters["content_hits"] / analyses, 3) if analyses else 0.0,
+        "block_reuse_ratio": round(counters["blocks_reused"] / blocks, 3) if blocks else 0.0,
+    }
+
+class Metrics:
+    """Histogrammes de durée par étape et compteurs, exportés au format texte Prometheus
+
+    Les durées mesurées pendant une analyse tracée (voir trace()) sont aussi
+    cumulées dans un dictionnaire propre à cette analyse.
+    """
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.histograms = {}  # étape -> [compteurs par seuil (+Inf compris), somme]
+        self.counters = {}  # (nom, étiquettes triées) -> valeur
+        self.local = threading.local()
+
+    @contextmanager
+    def stage(self, name):
+        """Chronomètre le bloc et l'ajoute à l'histogramme de l'étape"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def observe(self, name, seconds):
+        timings = getattr(self.local, "timings", None)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + seconds * 1000
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[index] += 1
+            histogram[-1] += seconds
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def trace(self):
+        """Cumule les durées des étapes exécutées dans ce thread: {étape: ms}"""
+        previous = getattr(self.local, "timings", None)
+        timings = self.local.timings = {}
+        try:
+            yield timings
+        finally:
+            self.local.timings = previous
+
+    def render(self, values=()):
+        """Texte Prometheus; `values` ajoute des séries (nom, type, étiquettes, valeur) lues ailleurs"""
+        lines = []
+        with self.lock:
+            histograms = {name: list(histogram) for name, histogram in self.histograms.items()}
+            counters = dict(self.counters)
+
+        name = "trustadvisor_stage_duration_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        for stage, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), histogram):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram[-1]:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {cumulative}')
+
+        series = [(name, "counter", labels, value) for (name, labels), value in counters.items()]
+        series += [(name, kind, tuple(sorted(labels.items())), value) for name, kind, labels, value in values]
+        declared = set()
+        for name, kind, labels, value in sorted(series, key=lambda s: (s[0], s[2])):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+            label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+class AnalysisCache:
+    """Cache de résultats JSON: LRU en mémoire (TTL + budget en octets) au-dessus d'un stockage SQLite
+
+    Chaque cache a sa propre table. Le fichier SQLite est partagé par tous les processus serveur et survit aux
+    redémarrages. La couche mémoire est propre à chaque processus: un vidage incrémente la génération du cache
+    (table cache_generations), et chaque processus oublie sa mémoire quand elle n'est plus de la génération
+    courante, avant d'en servir un résultat.
+    """
+
+    def __init__(self, db_path, ttl, stale_ttl, max_bytes, max_db_entries, table="analyses"):
+        self.db_path = db_path
+        self.table = table
+        self.ttl = ttl.total_seconds()
+        self.stale_ttl = stale_ttl.total_seconds()
+        self.max_bytes = max_bytes
+        self.max_db_entries = max_db_entries
+        self.lock = threading.RLock()
+        self.entries = OrderedDict()  # clé -> (horodatage, taille, résultat)
+        self.current_bytes = 0
+        self.refreshing = set()
+        self.writes_since_prune = 0
+        self.generation = 0
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "disk_hits": 0,
+                         "invalidations": 0}
+        self.db = None
+        self.open_db()
+
+    def open_db(self):
+        """Ouvre le stockage SQLite (désactivé si le fichier est inaccessible)"""
+        if not self.db_path:
+            return
+        try:
+            self.db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, created_at REAL NOT NULL, accessed_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            self.db.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed_at ON {self.table} (accessed_at)")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS cache_generations (name TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+            )
+            self.generation = self.db_generation()
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache disque désactivé ({self.db_path}): {e}")
+            self.db = None
+
+    def db_generation(self):
+        """Génération du cache sur disque, incrémentée à chaque vidage (par n'importe quel processus)"""
+        try:
+            row = self.db.execute("SELECT generation FROM cache_generations WHERE name = ?", (self.table,)).fetchone()
+        except sqlite3.Error:
+            return self.generation
+        return row[0] if row else 0
+
+    def sync_generation(self):
+        """Oublie la mémoire de ce processus si le cache a été vidé depuis par un autre (sous self.lock)"""
+        if not self.db:
+            return
+        generation = self.db_generation()
+        if generation != self.generation:
+            if self.entries:
+                self.counters["invalidations"] += 1
+            self.entries.clear()
+            self.current_bytes = 0
+            self.generation = generation
+
+    def close_db(self):
+        """Ferme le stockage SQLite: une connexion ne doit pas être utilisée dans un processus forké"""
+        with self.lock:
+            if self.db:
+                self.db.close()
+                self.db = None
+
+    def freshness(self, created_at, now):
+        """Retourne "fresh", "stale" ou None (expiré)"""
+        age = now - created_at
+        if age < self.ttl:
+            return "fresh"
+        if age < self.ttl + self.stale_ttl:
+            return "stale"
+        return None
+
+    def get(self, key):
+        """Retourne (résultat, périmé) ou None si absent ou expiré"""
+        now = time.time()
+        with self.lock:
+            self.sync_generation()
+            entry = self.entries.get(key)
+            if entry:
+                state = self.freshness(entry[0], now)
+                if state:
+                    self.entries.move_to_end(key)
+                    return self.record_hit(entry[2], state)
+                self.remove(key)
+                self.counters["expirations"] += 1
+
+            row = self.db_get(key)
+            if row:
+                created_at, value = row
+                state = self.freshness(created_at, now)
+                if state:
+                    self.counters["disk_hits"] += 1
+                    result = json.loads(value)
+                    self.store(key, created_at, len(value.encode("utf-8")), result)
+                    return self.record_hit(result, state)
+
+            self.counters["misses"] += 1
+            return None
+
+    def get_many(self, keys):
+        """{clé: résultat} des entrées présentes parmi `keys` (périmées comprises); celles
+        absentes de la mémoire sont lues sur disque en une seule requête"""
+        now = time.time()
+        found = {}
+        with self.lock:
+            self.sync_generation()
+            missing = []
+            for key in dict.fromkeys(keys):
+                entry = self.entries.get(key)
+                state = self.freshness(entry[0], now) if entry else None
+                if state:
+                    self.entries.move_to_end(key)
+                    found[key] = self.record_hit(entry[2], state)[0]
+                    continue
+                if entry:
+                    self.remove(key)
+                    self.counters["expirations"] += 1
+                missing.append(key)
+            
+            for key, created_at, value in self.db_get_many(missing):
+                state = self.freshness(created_at, now)
+                if state:
+                    self.counters["disk_hits"] += 1
+                    result = json.loads(value)
+                    self.store(key, created_at, len(value.encode("utf-8")), result)
+                    found[key] = self.record_hit(result, state)[0]
+            self.counters["misses"] += sum(1 for key in missing if key not in found)
+        return found
+
+    def record_hit(self, result, state):
+        if state == "stale":
+            self.counters["stale_hits"] += 1
+            return result, True
+        self.counters["hits"] += 1
+        return result, False
+
+    def set(self, key, result):
+        """Met en cache un résultat (sérialisable en JSON)"""
+        value = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+        now = time.time()
+        with self.lock:
+            self.store(key, now, len(value.encode("utf-8")), result)
+            self.refreshing.discard(key)
+            self.db_set(key, now, value)
+
+    def set_many(self, results):
+        """Met en cache plusieurs résultats ({clé: résultat}), écrits sur disque en une transaction"""
+        values = {key: json.dumps(result, ensure_ascii=False, separators=(",", ":")) for key, result in results.items()}
+        now = time.time()
+        with self.lock:
+            for key, value in values.items():
+                self.store(key, now, len(value.encode("utf-8")), results[key])
+                self.refreshing.discard(key)
+            self.db_set_many(now, values)
+
+    def store(self, key, created_at, size, result):
+        """Insère en mémoire puis évince les entrées les moins récemment utilisées"""
+        if key in self.entries:
+            self.remove(key)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (created_at, size, result)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self.remove(oldest)
+            self.counters["evictions"] += 1
+
+    def remove(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.current_bytes -= size
+
+    def begin_refresh(self, key):
+        """Réserve le rafraîchissement d'une entrée périmée (un seul à la fois par clé)"""
+        with self.lock:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            return True
+
+    def end_refresh(self, key):
+        with self.lock:
+            self.refreshing.discard(key)
+
+    def created_at(self, key):
+        """Horodatage de l'entrée (mémoire, sinon disque), sans la compter comme un accès; None si absente"""
+        with self.lock:
+            self.sync_generation()
+            entry = self.entries.get(key)
+            if entry:
+                return entry[0]
+            if not self.db:
+                return None
+            try:
+                row = self.db.execute(f"SELECT created_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error:
+                return None
+            return row[0] if row else None
+
+    def fresh_version(self, key):
+        """Horodatage de l'entrée si elle est fraîche (sa version), sans la compter comme un accès; sinon None"""
+        created_at = self.created_at(key)
+        if created_at is None or self.freshness(created_at, time.time()) != "fresh":
+            return None
+        return created_at
+
+    def db_get(self, key):
+        if not self.db:
+            return None
+        try:
+            row = self.db.execute(f"SELECT created_at, value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row:
+                self.db.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return row
+        except sqlite3.Error as e:
+            print(f"⚠️ Lecture du cache disque impossible: {e}")
+            return None
+
+    def db_set(self, key, created_at, value):
+        if not self.db:
+            return
+        try:
+            self.db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, created_at, accessed_at, value) VALUES (?, ?, ?, ?)",
+                (key, created_at, created_at, value)
+            )
+            self.writes_since_prune += 1
+            if self.writes_since_prune >= 100:
+                self.prune_db()
+        except sqlite3.Error as e:
+            print(f"⚠️ Écriture du cache disque impossible: {e}")
+
+    def db_get_many(self, keys, batch_size=500):
+        """[(clé, created_at, valeur)] des clés présentes sur disque"""
+        if not self.db or not keys:
+            return []
+        rows = []
+        try:
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                placeholders = ",".join("?" * len(batch))
+                found = self.db.execute(
+                    f"SELECT key, created_at, value FROM {self.table} WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                if found:
+                    self.db.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key IN ({placeholders})",
+                                    [time.time(), *batch])
+                rows += found
+        except sqlite3.Error as e:
+            print(f"⚠️ Lecture du cache disque impossible: {e}")
+        return rows
+
+    def db_set_many(self, created_at, values):
+        if not self.db or not values:
+            return
+        try:
+            self.db.execute("BEGIN")
+            try:
+                self.db.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, created_at, accessed_at, value) VALUES (?, ?, ?, ?)",
+                    [(key, created_at, created_at, value) for key, value in values.items()]
+                )
+                self.db.execute("COMMIT")
+            except sqlite3.Error:
+                self.db.execute("ROLLBACK")
+                raise
+            self.writes_since_prune += len(values)
+            if self.writes_since_prune >= 100:
+                self.prune_db()
+        except sqlite3.Error as e:
+            print(f"⚠️ Écriture du cache disque impossible: {e}")
+
+    def prune_db(self):
+        """Supprime les entrées expirées et limite le nombre d'entrées sur disque"""
+        self.writes_since_prune = 0
+        expired_before = time.time() - self.ttl - self.stale_ttl
+        self.db.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (expired_before,))
+        self.db.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_db_entries,)
+        )
+
+    def db_count(self):
+        if not self.db:
+            return 0
+        try:
+            with self.lock:
+                return self.db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def clear(self):
+        """Vide la mémoire de ce processus et le stockage partagé; les autres processus oublient
+        leur mémoire à leur prochaine lecture (nouvelle génération)"""
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+            if self.db:
+                try:
+                    self.db.execute("BEGIN")
+                    try:
+                        self.db.execute(f"DELETE FROM {self.table}")
+                        self.db.execute(
+                            "INSERT INTO cache_generations (name, generation) VALUES (?, 1) "
+                            "ON CONFLICT (name) DO UPDATE SET generation = generation + 1", (self.table,)
+                        )
+                        self.db.execute("COMMIT")
+                    except sqlite3.Error:
+                        self.db.execute("ROLLBACK")
+                        raise
+                    self.generation = self.db_generation()
+                except sqlite3.Error as e:
+                    print(f"⚠️ Impossible de vider le cache disque: {e}")
+
+    def stats(self):
+        with self.lock:
+            lookups = self.counters["hits"] + self.counters["stale_hits"] + self.counters["misses"]
+            return {
+                "entries": len(self.entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "disk_entries": self.db_count(),
+                "generation": self.generation,
+                "hit_rate": round((lookups - self.counters["misses"]) / lookups, 3) if lookups else 0.0,
+                **self.counters,
+            }
+
+    def __len__(self):
+        return len(self.entries)
+
+# Résultats structurés (AnalysisResult.to_row); la table "analyses" contenait l'ancien texte rendu
+analysis_cache = AnalysisCache(CACHE_DB_PATH, CACHE_DURATION, CACHE_STALE_DURATION, CACHE_MAX_BYTES,
+                               CACHE_DB_MAX_ENTRIES, table="results")
+
+# Résultats indexés par le texte extrait: une URL qui sert un texte déjà analysé les réutilise
+document_cache = AnalysisCache(CACHE_DB_PATH, CACHE_DURATION, timedelta(0), CACHE_MAX_BYTES,
+                               CACHE_DB_MAX_ENTRIES, table="documents")
+
+# Résultats partiels des blocs de texte, par empreinte du bloc et des règles (voir analyze_block)
+block_cache = AnalysisCache(CACHE_DB_PATH, BLOCK_CACHE_DURATION, timedelta(0), BLOCK_CACHE_MAX_BYTES,
+                            BLOCK_CACHE_MAX_ENTRIES, table="blocks")
+
+# Dernière version analysée de chaque page (ses blocs), pour signaler ce qui a changé
+document_versions = AnalysisCache(CACHE_DB_PATH, VERSION_DURATION, timedelta(0), VERSION_MAX_BYTES,
+                                  CACHE_DB_MAX_ENTRIES, table="versions")
+
+# Redirections suivies: URL canonique -> {"url": URL canonique de la page finale}
+redirect_cache = AnalysisCache(CACHE_DB_PATH, CACHE_DURATION, timedelta(0), REDIRECT_CACHE_MAX_BYTES,
+                               CACHE_DB_MAX_ENTRIES, table="redirects")
+
+def remember_redirect(source, target):
+    source, target = canonicalize_url(source), canonicalize_url(target)
+    if source != target:
+        redirect_cache.set(url_key(source), {"url": target})
+
+def resolve_redirect(canonical):
+    """URL canonique de la page finale si cette URL a déjà redirigé ailleurs"""
+    cached = redirect_cache.get(url_key(canonical))
+    return cached[0]["url"] if cached else canonical
+
+# Résumés IA, indexés par contenu: partagés entre URLs qui servent le même texte
+summary_cache = AnalysisCache(CACHE_DB_PATH, GROQ_CACHE_DURATION, timedelta(0), GROQ_CACHE_MAX_BYTES,
+                              CACHE_DB_MAX_ENTRIES, table="summaries")
+
+SHINGLE_WORDS = 5
+WORD_PATTERN = re.compile(r"\w+")
+EMPTY_BIN = (1 << 58) - 1  # Valeur d'un compartiment sans shingle
+
+# Mots propres à chaque document issu d'un même modèle, masqués avant le calcul de la signature
+MONTH_WORDS = {
+    "january", "february", "march", "april", "may", "june", "july", "august", "september",
+    "october", "november", "december", "janvier", "février", "mars", "avril", "mai", "juin",
+    "juillet", "août", "septembre", "octobre", "novembre", "décembre",
+}
+CAPITALIZED_PHRASE = re.compile(r"\b[A-Z][\w&'-]*(?:[ \t]+[A-Z][\w&'-]*)*")
+
+def extract_entities(text, url):
+    """Domaine et nom de l'éditeur (le groupe de mots capitalisés qui rappelle le domaine, le plus cité puis le plus court)"""
+    host = (urlsplit(url).hostname or "").removeprefix("www.")
+    label = re.sub(r"\W|_", "", host.split(".")[0].lower()) if host else ""
+    counts = {}
+    if len(label) >= 3:
+        for match in CAPITALIZED_PHRASE.finditer(text[:NEAR_DUPLICATE_MAX_WORDS * 8]):
+            phrase = match.group()
+            if phrase.split()[0].lower() in label or label in phrase.replace(" ", "").lower():
+                counts[phrase] = counts.get(phrase, 0) + 1
+    company = max(counts, key=lambda phrase: (counts[phrase], -len(phrase)), default=None)
+    return {"domain": host, "company": company}
+
+def template_words(text, entities, max_words=NEAR_DUPLICATE_MAX_WORDS):
+    """Mots du texte, éditeur, domaine, dates et nombres remplacés par des marqueurs"""
+    masked = set(WORD_PATTERN.findall((entities["company"] or "").lower()))
+    masked.update(part for part in (entities["domain"] or "").split(".")[:-1] if part)
+    words = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        if word in masked:
+            word = "<entity>"
+        elif word.isdigit() or word in MONTH_WORDS:
+            word = "<number>"
+        if not words or word != words[-1] or word[0] != "<":
+            words.append(word)
+            if len(words) >= max_words:
+                break
+    return words
+
+def minhash_signature(words, bins=NEAR_DUPLICATE_BINS):
+    """Signature MinHash des shingles de SHINGLE_WORDS mots (une seule fonction de hachage,
+    répartie sur `bins` compartiments qui gardent chacun leur plus petite valeur)"""
+    signature = [EMPTY_BIN] * bins
+    for index in range(max(1, len(words) - SHINGLE_WORDS + 1)):
+        shingle = " ".join(words[index:index + SHINGLE_WORDS]).encode("utf-8")
+        value = int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "big")
+        position = value % bins
+        value //= bins
+        if value < signature[position]:
+            signature[position] = value
+    return signature
+
+def signature_similarity(first, second):
+    """Estimation de la similarité de Jaccard: part des compartiments (non vides) égaux"""
+    used = equal = 0
+    for a, b in zip(first, second):
+        if a == EMPTY_BIN and b == EMPTY_BIN:
+            continue
+        used += 1
+        equal += a == b
+    return equal / used if used else 0.0
+
+def patch_entities(summary, previous, current):
+    """Remplace dans un résumé l'éditeur et le domaine du document d'origine par ceux du nouveau"""
+    for key in ("company", "domain"):
+        old, new = previous.get(key), current.get(key)
+        if old and new and old != new:
+            summary = re.sub(rf"\b{re.escape(old)}\b", lambda _: new, summary)
+    return summary
+
+class NearDuplicateIndex:
+    """Index LSH persistant des signatures MinHash des documents résumés par l'IA
+
+    La signature est découpée en bandes; deux documents qui partagent une
+    bande sont candidats, puis la similarité estimée sur la signature complète
+    décide. Chaque bande est une ligne indexée (bande, empreinte): une
+    recherche est une seule requête sur l'index, quelle que soit sa taille.
+
+    Comme le cache des résumés (GroqGateway), un résumé n'est réutilisé que
+    s'il a été produit par le même modèle et la même version du prompt, et
+    pendant `ttl`.
+    """
+
+    def __init__(self, db_path, bins=NEAR_DUPLICATE_BINS, bands=NEAR_DUPLICATE_BANDS,
+                 threshold=NEAR_DUPLICATE_THRESHOLD, max_entries=NEAR_DUPLICATE_MAX_ENTRIES,
+                 ttl=GROQ_CACHE_DURATION, model=GROQ_MODEL, prompt_version=GROQ_PROMPT_VERSION):
+        self.db_path = db_path
+        self.bins = bins
+        self.bands = bands
+        self.rows = bins // bands
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl.total_seconds()
+        self.model = model
+        self.prompt_version = prompt_version
+        self.lock = threading.Lock()
+        self.writes_since_prune = 0
+        self.counters = {"lookups": 0, "matches": 0, "candidates": 0, "added": 0}
+        self.db = None
+        self.open_db()
+
+    def open_db(self):
+        if not self.db_path:
+            return
+        try:
+            self.db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS near_duplicates ("
+                "id INTEGER PRIMARY KEY, content_key TEXT UNIQUE NOT NULL, created_at REAL NOT NULL, "
+                "signature BLOB NOT NULL, entities TEXT NOT NULL, summary TEXT NOT NULL, "
+                "model TEXT NOT NULL DEFAULT '', prompt_version TEXT NOT NULL DEFAULT '')"
+            )
+            # Index créé avant le suivi du modèle: ses résumés ne seront plus réutilisés
+            columns = {row[1] for row in self.db.execute("PRAGMA table_info(near_duplicates)")}
+            for column in ("model", "prompt_version"):
+                if column not in columns:
+                    self.db.execute(f"ALTER TABLE near_duplicates ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS near_duplicate_bands ("
+                "band_hash INTEGER NOT NULL, document_id INTEGER NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS near_duplicate_bands_hash ON near_duplicate_bands (band_hash)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS near_duplicate_bands_document ON near_duplicate_bands (document_id)")
+        except sqlite3.Error as e:
+            print(f"⚠️ Index des quasi-doublons désactivé ({self.db_path}): {e}")
+            self.db = None
+
+    def close_db(self):
+        with self.lock:
+            if self.db:
+                self.db.close()
+                self.db = None
+
+    def band_hashes(self, signature):
+        """Empreinte de chaque bande (les bandes entièrement vides sont ignorées)"""
+        hashes = []
+        for band in range(self.bands):
+            values = signature[band * self.rows:(band + 1) * self.rows]
+            if all(value == EMPTY_BIN for value in values):
+                continue
+            packed = band.to_bytes(2, "big") + b"".join(value.to_bytes(8, "big") for value in values)
+            hashes.append(int.from_bytes(hashlib.blake2b(packed, digest_size=8).digest(), "big", signed=True))
+        return hashes
+
+    @staticmethod
+    def pack(signature):
+        return b"".join(value.to_bytes(8, "big") for value in signature)
+
+    @staticmethod
+    def unpack(blob):
+        return [int.from_bytes(blob[i:i + 8], "big") for i in range(0, len(blob), 8)]
+
+    def find(self, signature):
+        """Document indexé le plus proche au-dessus du seuil: (similarité, entités, résumé) ou None"""
+        if not self.db:
+            return None
+        hashes = self.band_hashes(signature)
+        if not hashes:
+            return None
+        try:
+            with self.lock:
+                self.counters["lookups"] += 1
+                rows = self.db.execute(
+                    "SELECT DISTINCT document.id, document.signature, document.entities, document.summary "
+                    "FROM near_duplicate_bands band JOIN near_duplicates document ON document.id = band.document_id "
+                    f"WHERE band.band_hash IN ({','.join('?' * len(hashes))}) AND document.model = ? "
+                    "AND document.prompt_version = ? AND document.created_at > ? LIMIT ?",
+                    (*hashes, self.model, self.prompt_version, time.time() - self.ttl, NEAR_DUPLICATE_MAX_CANDIDATES)
+                ).fetchall()
+                self.counters["candidates"] += len(rows)
+        except sqlite3.Error as e:
+            print(f"⚠️ Lecture de l'index des quasi-doublons impossible: {e}")
+            return None
         
+        best = None
+        for _, blob, entities, summary in rows:
+            similarity = signature_similarity(signature, self.unpack(blob))
+            if similarity >= self.threshold and (best is None or similarity > best[0]):
+                best = (similarity, json.loads(entities), summary)
+        if best:
+            with self.lock:
+                self.counters["matches"] += 1
+        return best
+
+    def add(self, content_key, signature, entities, summary):
+        if not self.db:
+            return
+        hashes = self.band_hashes(signature)
+        try:
+            with self.lock:
+                self.db.execute("BEGIN")
+                try:
+                    # Un résumé plus ancien du même texte (autre modèle ou prompt, ou expiré) est remplacé
+                    self.db.execute(
+                        "DELETE FROM near_duplicate_bands WHERE document_id IN ("
+                        "SELECT id FROM near_duplicates WHERE content_key = ?)", (content_key,)
+                    )
+                    self.db.execute("DELETE FROM near_duplicates WHERE content_key = ?", (content_key,))
+                    cursor = self.db.execute(
+                        "INSERT INTO near_duplicates (content_key, created_at, signature, entities, summary, "
+                        "model, prompt_version) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (content_key, time.time(), self.pack(signature), json.dumps(entities, ensure_ascii=False),
+                         summary, self.model, self.prompt_version)
+                    )
+                    self.db.executemany(
+                        "INSERT INTO near_duplicate_bands (band_hash, document_id) VALUES (?, ?)",
+                        [(band_hash, cursor.lastrowid) for band_hash in hashes]
+                    )
+                    self.counters["added"] += 1
+                    self.writes_since_prune += 1
+                    self.db.execute("COMMIT")
+                except sqlite3.Error:
+                    self.db.execute("ROLLBACK")
+                    raise
+                if self.writes_since_prune >= 1000:
+                    self.prune()
+        except sqlite3.Error as e:
+            print(f"⚠️ Écriture dans l'index des quasi-doublons impossible: {e}")
+
+    def prune(self):
+        """Retire les résumés expirés ou d'un autre modèle / prompt, puis garde les max_entries plus récents"""
+        self.writes_since_prune = 0
+        stale = "SELECT id FROM near_duplicates WHERE created_at <= ? OR model != ? OR prompt_version != ?"
+        parameters = (time.time() - self.ttl, self.model, self.prompt_version)
+        self.db.execute(f"DELETE FROM near_duplicate_bands WHERE document_id IN ({stale})", parameters)
+        self.db.execute(f"DELETE FROM near_duplicates WHERE id IN ({stale})", parameters)
+        row = self.db.execute(
+            "SELECT id FROM near_duplicates ORDER BY id DESC LIMIT 1 OFFSET ?", (self.max_entries,)
+        ).fetchone()
+        if row:
+            self.db.execute("DELETE FROM near_duplicate_bands WHERE document_id <= ?", (row[0],))
+            self.db.execute("DELETE FROM near_duplicates WHERE id <= ?", (row[0],))
+
+    def clear(self):
+        if not self.db:
+            return
+        with self.lock:
+            try:
+                self.db.execute("DELETE FROM near_duplicate_bands")
+                self.db.execute("DELETE FROM near_duplicates")
+            except sqlite3.Error as e:
+                print(f"⚠️ Impossible de vider l'index des quasi-doublons: {e}")
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+near_duplicates = NearDuplicateIndex(CACHE_DB_PATH)
+
+page_fetcher = PageFetcher(metrics=metrics, on_redirect=remember_redirect)
+
+def download_page_content(url, deadline=None):
+    """Télécharge une page (requête conditionnelle si son texte est dans FetchCache)
+
+    Le texte téléchargé (ou confirmé par un 304) est mis en cache. Un échec
+    donne un texte vide; l'échéance atteinte lève DeadlineExceeded.
+    """
+    return download_page(url, deadline)[0]
+
+def download_page(url, deadline=None):
+    """(texte, type d'erreur ou None) d'un téléchargement, voir download_page_content"""
+    import requests
+    try:
+        text = page_fetcher.fetch_text(url, deadline, fetch_cache.peek(url))
+        fetch_cache.set(url, text)
+        return text, None
+    except DeadlineExceeded:
+        metrics.inc("trustadvisor_fetch_errors_total", type="deadline")
+        print(f"⏱️ Échéance atteinte pendant le téléchargement de {url}")
+        raise
     except requests.Timeout:
+        error = "timeout"
         print(f"⏱️ Timeout pour {url}")
-        return ""
     except requests.RequestException as e:
+        error = fetch_error_type(e)
         print(f"❌ Erreur réseau pour {url}: {e}")
-        return ""
     except Exception as e:
+        error = "unexpected"
         print(f"❌ Erreur inattendue pour {url}: {e}")
-        return ""
+    metrics.inc("trustadvisor_fetch_errors_total", type=error)
+    return "", error
 
-def score_keyword_match(text_lower, keyword):
-    """Calcule un score de pertinence pour un mot-clé"""
-    count = text_lower.count(keyword)
-    
-    # Bonus si le mot-clé apparaît dans un contexte important
-    context_patterns = [
-        rf"we\s+\w+\s+{keyword}",
-        rf"your\s+{keyword}",
-        rf"{keyword}\s+(?:is|are)\s+(?:collected|used|shared)",
-    ]
+def fetch_error_type(error):
+    """Catégorie d'une erreur de téléchargement pour les métriques"""
+    import requests
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return f"http_{error.response.status_code // 100}xx"
+    if isinstance(error, requests.ConnectionError):
+        return "connection"
+    return "request"
+
+class FetchCache:
+    """Textes téléchargés, compressés (zlib), en LRU dans un budget en octets
+
+    Les échecs sont gardés comme un texte vide pendant une durée propre à leur
+    type d'erreur (FETCH_ERROR_DURATIONS), les textes pendant `ttl`. Un texte
+    expiré reste dans le budget jusqu'à son éviction: PageFetcher le
+    revalide (peek) par une requête conditionnelle plutôt que de le
+    télécharger à nouveau.
+    """
+
+    def __init__(self, max_bytes=FETCH_CACHE_MAX_BYTES, ttl=FETCH_CACHE_DURATION, error_ttls=FETCH_ERROR_DURATIONS,
+                 level=FETCH_CACHE_COMPRESSION):
+        self.max_bytes = max_bytes
+        self.ttl = ttl.total_seconds()
+        self.error_ttls = {error: duration.total_seconds() for error, duration in error_ttls.items()}
+        self.level = level
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # url -> (expiration, taille comptée, texte compressé ou None, erreur ou taille du texte)
+        self.current_bytes = 0
+        self.text_bytes = 0  # Taille des textes une fois décompressés (UTF-8)
+        self.counters = {"hits": 0, "negative_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, url):
+        """Texte en cache ("" pour un échec récent), ou None s'il faut télécharger la page"""
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry and entry[0] <= time.monotonic():
+                if entry[2] is None:
+                    self.remove(url)
+                self.counters["expirations"] += 1
+                entry = None
+            if not entry:
+                self.counters["misses"] += 1
+                return None
+            self.entries.move_to_end(url)
+            if entry[2] is None:
+                self.counters["negative_hits"] += 1
+                return ""
+            self.counters["hits"] += 1
+            compressed = entry[2]
+        return zlib.decompress(compressed).decode("utf-8")
+
+    def peek(self, url):
+        """Texte gardé de la page, même expiré, sans compter d'accès (None sans texte)"""
+        with self.lock:
+            entry = self.entries.get(url)
+            if not entry or entry[2] is None:
+                return None
+            compressed = entry[2]
+        return zlib.decompress(compressed).decode("utf-8")
+
+    def set(self, url, text, error=None):
+        """Met en cache un texte, ou l'échec d'un téléchargement (`error`: type d'erreur)"""
+        if error:
+            compressed, ttl, detail = None, self.error_ttls.get(error, self.error_ttls["unexpected"]), error
+        else:
+            encoded = text.encode("utf-8")
+            compressed, ttl, detail = zlib.compress(encoded, self.level), self.ttl, len(encoded)
+        size = len(compressed or b"") + len(url) + FETCH_CACHE_ENTRY_OVERHEAD
+        with self.lock:
+            if url in self.entries:
+                self.remove(url)
+            if size > self.max_bytes:
+                return
+            self.entries[url] = (time.monotonic() + ttl, size, compressed, detail)
+            self.current_bytes += size
+            if compressed is not None:
+                self.text_bytes += detail
+            while self.current_bytes > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+                self.counters["evictions"] += 1
+
+    def remove(self, url):
+        _, size, compressed, detail = self.entries.pop(url)
+        self.current_bytes -= size
+        if compressed is not None:
+            self.text_bytes -= detail
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+            self.text_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.counters["hits"] + self.counters["negative_hits"] + self.counters["misses"]
+            negative = sum(1 for entry in self.entries.values() if entry[2] is None)
+            return {
+                "entries": len(self.entries),
+                "negative_entries": negative,
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "text_bytes": self.text_bytes,
+                "compression_ratio": round(self.text_bytes / self.current_bytes, 2) if self.current_bytes else 0.0,
+                "hit_rate": round((lookups - self.counters["misses"]) / lookups, 3) if lookups else 0.0,
+                **self.counters,
+            }
+
+    def __len__(self):
+        return len(self.entries)
+
+fetch_cache = FetchCache()
+
+def fetch_page_content(url, deadline=None):
+    """Récupère le contenu d'une page avec cache (voir FetchCache)
+
+    Une page abandonnée à l'échéance (DeadlineExceeded) n'est pas mise en
+    cache: la prochaine demande la télécharge à nouveau.
+    """
+    content = fetch_cache.get(url)
+    if content is not None:
+        return content
+    content, error = download_page(url, deadline)
+    if error:
+        fetch_cache.set(url, content, error)
+    return content
+
+def clear_page_contents():
+    fetch_cache.clear()
+
+def iter_chunks(text, size=ANALYSIS_CHUNK_LENGTH):
+    """Bornes (début, fin) de morceaux consécutifs d'au plus `size` caractères,
+    coupés juste après une fin de phrase s'il y en a une dans leur seconde moitié"""
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + size, length)
+        if end < length:
+            cut = max(text.rfind(char, start + size // 2, end) for char in ".!?")
+            if cut != -1:
+                end = cut + 1
+        yield start, end
+        start = end
+
+def iter_blocks(text, min_length=BLOCK_MIN_LENGTH, max_length=BLOCK_MAX_LENGTH, spread=BLOCK_SPREAD):
+    """Bornes (début, fin) de blocs consécutifs, coupés juste après une fin de phrase
+
+    Une fin de phrase termine un bloc d'au moins `min_length` caractères si
+    l'empreinte de la phrase est multiple de `spread`: les coupures dépendent
+    du texte qui les précède immédiatement, pas de leur position. Une
+    modification ne déplace donc que les coupures voisines; les autres blocs
+    restent identiques. Un bloc qui atteindrait `max_length` est coupé à la
+    dernière fin de phrase (à défaut, au dernier espace).
+    """
+    start = previous = 0
     
-    context_bonus = sum(1 for pattern in context_patterns if re.search(pattern, text_lower))
+    def forced_cuts(end):
+        nonlocal start
+        while end - start > max_length:
+            cut = previous if previous > start else text.rfind(" ", start + max_length // 2, start + max_length)
+            if cut <= start:
+                cut = start + max_length
+            yield start, cut
+            start = cut
     
-    return count + (context_bonus * 0.5)
+    for match in BLOCK_SENTENCE_END.finditer(text):
+        end = match.end()
+        yield from forced_cuts(end)
+        if end - start >= min_length and zlib.crc32(text[previous:end].encode("utf-8")) % spread == 0:
+            yield start, end
+            start = end
+        previous = end
+    yield from forced_cuts(len(text))
+    if start < len(text):
+        yield start, len(text)
+
+def block_hash(block):
+    return hashlib.blake2b(block.encode("utf-8"), digest_size=8).hexdigest()
+
+# Caractères des morceaux voisins visibles depuis un morceau (plus long mot-clé, contextes)
+KEYWORD_SCAN_MARGIN = 256
+
+# Contextes qui donnent un bonus à un mot-clé. Les contextes qui précèdent le
+# mot-clé sont écrits à l'envers : ils sont testés sur le texte inversé, ce qui
+# permet de les ancrer à la position de chaque occurrence.
+CONTEXT_BEFORE_PATTERNS = [
+    r"\s+\w+\s+ew",  # we <mot> {keyword}
+    r"\s+ruoy",  # your {keyword}
+]
+CONTEXT_AFTER_PATTERNS = [
+    r"\s+(?:is|are)\s+(?:collected|used|shared)",  # {keyword} is/are collected|used|shared
+]
+
+def build_trie_pattern(words):
+    """Construit une alternance factorisée en trie (la plus longue correspondance gagne)"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node):
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if "" in node:
+            return f"(?:{body})?"
+        return body
+
+    return render(trie)
+
+class KeywordMatcher:
+    """Trouve toutes les occurrences des mots-clés et leurs bonus de contexte en une passe"""
+
+    def __init__(self, keywords, before_patterns=CONTEXT_BEFORE_PATTERNS, after_patterns=CONTEXT_AFTER_PATTERNS):
+        self.keywords = sorted(set(keywords))
+        self.before_patterns = [re.compile(pattern) for pattern in before_patterns]
+        self.after_patterns = [re.compile(pattern) for pattern in after_patterns]
+        self.pattern = re.compile(build_trie_pattern(self.keywords))
+        # Les tables ci-dessous désignent les mots-clés par leur rang dans self.keywords
+        # (même ordre que les chaînes), qui indexe aussi les listes des parcours
+        index = {keyword: i for i, keyword in enumerate(self.keywords)}
+        self.lengths = [len(keyword) for keyword in self.keywords]
+
+        # Mots-clés qui commencent à la même position que la correspondance la plus longue
+        self.prefixes = {
+            keyword: [index[k] for k in self.keywords if keyword.startswith(k)]
+            for keyword in self.keywords
+        }
+
+        # Mots-clés qui commencent à l'intérieur d'une correspondance (chevauchements):
+        # ceux contenus entièrement dans le mot-clé sont toujours présents, ceux qui
+        # dépassent sa fin sont indexés par le caractère qui suit la correspondance
+        self.inner_keywords = {}
+        self.overflow_keywords = {}
+        for keyword in self.keywords:
+            inner = []
+            overflow = {}
+            for offset in range(1, len(keyword)):
+                suffix = keyword[offset:]
+                for k in self.keywords:
+                    if suffix.startswith(k):
+                        inner.append((offset, index[k]))
+                    elif k.startswith(suffix):
+                        tail = k[len(suffix):]
+                        overflow.setdefault(tail[0], []).append((offset, index[k], tail))
+            self.inner_keywords[keyword] = inner
+            self.overflow_keywords[keyword] = overflow
+
+        self.context_count = len(self.before_patterns) + len(self.after_patterns)
+
+    def scan(self, text_lower):
+        """Retourne {mot-clé: (occurrences, nombre de contextes trouvés)}
 
-def analyze_keywords_advanced(text):
-    """Analyse avancée par mots-clés avec scoring"""
-    text_lower = text.lower()
+        Les occurrences sont comptées sans chevauchement, comme str.count().
+        """
+        return self.scan_chunks([text_lower])
+
+    def scan_chunks(self, chunks):
+        """Comme scan(), pour un texte en minuscules fourni en morceaux consécutifs
+
+        Chaque morceau est examiné avec KEYWORD_SCAN_MARGIN caractères de ses
+        voisins (contextes, mots-clés à cheval), et la recherche reprend dans le
+        morceau suivant là où la dernière correspondance s'est arrêtée.
+        """
+        return self.matches(self.scan_state(chunks))
+
+    def matches(self, state):
+        """{mot-clé: (occurrences, nombre de contextes trouvés)} d'un parcours scan_state()"""
+        return {
+            keyword: (count, bin(mask).count("1"))
+            for keyword, count, mask in zip(self.keywords, state["counts"], state["contexts"])
+            if count
+        }
+
+    def scan_state(self, chunks):
+        """Parcours de scan_chunks(): occurrences ("counts") et masques des contextes
+        trouvés ("contexts"), en listes alignées sur self.keywords"""
+        keyword_count = len(self.keywords)
+        state = {"counts": [0] * keyword_count, "last_end": [0] * keyword_count,
+                 "contexts": [0] * keyword_count, "resume": 0}
+        chunks = iter(chunks)
+        previous = ""
+        current = next(chunks, None)
+        offset = 0  # position du morceau courant dans le texte complet
+        while current is not None:
+            following = next(chunks, None)
+            before = previous[-KEYWORD_SCAN_MARGIN:]
+            window = before + current + (following or "")[:KEYWORD_SCAN_MARGIN]
+            base = offset - len(before)
+            self.scan_window(window, base, max(state["resume"], offset) - base, len(before) + len(current), state)
+            offset += len(current)
+            previous, current = current, following
+        return state
+
+    def scan_window(self, window, base, start, end, state):
+        """Correspondances qui commencent dans window[start:end]; `base` est la position de window[0]"""
+        counts = state["counts"]
+        last_end = state["last_end"]
+        contexts = state["contexts"]
+        reversed_text = window[::-1]
+        length = len(window)
+        lengths = self.lengths
+        full_mask = (1 << self.context_count) - 1
+
+        def record(keyword, start):
+            end = start + lengths[keyword]
+            if base + start >= last_end[keyword]:
+                counts[keyword] += 1
+                last_end[keyword] = base + end
+
+            mask = contexts[keyword]
+            if mask == full_mask:
+                return
+            # Tous les contextes commencent par un espace: test rapide avant les regex
+            bit = 1
+            space_before = start > 0 and window[start - 1].isspace()
+            for pattern in self.before_patterns:
+                if space_before and not mask & bit and pattern.match(reversed_text, length - start):
+                    mask |= bit
+                bit <<= 1
+            space_after = end < length and window[end].isspace()
+            for pattern in self.after_patterns:
+                if space_after and not mask & bit and pattern.match(window, end):
+                    mask |= bit
+                bit <<= 1
+            contexts[keyword] = mask
+
+        for match in self.pattern.finditer(window, start):
+            start = match.start()
+            if start >= end:
+                break
+            longest = match.group()
+            for keyword in self.prefixes[longest]:
+                record(keyword, start)
+
+            hits = self.inner_keywords[longest]
+            match_end = match.end()
+            overflow = [
+                (offset, keyword)
+                for offset, keyword, tail in self.overflow_keywords[longest].get(window[match_end:match_end + 1], ())
+                if window.startswith(tail, match_end)
+            ]
+            if overflow:
+                hits = sorted(hits + overflow)
+            for offset, keyword in hits:
+                record(keyword, start + offset)
+            state["resume"] = base + match_end
+
+def keyword_chunks(text, chunk_length=ANALYSIS_CHUNK_LENGTH, pack=None):
+    """Morceaux du texte en minuscules, apostrophes typographiques remplacées si le pack le demande"""
+    for start, end in iter_chunks(text, chunk_length):
+        chunk = text[start:end].lower()
+        yield chunk.replace("\u2019", "'") if pack and pack.fold_apostrophes else chunk
+
+def scan_keywords(text, chunk_length=ANALYSIS_CHUNK_LENGTH, pack=None):
+    """{mot-clé: (occurrences, contextes)} du texte, parcouru par morceaux"""
+    pack = pack or select_rule_pack(text)
+    return pack.matcher.scan_chunks(keyword_chunks(text, chunk_length, pack))
+
+def analyze_keywords_advanced(text, chunk_length=ANALYSIS_CHUNK_LENGTH, pack=None):
+    """Analyse avancée par mots-clés avec scoring (le texte est parcouru par morceaux)"""
+    pack = pack or select_rule_pack(text)
+    return score_keyword_matches(scan_keywords(text, chunk_length, pack), pack)
+
+def score_keyword_matches(matches, pack=None):
+    """Scores par catégorie et score de risque à partir des occurrences de scan_keywords()"""
     results = {}
     risk_score = 0
     
-    for category, config in KEYWORD_CATEGORIES.items():
+    for category, config in (pack or RULE_PACKS[DEFAULT_LANGUAGE]).categories.items():
         keywords = config["keywords"]
         weight = config["weight"]
         critical = config["critical"]
@@ -173,7 +1446,8 @@ def analyze_keywords_advanced(text):
         category_score = 0
         
         for keyword in keywords:
-            score = score_keyword_match(text_lower, keyword)
+            count, context_bonus = matches.get(keyword, (0, 0))
+            score = count + (context_bonus * 0.5)
             if score > 0:
                 is_critical = keyword in critical
                 found_items.append({
@@ -199,96 +1473,603 @@ def analyze_keywords_advanced(text):
     
     return results, risk_score
 
-def extract_structured_data(text):
-    """Extrait des données structurées du texte"""
-    extracted = {}
-    
+# Fin d'une entité partagée: seul le début d'une suite d'espaces est essayé
+# pour " to", ce qui évite de re-parcourir la suite à chaque position
+SHARING_TERMINATOR = r"[,.]|(?<!\s)\s+to"
+NON_ENTITY_CHAR = re.compile(r"[^\w\s]")
+
+def extraction_windows(text):
+    """Phrases (début, fin) où chercher, le point final compris (il termine une entité)
+
+    Une phrase sur plusieurs lignes est découpée en lignes, que les anciens
+    patterns (.*?) ne traversaient pas non plus.
+    """
+    for start, end in iter_sentences(text):
+        if text.startswith(".", end):
+            end += 1
+        line_break = text.find("\n", start, end)
+        while line_break != -1:
+            yield start, line_break
+            start = line_break + 1
+            line_break = text.find("\n", start, end)
+        yield start, end
+
+def first_targets(trigger_regex, targets, text, start, end):
+    """Pour chaque déclencheur, la première cible qui commence après lui, puis
+    reprise après cette cible (comme findall("déclencheur.*?cible")).
+
+    `targets` est la liste triée des cibles valides (début, fin, valeur) de la
+    fenêtre: chaque cible est examinée une seule fois, le temps est linéaire.
+    """
+    values = []
+    starts = [target[0] for target in targets]
+    index = 0
+    position = start
+    while True:
+        trigger = trigger_regex.search(text, position, end)
+        if not trigger:
+            break
+        index = bisect.bisect_left(starts, trigger.end(), index)
+        if index == len(targets):
+            break  # Aucune cible plus loin: les déclencheurs suivants n'en auront pas non plus
+        _, position, value = targets[index]
+        values.append(value)
+    return values
+
+def sharing_targets(original, folded, start, end, regexes):
+    """Entités introduites par "with|to" (le connecteur de la langue) dans folded[start:end] (début, fin, entité)"""
+    stops = [match.start() for match in NON_ENTITY_CHAR.finditer(folded, start, end)]
+    terminators = [match.span() for match in regexes["sharing_terminator"].finditer(folded, start, end)]
+    terminator_starts = [span[0] for span in terminators]
+    _, connector_regex = regexes["sharing_entities"]
+    targets = []
+    for connector in connector_regex.finditer(folded, start, end):
+        entity_start = connector.end()
+        run_end_index = bisect.bisect_left(stops, entity_start)
+        run_end = stops[run_end_index] if run_end_index < len(stops) else end
+        if entity_start >= run_end:
+            continue  # L'entité doit commencer par un caractère [\w\s]
+        index = bisect.bisect_left(terminator_starts, entity_start + 1)
+        if index == len(terminators) or terminator_starts[index] > run_end:
+            continue
+        entity_end, target_end = terminators[index]
+        targets.append((connector.start(), target_end, original[entity_start:entity_end]))
+    return targets
+
+def extract_structured_data(text, chunk_length=ANALYSIS_CHUNK_LENGTH, pack=None):
+    """Extrait des données structurées du texte (toutes les valeurs distinctes, dans l'ordre du texte)
+
+    Chaque recherche est limitée à une phrase et se fait en temps linéaire. Le
+    texte est parcouru par morceaux coupés entre deux phrases.
+    """
+    pack = pack or select_rule_pack(text)
+    found = {name: {} for name in EXTRACTION_PATTERNS}
+    for start, end in iter_chunks(text, chunk_length):
+        extract_chunk_data(text[start:end], found, pack)
+    return {name: list(values) for name, values in found.items() if values}
+
+def extract_chunk_data(text, found, pack):
+    """Ajoute à `found` ({champ: {valeur: None}}) les valeurs trouvées dans un morceau de texte"""
+    folded = fold_ascii_case(text)
+    for start, end in extraction_windows(folded):
+        for regexes in pack.extraction_regexes:
+            extract_window_data(text, folded, start, end, regexes, found)
+
+def extract_window_data(text, folded, start, end, regexes, found):
+    """Valeurs d'une phrase pour les patterns d'une langue"""
     # Périodes de rétention
-    retention_matches = re.findall(EXTRACTION_PATTERNS["retention_periods"], text, re.IGNORECASE)
-    if retention_matches:
-        extracted["retention_periods"] = list(set(retention_matches[:3]))
+    trigger, target = regexes["retention_periods"]
+    targets = [(m.start(), m.end(), text[m.start(1):m.end(1)]) for m in target.finditer(folded, start, end)]
+    for value in first_targets(trigger, targets, folded, start, end):
+        found["retention_periods"].setdefault(value, None)
     
     # Types de données
-    data_matches = re.findall(EXTRACTION_PATTERNS["data_types"], text, re.IGNORECASE)
-    if data_matches:
-        extracted["data_types"] = list(set(data_matches[:5]))
+    trigger, target = regexes["data_types"]
+    targets = [(m.start(), m.end(), m.group()) for m in target.finditer(folded, start, end)]
+    for value in first_targets(trigger, targets, folded, start, end):
+        found["data_types"].setdefault(value, None)
     
     # Entités de partage
-    sharing_matches = re.findall(EXTRACTION_PATTERNS["sharing_entities"], text, re.IGNORECASE)
-    if sharing_matches:
+    trigger, _ = regexes["sharing_entities"]
+    targets = sharing_targets(text, folded, start, end, regexes)
+    for value in first_targets(trigger, targets, folded, start, end):
         # Nettoyer les résultats
-        cleaned = [s.strip() for s in sharing_matches if len(s.strip()) > 3]
-        extracted["sharing_entities"] = list(set(cleaned[:5]))
-    
-    return extracted
-
-def extract_critical_sentences(text):
-    """Extrait les phrases les plus importantes"""
-    sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
-    
-    # Patterns de phrases critiques
-    critical_patterns = [
-        (r"we\s+(?:may\s+)?sell", 3.0),  # Vente de données
-        (r"share.*?with.*?third part", 2.5),  # Partage avec tiers
-        (r"you.*?right to", 2.0),  # Droits utilisateur
-        (r"we\s+(?:collect|gather|obtain)", 1.8),  # Collection de données
-        (r"(?:retain|store|keep).*?(?:for|until)", 1.5),  # Rétention
-        (r"(?:encrypt|security|protect)", 1.3),  # Sécurité
-    ]
-    
-    scored_sentences = []
-    
-    for sentence in sentences:
-        if len(sentence) < 40 or len(sentence) > 400:
-            continue
+        value = value.strip()
+        if len(value) > 3:
+            found["sharing_entities"].setdefault(value, None)
+
+# Patterns de phrases critiques (nom, pattern en minuscules, poids)
+CRITICAL_SENTENCE_PATTERNS = [
+    ("sell", r"we\s+(?:may\s+)?sell", 3.0),  # Vente de données
+    ("third_party", r"share.*?with.*?third part", 2.5),  # Partage avec tiers
+    ("rights", r"you.*?right to", 2.0),  # Droits utilisateur
+    ("collection", r"we\s+(?:collect|gather|obtain)", 1.8),  # Collection de données
+    ("retention", r"(?:retain|store|keep).*?(?:for|until)", 1.5),  # Rétention
+    ("security", r"(?:encrypt|security|protect)", 1.3),  # Sécurité
+]
+
+# Caractères que re.IGNORECASE rapproche d'une lettre ASCII (un pour un, les
+# positions sont conservées), et majuscules accentuées des langues des packs
+# (elles ne correspondent à aucun pattern ASCII: le repli ne change rien pour eux)
+ASCII_CASE_FOLD = str.maketrans({
+    **{char: char.lower() for char in string.ascii_uppercase},
+    "\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k",
+    **{chr(code): chr(code).lower() for code in range(0xC0, 0xDF) if code != 0xD7},
+    "\u0152": "\u0153",
+})
+
+def fold_ascii_case(text):
+    """Replie la casse comme re.IGNORECASE le fait pour des patterns ASCII en minuscules
+    (et celle des lettres accentuées des patterns des autres langues)"""
+    if text.isascii():
+        return text.lower()
+    return text.translate(ASCII_CASE_FOLD)
+
+# Phrase = suite de caractères hors [.!?], sans les espaces de début et de fin
+SENTENCE_PATTERN = re.compile(r'[^.!?\s](?:[^.!?]*[^.!?\s])?')
+
+def iter_sentences(text):
+    """Génère les bornes (début, fin) de chaque phrase, sans construire la liste complète"""
+    for match in SENTENCE_PATTERN.finditer(text):
+        yield match.span()
+
+# Packs de règles par langue, compilés une fois au démarrage (voir RulePack).
+# L'anglais reprend les définitions ci-dessus; les autres langues reprennent
+# les catégories de KEYWORD_CATEGORIES et leurs poids. Pour chaque langue:
+# - "stopwords": mots outils propres à la langue, pour la détecter
+# - "categories": {catégorie: (mots-clés, mots-clés critiques)}, en minuscules
+# - "contexts": contextes (avant, écrits à l'envers / après) des mots-clés, qui
+#   commencent tous par un espace
+# - "extraction": comme EXTRACTION_PATTERNS, plus la fin d'une entité partagée
+# - "sentences": comme CRITICAL_SENTENCE_PATTERNS (mêmes noms et poids)
+# - "practices": marqueurs (RGPD, chiffrement, droit à l'effacement) du score de confidentialité
+# - "document_types": marqueurs d'URL et de contenu de chaque type de document
+RULE_PACK_DEFINITIONS = {
+    "en": {
+        "stopwords": ["the", "and", "of", "we", "you", "your", "our", "with", "that", "this", "is", "are",
+                      "will", "may", "which", "from", "be", "or", "any", "such"],
+        "categories": {
+            category: (config["keywords"], config["critical"]) for category, config in KEYWORD_CATEGORIES.items()
+        },
+        "contexts": (CONTEXT_BEFORE_PATTERNS, CONTEXT_AFTER_PATTERNS),
+        "extraction": {**EXTRACTION_PATTERNS, "sharing_terminator": SHARING_TERMINATOR},
+        "sentences": CRITICAL_SENTENCE_PATTERNS,
+        "practices": (["gdpr"], ["encrypt"], ["right to delete", "right to erasure"]),
+        "document_types": {
+            "privacy": (["privacy"], ["personal data", "privacy policy", "we collect"]),
+            "terms": (["terms", "conditions"], ["terms of service", "user agreement", "you agree"]),
+            "cookie": (["cookie", "cookies"], ["cookie policy", "we use cookies", "tracking technologies"]),
+            "legal": (["legal"], []),
+            "content": (["content", "guidelines", "community"], []),
+        },
+    },
+    "fr": {
+        "stopwords": ["le", "les", "des", "et", "nous", "vous", "vos", "votre", "est", "sont", "pour", "avec",
+                      "dans", "sur", "qui", "une", "du", "au", "aux", "ces"],
+        "categories": {
+            "🍪 Cookies & Tracking": (["cookie", "traceur", "pixel de suivi", "balise web", "stockage local",
+                                      "empreinte numérique", "mesure d'audience", "identifiant"],
+                                     ["pixel de suivi", "empreinte numérique"]),
+            "🔐 Données Personnelles": (["données personnelles", "données à caractère personnel",
+                                         "informations personnelles", "données sensibles", "biométrique",
+                                         "données de santé", "données financières"],
+                                        ["données sensibles", "biométrique", "données de santé", "données financières"]),
+            "👥 Partage & Vente": (["des tiers", "tierces parties", "partag", "divulgu", "transf", "vendre vos",
+                                    "vente de données", "partenaires", "sociétés affiliées", "prestataires"],
+                                   ["vendre vos", "vente de données"]),
+            "✅ Droits Utilisateur": (["droit d'accès", "droit de suppression", "droit à l'effacement",
+                                       "droit d'opposition", "retirer votre consentement", "portabilité",
+                                       "droit de rectification"],
+                                      ["droit de suppression", "droit à l'effacement"]),
+            "⏰ Conservation": (["conserv", "durée de conservation", "stockées", "supprimées après",
+                                 "archivage", "indéfiniment"],
+                                ["indéfiniment"]),
+            "🔒 Sécurité": (["chiffr", "sécuris", "ssl", "https", "tls", "mesures de sécurité",
+                             "protéger vos données"], []),
+            "📢 Marketing": (["marketing", "publicité", "promotion", "publicité ciblée", "prospection",
+                              "newsletter", "lettre d'information"],
+                             ["publicité ciblée"]),
+            "🌍 Transferts Internationaux": (["transfert", "international", "en dehors de", "union européenne",
+                                              "états-unis", "pays tiers", "transfrontali"],
+                                             ["pays tiers"]),
+            "⚖️ Conformité Légale": (["rgpd", "cnil", "informatique et libertés", "règlement", "conformité"],
+                                     ["rgpd"]),
+        },
+        "contexts": (
+            [r"\s+\w+\s+suon(?!\w)", r"\s+(?:sov|ertov)(?!\w)"],  # nous <mot> / vos, votre {keyword}
+            [r"\s+(?:est|sont)\s+(?:collecté|utilisé|partagé)"],
+        ),
+        "extraction": {
+            "retention_periods": (r"conserv|stock|gard", r"(?:pendant|durant|pour une durée de)\s+(\d+\s+(?:jours|mois|ans|années))"),
+            "data_types": (r"collect|recueill|obten",
+                           r"\b(?:adresse ip|adresse e-mail|adresse électronique|e-mail|email|courriel|nom|adresse|téléphone|localisation|paiement)\b"),
+            "sharing_entities": (r"partag|divulgu|transf|communiqu", r"(?:avec|à)\s+"),
+            "sharing_terminator": r"[,.;]|(?<!\s)\s+(?:à|pour|afin|qui|dans)(?!\w)",
+        },
+        "sentences": [
+            ("sell", r"nous\s+(?:pouvons\s+)?vend", 3.0),
+            ("third_party", r"partag.*?avec.*?tier", 2.5),
+            ("rights", r"vous.*?droit", 2.0),
+            ("collection", r"nous\s+(?:collectons|recueillons|obtenons)", 1.8),
+            ("retention", r"(?:conserv|stock|gard).*?(?:pendant|jusqu)", 1.5),
+            ("security", r"(?:chiffr|sécurité|protég)", 1.3),
+        ],
+        "practices": (["rgpd"], ["chiffr"], ["droit à l'effacement", "droit de suppression"]),
+        "document_types": {
+            "privacy": (["confidentialite", "donnees-personnelles", "vie-privee"],
+                        ["données personnelles", "politique de confidentialité", "nous collectons"]),
+            "terms": (["cgu", "cgv"], ["conditions générales", "conditions d'utilisation", "vous acceptez"]),
+            "cookie": (["traceurs"], ["politique de cookies", "nous utilisons des cookies", "traceurs"]),
+            "legal": (["mentions-legales"], []),
+            "content": ([], []),
+        },
+        "fold_apostrophes": True,
+    },
+    "de": {
+        "stopwords": ["der", "die", "das", "und", "wir", "sie", "ihre", "ihr", "ist", "sind", "mit", "für",
+                      "von", "auf", "nicht", "den", "dem", "eine", "zu", "bei"],
+        "categories": {
+            "🍪 Cookies & Tracking": (["cookie", "tracking-pixel", "zählpixel", "web-beacon", "lokaler speicher",
+                                      "fingerprint", "kennung", "webanalyse"],
+                                     ["zählpixel", "fingerprint"]),
+            "🔐 Données Personnelles": (["personenbezogene", "persönliche daten", "sensible daten",
+                                         "besondere kategorien", "biometrisch", "gesundheitsdaten", "finanzdaten"],
+                                        ["sensible daten", "biometrisch", "gesundheitsdaten", "finanzdaten"]),
+            "👥 Partage & Vente": (["dritte", "weitergabe", "weitergeben", "offenleg", "übermittl", "verkauf ihrer",
+                                    "daten verkaufen", "partner", "verbundene unternehmen", "dienstleister"],
+                                   ["verkauf ihrer", "daten verkaufen"]),
+            "✅ Droits Utilisateur": (["auskunft", "recht auf löschung", "widerspruch", "einwilligung widerrufen",
+                                       "datenübertragbarkeit", "berichtigung"],
+                                      ["recht auf löschung", "widerspruch"]),
+            "⏰ Conservation": (["speicherdauer", "aufbewahr", "gespeichert", "gelöscht nach", "löschfrist",
+                                 "unbegrenzt", "dauerhaft"],
+                                ["unbegrenzt", "dauerhaft"]),
+            "🔒 Sécurité": (["verschlüssel", "sicher", "ssl", "https", "tls", "sicherheitsmaßnahmen",
+                             "technische und organisatorische maßnahmen"], []),
+            "📢 Marketing": (["marketing", "werbung", "werbezwecke", "personalisierte werbung", "newsletter",
+                              "direktwerbung"],
+                             ["personalisierte werbung"]),
+            "🌍 Transferts Internationaux": (["übermittlung", "international", "außerhalb", "europäische union",
+                                              "vereinigte staaten", "drittl", "drittstaat"],
+                                             ["drittl", "drittstaat"]),
+            "⚖️ Conformité Légale": (["dsgvo", "bdsg", "datenschutz-grundverordnung", "verordnung", "einhaltung"],
+                                     ["dsgvo"]),
+        },
+        "contexts": (
+            [r"\s+\w+\s+riw(?!\w)", r"\s+(?:erhi|rhi)(?!\w)"],  # wir <wort> / ihre, ihr {keyword}
+            [r"\s+(?:wird|werden)\s+(?:erhoben|verwendet|weitergegeben|genutzt)"],
+        ),
+        "extraction": {
+            "retention_periods": (r"speicher|aufbewahr",
+                                  r"(?:für|von|bis zu)\s+(\d+\s+(?:tagen|tage|monaten|monate|jahren|jahre))"),
+            "data_types": (r"erheb|erhob|sammeln|erfass",
+                           r"\b(?:e-mail-adresse|e-mail|ip-adresse|name|anschrift|adresse|telefonnummer|standort|zahlungsdaten)\b"),
+            "sharing_entities": (r"weitergeb|weitergabe|übermittel|offenleg", r"(?:an|mit)\s+"),
+            "sharing_terminator": r"[,.;]|(?<!\s)\s+(?:zu|zur|zum|um|weiter)(?!\w)",
+        },
+        "sentences": [
+            ("sell", r"(?:wir|daten)\s+(?:\w+\s+)?verkauf", 3.0),
+            ("third_party", r"(?:weitergeb|weitergabe|übermittl).*?dritt", 2.5),
+            ("rights", r"sie.*?recht", 2.0),
+            ("collection", r"wir\s+(?:erheben|sammeln|erfassen)", 1.8),
+            ("retention", r"(?:speicher|aufbewahr).*?(?:für|bis)", 1.5),
+            ("security", r"(?:verschlüssel|sicherheit|schütz)", 1.3),
+        ],
+        "practices": (["dsgvo"], ["verschlüssel"], ["recht auf löschung"]),
+        "document_types": {
+            "privacy": (["datenschutz"], ["personenbezogene daten", "datenschutzerklärung", "wir erheben"]),
+            "terms": (["agb", "nutzungsbedingungen"], ["allgemeine geschäftsbedingungen", "nutzungsbedingungen"]),
+            "cookie": ([], ["cookie-richtlinie", "wir verwenden cookies"]),
+            "legal": (["impressum"], []),
+            "content": ([], []),
+        },
+    },
+    "es": {
+        "stopwords": ["el", "los", "las", "y", "usted", "su", "sus", "son", "para", "por", "del", "como", "se",
+                      "al", "nuestros", "nuestra", "puede", "podemos", "esta", "sobre"],
+        "categories": {
+            "🍪 Cookies & Tracking": (["cookie", "píxel de seguimiento", "baliza web", "almacenamiento local",
+                                      "huella digital", "identificador", "analítica"],
+                                     ["píxel de seguimiento", "huella digital"]),
+            "🔐 Données Personnelles": (["datos personales", "información personal", "datos sensibles",
+                                         "biométric", "datos de salud", "datos financieros"],
+                                        ["datos sensibles", "biométric", "datos de salud", "datos financieros"]),
+            "👥 Partage & Vente": (["terceros", "compartir", "compartimos", "divulga", "transferi", "vender sus",
+                                    "venta de datos", "socios", "afiliadas", "proveedores"],
+                                   ["vender sus", "venta de datos"]),
+            "✅ Droits Utilisateur": (["derecho de acceso", "derecho de supresión", "derecho al olvido",
+                                       "retirar su consentimiento", "portabilidad", "derecho de oposición",
+                                       "rectificación"],
+                                      ["derecho de supresión", "derecho de oposición"]),
+            "⏰ Conservation": (["conserva", "plazo de conservación", "almacena", "suprimi", "indefinidamente"],
+                                ["indefinidamente"]),
+            "🔒 Sécurité": (["cifrado", "encripta", "segur", "ssl", "https", "tls", "medidas de seguridad"], []),
+            "📢 Marketing": (["marketing", "publicidad", "promocional", "publicidad personalizada",
+                              "comunicaciones comerciales", "boletín"],
+                             ["publicidad personalizada"]),
+            "🌍 Transferts Internationaux": (["transferencia", "internacional", "fuera de", "unión europea",
+                                              "estados unidos", "terceros países"],
+                                             ["terceros países"]),
+            "⚖️ Conformité Légale": (["rgpd", "lopdgdd", "reglamento", "cumplimiento"], ["rgpd"]),
+        },
+        "contexts": (
+            [r"\s+\w+\s+somedop(?!\w)", r"\s+(?:sus|us)(?!\w)"],  # podemos <palabra> / su, sus {keyword}
+            [r"\s+(?:es|son)\s+(?:recopilad|utilizad|compartid|tratad)"],
+        ),
+        "extraction": {
+            "retention_periods": (r"conserva|almacena|guarda", r"(?:durante|por)\s+(\d+\s+(?:días|meses|años))"),
+            "data_types": (r"recopila|recoge|obtene|obtien",
+                           r"\b(?:correo electrónico|dirección ip|nombre|dirección|teléfono|ubicación|pago)\b"),
+            "sharing_entities": (r"compart|divulg|transfer|cede", r"(?:con|a)\s+"),
+            "sharing_terminator": r"[,.;]|(?<!\s)\s+(?:para|que)(?!\w)",
+        },
+        "sentences": [
+            ("sell", r"vendemos|vender\s+(?:sus|tus)", 3.0),
+            ("third_party", r"compart.*?con.*?tercer", 2.5),
+            ("rights", r"(?:usted|tiene).*?derecho", 2.0),
+            ("collection", r"(?:recopilamos|recogemos|obtenemos)", 1.8),
+            ("retention", r"(?:conserva|almacena|guarda).*?(?:durante|hasta)", 1.5),
+            ("security", r"(?:cifr|segur|proteg)", 1.3),
+        ],
+        "practices": (["rgpd"], ["cifrad", "encripta"], ["derecho de supresión", "derecho al olvido"]),
+        "document_types": {
+            "privacy": (["privacidad", "proteccion-de-datos"], ["datos personales", "política de privacidad", "recopilamos"]),
+            "terms": (["terminos", "condiciones"], ["términos y condiciones", "condiciones de uso", "usted acepta"]),
+            "cookie": ([], ["política de cookies", "utilizamos cookies"]),
+            "legal": (["aviso-legal"], []),
+            "content": ([], []),
+        },
+    },
+    "it": {
+        "stopwords": ["il", "gli", "e", "noi", "tuoi", "tuo", "sono", "è", "per", "della", "delle", "dei",
+                      "che", "nostri", "alla", "nel", "degli", "suoi", "questo", "possiamo"],
+        "categories": {
+            "🍪 Cookies & Tracking": (["cookie", "pixel di tracciamento", "web beacon", "archiviazione locale",
+                                      "fingerprint", "identificativ", "statistic"],
+                                     ["pixel di tracciamento", "fingerprint"]),
+            "🔐 Données Personnelles": (["dati personali", "informazioni personali", "dati sensibili",
+                                         "biometric", "dati sanitari", "dati relativi alla salute", "dati finanziari"],
+                                        ["dati sensibili", "biometric", "dati sanitari", "dati finanziari"]),
+            "👥 Partage & Vente": (["terze parti", "terzi", "condivid", "comunica", "trasferi", "vendere i",
+                                    "vendita dei dati", "partner", "affiliate", "fornitori"],
+                                   ["vendere i", "vendita dei dati"]),
+            "✅ Droits Utilisateur": (["diritto di accesso", "diritto alla cancellazione", "diritto all'oblio",
+                                       "revocare il consenso", "portabilità", "diritto di opposizione", "rettifica"],
+                                      ["diritto alla cancellazione", "diritto di opposizione"]),
+            "⏰ Conservation": (["conserva", "periodo di conservazione", "memorizza", "cancellati dopo",
+                                 "indefinitamente"],
+                                ["indefinitamente"]),
+            "🔒 Sécurité": (["crittogra", "cifratura", "sicurezza", "ssl", "https", "tls", "misure di sicurezza"], []),
+            "📢 Marketing": (["marketing", "pubblicità", "promozional", "pubblicità mirata",
+                              "pubblicità personalizzata", "newsletter"],
+                             ["pubblicità mirata", "pubblicità personalizzata"]),
+            "🌍 Transferts Internationaux": (["trasferimento", "internazional", "al di fuori", "unione europea",
+                                              "stati uniti", "paesi terzi"],
+                                             ["paesi terzi"]),
+            "⚖️ Conformité Légale": (["gdpr", "garante", "regolamento", "conformità"], ["gdpr"]),
+        },
+        "contexts": (
+            [r"\s+\w+\s+omaissop(?!\w)", r"\s+(?:iout|out|eut|ious|ous)(?!\w)"],  # possiamo <parola> / tuoi, suoi {keyword}
+            [r"\s+(?:è|sono|viene|vengono)\s+(?:raccolt|utilizzat|condivis|trattat)"],
+        ),
+        "extraction": {
+            "retention_periods": (r"conserv|memorizz", r"(?:per|fino a)\s+(\d+\s+(?:giorni|mesi|anni))"),
+            "data_types": (r"raccogli|raccolt|otteni",
+                           r"\b(?:indirizzo email|indirizzo e-mail|indirizzo ip|email|nome|indirizzo|telefono|posizione|pagamento)\b"),
+            "sharing_entities": (r"condivid|comunic|trasferi|cedi", r"(?:con|a)\s+"),
+            "sharing_terminator": r"[,.;]|(?<!\s)\s+(?:per|che)(?!\w)",
+        },
+        "sentences": [
+            ("sell", r"vendiamo|vendere\s+i", 3.0),
+            ("third_party", r"condivid.*?con.*?terz", 2.5),
+            ("rights", r"(?:hai|ha|avete).*?diritto", 2.0),
+            ("collection", r"(?:raccogliamo|otteniamo|acquisiamo)", 1.8),
+            ("retention", r"(?:conserv|memorizz).*?(?:per|fino)", 1.5),
+            ("security", r"(?:crittogr|sicurezza|protegg)", 1.3),
+        ],
+        "practices": (["gdpr"], ["crittogra", "cifratura"], ["diritto alla cancellazione", "diritto all'oblio"]),
+        "document_types": {
+            "privacy": (["informativa"], ["dati personali", "informativa sulla privacy", "raccogliamo"]),
+            "terms": (["termini", "condizioni"], ["termini e condizioni", "condizioni d'uso", "accetti"]),
+            "cookie": ([], ["cookie policy", "utilizziamo i cookie"]),
+            "legal": (["note-legali"], []),
+            "content": ([], []),
+        },
+        "fold_apostrophes": True,
+    },
+}
+
+DEFAULT_LANGUAGE = "en"
+# Détection de la langue: mots outils lus dans trois échantillons (début, milieu, fin)
+LANGUAGE_SAMPLE_LENGTH = 1000
+LANGUAGE_MAX_PACKS = 2  # langue principale et, au plus, une langue secondaire
+LANGUAGE_MIN_SHARE = 0.3  # part des mots outils reconnus à partir de laquelle une langue secondaire est retenue
+LANGUAGE_WORD = re.compile(r"\w+")
+STOPWORD_LANGUAGES = {
+    word: language for language, definition in RULE_PACK_DEFINITIONS.items() for word in definition["stopwords"]
+}
+
+class RulePack:
+    """Règles compilées d'une ou plusieurs langues: moteur de mots-clés, patterns
+    d'extraction (une série par langue), phrases critiques et bonnes pratiques"""
+
+    def __init__(self, languages):
+        self.languages = languages
+        self.name = "+".join(languages)
+        definitions = [RULE_PACK_DEFINITIONS[language] for language in languages]
+        
+        # Catégories de KEYWORD_CATEGORIES (et leurs poids), mots-clés de toutes les langues
+        self.categories = {}
+        for category, config in KEYWORD_CATEGORIES.items():
+            keywords, critical = [], []
+            for definition in definitions:
+                language_keywords, language_critical = definition["categories"].get(category, ([], []))
+                keywords += language_keywords
+                critical += language_critical
+            self.categories[category] = {
+                "keywords": list(dict.fromkeys(keywords)),
+                "weight": config["weight"],
+                "critical": list(dict.fromkeys(critical)),
+            }
+        self.matcher = KeywordMatcher(
+            (keyword for config in self.categories.values() for keyword in config["keywords"]),
+            [pattern for definition in definitions for pattern in definition["contexts"][0]],
+            [pattern for definition in definitions for pattern in definition["contexts"][1]],
+        )
+        self.fold_apostrophes = any(definition.get("fold_apostrophes") for definition in definitions)
         
-        score = 0
-        for pattern, weight in critical_patterns:
-            if re.search(pattern, sentence, re.IGNORECASE):
-                score += weight
+        self.extraction_regexes = []
+        for definition in definitions:
+            patterns = dict(definition["extraction"])
+            regexes = {"sharing_terminator": re.compile(patterns.pop("sharing_terminator"))}
+            regexes.update({
+                name: (re.compile(trigger), re.compile(target)) for name, (trigger, target) in patterns.items()
+            })
+            self.extraction_regexes.append(regexes)
         
-        if score > 0:
-            scored_sentences.append((sentence, score))
-    
-    # Trier par score et retourner les meilleures
-    scored_sentences.sort(key=lambda x: x[1], reverse=True)
-    return [s[0] for s in scored_sentences[:5]]
+        # Une seule alternance précompilée, un groupe nommé par pattern (préfixé par
+        # la langue). Les patterns sont appliqués sans IGNORECASE sur un texte
+        # replié par fold_ascii_case().
+        self.sentence_patterns = [
+            (f"{language}_{name}", pattern, weight)
+            for language, definition in zip(languages, definitions)
+            for name, pattern, weight in definition["sentences"]
+        ]
+        self.sentence_regex = re.compile(
+            "|".join(f"(?P<{name}>{pattern})" for name, pattern, _ in self.sentence_patterns)
+        )
+        self.sentence_regexes = {name: re.compile(pattern) for name, pattern, _ in self.sentence_patterns}
+        
+        self.practices = [
+            list(dict.fromkeys(marker for definition in definitions for marker in definition["practices"][index]))
+            for index in range(3)
+        ]
+        # Empreinte des règles: les résultats partiels des blocs (block_cache) en dépendent
+        self.fingerprint = hashlib.md5(json.dumps(
+            [languages, definitions], sort_keys=True, ensure_ascii=False
+        ).encode("utf-8")).hexdigest()[:12]
+        self._batch_scorer = None
 
-def summarize_with_groq(text, url):
-    """Génère un résumé avec Groq"""
-    if not groq_client:
-        return None
+    @property
+    def batch_scorer(self):
+        """BatchScorer du pack (None sans NumPy), construit au premier lot"""
+        if self._batch_scorer is None and load_numpy() is not None:
+            self._batch_scorer = BatchScorer(self)
+        return self._batch_scorer
+
+class RulePacks(dict):
+    """{langue: RulePack}, chaque pack compilé au premier document de sa langue (ou par prepare_runtime)"""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+
+    def __missing__(self, language):
+        with self.lock:
+            pack = self.get(language)
+            if pack is None:
+                pack = self[language] = RulePack((language,))
+            return pack
+
+RULE_PACKS = RulePacks()
+
+@lru_cache(maxsize=32)
+def get_rule_pack(languages):
+    """Pack des langues données (dans l'ordre de RULE_PACK_DEFINITIONS)"""
+    languages = tuple(language for language in RULE_PACK_DEFINITIONS if language in languages)
+    if len(languages) == 1:
+        return RULE_PACKS[languages[0]]
+    return RulePack(languages)
+
+def detect_languages(text):
+    """Langues du texte d'après ses mots outils: la plus présente, puis au plus
+    LANGUAGE_MAX_PACKS - 1 autres qui dépassent LANGUAGE_MIN_SHARE"""
+    length = len(text)
+    if length <= 3 * LANGUAGE_SAMPLE_LENGTH:
+        samples = [text]
+    else:
+        middle = (length - LANGUAGE_SAMPLE_LENGTH) // 2
+        samples = [text[:LANGUAGE_SAMPLE_LENGTH], text[middle:middle + LANGUAGE_SAMPLE_LENGTH],
+                   text[-LANGUAGE_SAMPLE_LENGTH:]]
     
-    try:
-        domain = url.split('/')[2] if '/' in url else url
+    counts = Counter(map(STOPWORD_LANGUAGES.get, LANGUAGE_WORD.findall(" ".join(samples).lower())))
+    counts.pop(None, None)
+    if not counts:
+        return (DEFAULT_LANGUAGE,)
+    
+    ranked = [language for language, _ in counts.most_common()]
+    total = sum(counts.values())
+    return (ranked[0], *(
+        language for language in ranked[1:LANGUAGE_MAX_PACKS] if counts[language] >= total * LANGUAGE_MIN_SHARE
+    ))
+
+def select_rule_pack(text):
+    """Pack des langues détectées dans le texte"""
+    return get_rule_pack(frozenset(detect_languages(text)))
+
+def score_sentence(folded, start, end, pack):
+    """Somme des poids des patterns critiques présents dans folded[start:end]"""
+    found = set()
+    position = start
+    while len(found) < len(pack.sentence_patterns):
+        match = pack.sentence_regex.search(folded, position, end)
+        if not match:
+            break
+        found.add(match.lastgroup)
         
-        prompt = f"""Analyse cette politique de confidentialité et fournis un résumé en français.
+        # L'alternance ne rapporte qu'un pattern par position: vérifier les autres
+        match_start = match.start()
+        for name, regex in pack.sentence_regexes.items():
+            if name not in found and regex.match(folded, match_start, end):
+                found.add(name)
+        position = match_start + 1
+    
+    score = 0
+    for name, _, weight in pack.sentence_patterns:
+        if name in found:
+            score += weight
+    return score
 
-Politique de {domain}:
-{text[:3000]}
+def scored_sentences(text, pack, chunk_length=ANALYSIS_CHUNK_LENGTH):
+    """(phrase, score) des phrases critiques du texte, dans l'ordre du texte"""
+    for chunk_start, chunk_end in iter_chunks(text, chunk_length):
+        chunk = text[chunk_start:chunk_end]
+        folded = fold_ascii_case(chunk)
+        for start, end in iter_sentences(folded):
+            if 40 <= end - start <= 400:
+                score = score_sentence(folded, start, end, pack)
+                if score > 0:
+                    yield chunk[start:end], score
 
-Fournis un résumé structuré avec:
-1. 🎯 Objectif principal de la politique (1 ligne)
-2. ⚠️ Points d'attention (2-3 points critiques maximum)
-3. ✅ Points positifs (si pertinents, 1-2 maximum)
+def top_sentences(scored, limit):
+    """Les `limit` phrases les mieux notées de (phrase, score)
 
-Sois concis, précis et direct. Utilise un langage simple."""
+    Tas borné: nlargest conserve l'ordre d'origine à score égal, comme un tri stable.
+    """
+    return heapq.nlargest(limit, scored, key=lambda x: x[1])
 
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "Tu es un expert en protection des données qui analyse les politiques de confidentialité de manière critique et objective."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=300,
-            temperature=0.3
-        )
-        
-        return response.choices[0].message.content
-        
-    except Exception as e:
-        print(f"❌ Erreur Groq: {e}")
-        return None
+def extract_critical_sentences(text, limit=CRITICAL_SENTENCES_LIMIT, chunk_length=ANALYSIS_CHUNK_LENGTH, pack=None):
+    """Extrait les phrases les plus importantes (le texte est parcouru par morceaux)"""
+    pack = pack or select_rule_pack(text)
+    return [s[0] for s in top_sentences(scored_sentences(text, pack, chunk_length), limit)]
+
+def groq_sections(text, min_length, max_length):
+    """Sections de résumé coupées entre deux phrases (iter_blocks): après une modification
+    de la page, les sections inchangées gardent leur résumé en cache"""
+    return iter_blocks(text, min_length, max_length, GROQ_SECTION_SPREAD)
+
+def keyword_density(section):
+    """Risque des mots-clés par caractère: les sections les plus chargées sont résumées"""
+    return analyze_keywords_advanced(section)[1] / len(section)
+
+groq_gateway = GroqGateway(groq_client, summary_cache, split_sections=groq_sections, section_weight=keyword_density)
+
+def summarize_with_groq(text, url, deadline=None):
+    """Génère un résumé avec Groq, au plus tard à l'échéance (time.monotonic) si elle est donnée
+    (DeadlineExceeded si elle l'interrompt, None en cas d'échec)"""
+    domain = url.split('/')[2] if '/' in url else url
+    with metrics.stage("groq"):
+        return groq_gateway.summarize(text, domain, deadline)
 
 def calculate_privacy_score(risk_score, has_gdpr, has_encryption, has_deletion_rights):
     """Calcule un score de confidentialité (0-100, 100 = meilleur)"""
@@ -308,80 +2089,387 @@ def calculate_privacy_score(risk_score, has_gdpr, has_encryption, has_deletion_r
     
     return max(0, min(100, int(score)))
 
+# Types de document, par ordre de priorité: (libellé, marqueurs d'URL, marqueurs
+# de contenu), marqueurs de toutes les langues de RULE_PACK_DEFINITIONS
+DOCUMENT_TYPES = [
+    (label, *(
+        list(dict.fromkeys(
+            marker for definition in RULE_PACK_DEFINITIONS.values()
+            for marker in definition["document_types"][name][index]
+        ))
+        for index in range(2)
+    ))
+    for name, label in [
+        ("privacy", "🔐 Politique de Confidentialité"),
+        ("terms", "📜 Conditions d'Utilisation"),
+        ("cookie", "🍪 Politique de Cookies"),
+        ("legal", "⚖️ Mentions Légales"),
+        ("content", "📝 Règles de Contenu"),
+    ]
+]
+
 def detect_document_type(url, content):
     """Détecte le type de document analysé"""
     url_lower = url.lower()
     content_lower = content[:2000].lower()
     
     # Vérifications par URL
-    if any(x in url_lower for x in ['privacy', 'confidentialite', 'donnees-personnelles']):
-        return "🔐 Politique de Confidentialité"
-    elif any(x in url_lower for x in ['terms', 'conditions', 'cgu', 'cgv']):
-        return "📜 Conditions d'Utilisation"
-    elif any(x in url_lower for x in ['cookie', 'cookies']):
-        return "🍪 Politique de Cookies"
-    elif any(x in url_lower for x in ['legal', 'mentions-legales']):
-        return "⚖️ Mentions Légales"
-    elif any(x in url_lower for x in ['content', 'guidelines', 'community']):
-        return "📝 Règles de Contenu"
-    
-    # Vérifications par contenu
-    privacy_keywords = ['personal data', 'données personnelles', 'privacy policy', 'we collect']
-    terms_keywords = ['terms of service', 'conditions générales', 'user agreement', 'you agree']
-    cookie_keywords = ['cookie policy', 'we use cookies', 'tracking technologies']
-    
-    privacy_score = sum(1 for k in privacy_keywords if k in content_lower)
-    terms_score = sum(1 for k in terms_keywords if k in content_lower)
-    cookie_score = sum(1 for k in cookie_keywords if k in content_lower)
-    
-    max_score = max(privacy_score, terms_score, cookie_score)
-    
-    if max_score == privacy_score and privacy_score > 0:
-        return "🔐 Politique de Confidentialité"
-    elif max_score == terms_score and terms_score > 0:
-        return "📜 Conditions d'Utilisation"
-    elif max_score == cookie_score and cookie_score > 0:
-        return "🍪 Politique de Cookies"
-    
-    return "📄 Document Légal"
-
-def generate_comprehensive_summary(url, content, keyword_analysis, risk_score, structured_data, critical_sentences, ai_summary):
-    """Génère un résumé complet et structuré"""
-    domain = url.split('/')[2] if '/' in url else url
-    doc_type = detect_document_type(url, content)
-    
-    # Extraire le chemin pour plus de contexte
-    path_parts = url.split('/')
-    path_hint = ""
-    if len(path_parts) > 3:
-        # Prendre les 2 derniers segments du chemin (ex: /content/privacy.html)
-        relevant_path = '/'.join(path_parts[-2:])
-        if len(relevant_path) > 40:
-            relevant_path = relevant_path[-40:]
-        path_hint = f" ({relevant_path})"
-    
-    # Calculer le score de confidentialité
-    text_lower = content.lower()
-    has_gdpr = "gdpr" in text_lower
-    has_encryption = "encrypt" in text_lower
-    has_deletion = "right to delete" in text_lower or "right to erasure" in text_lower
+    for label, url_markers, _ in DOCUMENT_TYPES:
+        if any(x in url_lower for x in url_markers):
+            return label
     
-    privacy_score = calculate_privacy_score(risk_score, has_gdpr, has_encryption, has_deletion)
+    # Vérifications par contenu: le plus de marqueurs, le premier type à égalité
+    best_label, best_score = None, 0
+    for label, _, content_markers in DOCUMENT_TYPES:
+        score = sum(1 for k in content_markers if k in content_lower)
+        if score > best_score:
+            best_label, best_score = label, score
     
-    # Déterminer le niveau de risque
-    if privacy_score >= 70:
-        risk_level = "🟢 FAIBLE"
-        risk_emoji = "✅"
-    elif privacy_score >= 40:
-        risk_level = "🟡 MODÉRÉ"
-        risk_emoji = "⚠️"
-    else:
-        risk_level = "🔴 ÉLEVÉ"
-        risk_emoji = "⛔"
-    
-    lines = [
+    return best_label or "📄 Document Légal"
+
+# Parties de l'analyse conservées dans le résultat (celles que le résumé affiche)
+RESULT_MAX_CATEGORIES = 5
+RESULT_MAX_ITEMS = 3
+RESULT_MAX_SENTENCES = 3
+
+@dataclass(slots=True)
+class KeywordHit:
+    keyword: str
+    count: int
+    critical: bool
+
+@dataclass(slots=True)
+class CategoryScore:
+    name: str
+    score: float
+    items: list  # KeywordHit, triés par pertinence
+
+@dataclass(slots=True)
+class AnalysisResult:
+    """Résultat d'analyse d'un document (mis en cache et renvoyé aux clients JSON)
+
+    Le texte affiché par l'extension est produit à la demande par render_summary.
+    """
+    url: str
+    error: str | None = None
+    doc_type: str | None = None
+    privacy_score: int = 0
+    risk_score: float = 0
+    categories: list = field(default_factory=list)  # CategoryScore, plus risqué en premier
+    structured_data: dict = field(default_factory=dict)
+    critical_sentences: list = field(default_factory=list)
+    ai_summary: str | None = None
+    timings: dict | None = None  # Durées par étape (ms) de l'analyse, ni mises en cache ni renvoyées sans trace
+    # Parties non terminées avant l'échéance de la requête ("analysis", "document" ou
+    # "ai_summary"): le résultat est partiel et n'est jamais mis en cache
+    missing: list | None = None
+    # Changements depuis la version précédente de la page (voir document_changes)
+    changes: dict | None = None
+    # Champs de structured_data coupés à STRUCTURED_VALUES_LIMIT valeurs
+    structured_data_truncated: list = field(default_factory=list)
+
+    def to_dict(self):
+        if self.error:
+            data = {"url": self.url, "error": self.error}
+        else:
+            data = self.analysis_dict()
+        if self.missing:
+            data["missing"] = self.missing
+        return data
+
+    def analysis_dict(self):
+        return {
+            "url": self.url,
+            "error": None,
+            "doc_type": self.doc_type,
+            "privacy_score": self.privacy_score,
+            "risk_score": self.risk_score,
+            "categories": [
+                {
+                    "name": category.name,
+                    "score": category.score,
+                    "items": [{"keyword": hit.keyword, "count": hit.count, "critical": hit.critical} for hit in category.items],
+                }
+                for category in self.categories
+            ],
+            "structured_data": self.structured_data,
+            "structured_data_truncated": self.structured_data_truncated,
+            "critical_sentences": self.critical_sentences,
+            "ai_summary": self.ai_summary,
+            "changes": self.changes,
+        }
+
+    def to_row(self):
+        """Forme compacte (listes positionnelles) stockée dans le cache"""
+        if self.error:
+            return [self.url, self.error]
+        return [
+            self.url, None, self.doc_type, self.privacy_score, self.risk_score,
+            [[category.name, category.score, [[hit.keyword, hit.count, hit.critical] for hit in category.items]]
+             for category in self.categories],
+            self.structured_data, self.critical_sentences, self.ai_summary, self.changes,
+            self.structured_data_truncated,
+        ]
+
+    @classmethod
+    def from_row(cls, row):
+        if row[1]:
+            return cls(row[0], row[1])
+        # Les lignes mises en cache avant le suivi des changements n'ont que 9 champs
+        url, _, doc_type, privacy_score, risk_score, categories, structured_data, critical_sentences, ai_summary = row[:9]
+        return cls(
+            url, None, doc_type, privacy_score, risk_score,
+            [CategoryScore(name, score, [KeywordHit(*hit) for hit in items]) for name, score, items in categories],
+            structured_data, critical_sentences, ai_summary, changes=row[9] if len(row) > 9 else None,
+            structured_data_truncated=row[10] if len(row) > 10 else [],
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("error"):
+            return cls(data["url"], data["error"])
+        return cls(
+            url=data["url"],
+            doc_type=data["doc_type"],
+            privacy_score=data["privacy_score"],
+            risk_score=data["risk_score"],
+            categories=[
+                CategoryScore(category["name"], category["score"], [KeywordHit(**hit) for hit in category["items"]])
+                for category in data["categories"]
+            ],
+            structured_data=data["structured_data"],
+            critical_sentences=data["critical_sentences"],
+            ai_summary=data["ai_summary"],
+            changes=data.get("changes"),
+            structured_data_truncated=data.get("structured_data_truncated", []),
+        )
+
+def privacy_practices(content, pack=None):
+    """Bonnes pratiques mentionnées: (RGPD, chiffrement, droit à l'effacement)"""
+    pack = pack or select_rule_pack(content)
+    text_lower = content.lower()
+    if pack.fold_apostrophes:
+        text_lower = text_lower.replace("\u2019", "'")
+    return tuple(any(marker in text_lower for marker in markers) for markers in pack.practices)
+
+# Niveaux de risque: (score de confidentialité minimal, libellé, emoji), du meilleur au pire
+RISK_LEVELS = [
+    (70, "🟢 FAIBLE", "✅"),
+    (40, "🟡 MODÉRÉ", "⚠️"),
+    (0, "🔴 ÉLEVÉ", "⛔"),
+]
+
+def get_risk_level(privacy_score):
+    """(libellé, emoji) du niveau de risque d'un score de confidentialité"""
+    for minimum, label, emoji in RISK_LEVELS:
+        if privacy_score >= minimum:
+            return label, emoji
+    return RISK_LEVELS[-1][1:]
+
+@dataclass(slots=True)
+class BatchScores:
+    """Scores d'un lot de documents (une ligne par document), voir BatchScorer"""
+    scorer: "BatchScorer"
+    keyword_scores: object  # document × mot-clé: occurrences + bonus de contexte
+    category_scores: object  # document × catégorie
+    risk_scores: object
+    privacy_scores: object
+    risk_levels: object  # index dans RISK_LEVELS
+
+    def __len__(self):
+        return len(self.risk_scores)
+
+    def risk_score(self, row):
+        """Score de risque du document, du même type que celui de score_keyword_matches()"""
+        risk_score = self.risk_scores[row].item()
+        return risk_score if risk_score else 0
+
+    def risk_level(self, row):
+        return RISK_LEVELS[self.risk_levels[row]][1:]
+
+    def keyword_analysis(self, row):
+        """Détail par catégorie du document, identique à celui de score_keyword_matches()"""
+        results = {}
+        keyword_scores = self.keyword_scores[row].tolist()
+        for index, (category, first, last) in enumerate(self.scorer.category_columns):
+            found_items = [
+                {"keyword": keyword, "count": int(score), "critical": critical}
+                for (keyword, critical), score in zip(self.scorer.columns[first:last], keyword_scores[first:last])
+                if score > 0
+            ]
+            if found_items:
+                found_items.sort(key=lambda x: (x["critical"], x["count"]), reverse=True)
+                results[category] = {
+                    "items": found_items[:5],
+                    "score": self.category_scores[row, index].item()
+                }
+        return results
+
+class BatchScorer:
+    """Scoring d'un lot de documents en opérations vectorielles (NumPy)
+
+    Les occurrences des mots-clés forment une matrice document × mot-clé. Les
+    scores de catégorie sont son produit avec les poids des mots-clés (doublés
+    pour les mots-clés critiques), accumulé colonne par colonne dans l'ordre de
+    KEYWORD_CATEGORIES: chaque flottant est exactement celui du calcul document
+    par document. Score de confidentialité et niveau de risque sont calculés
+    pour tout le lot à la fois. Un scorer par RulePack (voir RulePack.batch_scorer).
+    """
+
+    def __init__(self, pack):
+        self.pack = pack
+        categories = pack.categories
+        # Une colonne par mot-clé et par catégorie où il figure
+        self.columns = []
+        self.category_columns = []
+        weights = []
+        for category, config in categories.items():
+            first = len(self.columns)
+            for keyword in config["keywords"]:
+                critical = keyword in config["critical"]
+                self.columns.append((keyword, critical))
+                weights.append(config["weight"] * 2 if critical else config["weight"])
+            self.category_columns.append((category, first, len(self.columns)))
+        # Les parcours donnent une valeur par mot-clé du pack, répétée dans chaque catégorie qui le contient
+        keyword_index = {keyword: index for index, keyword in enumerate(pack.matcher.keywords)}
+        self.column_keywords = np.array([keyword_index[keyword] for keyword, _ in self.columns])
+        self.weights = np.array(weights)
+        # Nombre de contextes trouvés pour chaque masque de KeywordMatcher
+        self.context_counts = np.array([bin(mask).count("1") for mask in range(1 << pack.matcher.context_count)])
+        # Seuils croissants des niveaux de risque (le plus bas n'en a pas besoin)
+        self.level_thresholds = np.array([minimum for minimum, _, _ in reversed(RISK_LEVELS[:-1])])
+
+    def count_matrices(self, states):
+        """Matrices document × mot-clé des occurrences et des contextes trouvés,
+        à partir des parcours KeywordMatcher.scan_state() des documents
+
+        Les listes de chaque parcours sont déjà des lignes (une valeur par
+        mot-clé): elles sont lues bout à bout, sans liste intermédiaire.
+        """
+        states = list(states)
+        shape = (len(states), len(self.pack.matcher.keywords))
+        counts = np.fromiter(chain.from_iterable(state["counts"] for state in states),
+                             dtype=np.int64, count=shape[0] * shape[1])
+        masks = np.fromiter(chain.from_iterable(state["contexts"] for state in states),
+                            dtype=np.intp, count=shape[0] * shape[1])
+        count_matrix = counts.reshape(shape)[:, self.column_keywords]
+        context_matrix = self.context_counts[masks.reshape(shape)][:, self.column_keywords]
+        return count_matrix, context_matrix
+
+    def score(self, count_matrix, context_matrix, practices):
+        """BatchScores du lot; `practices` contient une ligne privacy_practices() par document"""
+        keyword_scores = count_matrix + context_matrix * 0.5
+        keyword_risks = keyword_scores * self.weights
+        
+        category_scores = np.zeros((len(keyword_scores), len(self.category_columns)))
+        for index, (_, first, last) in enumerate(self.category_columns):
+            total = category_scores[:, index]
+            for column in range(first, last):
+                total += keyword_risks[:, column]
+        risk_scores = np.zeros(len(keyword_scores))
+        for index in range(len(self.category_columns)):
+            risk_scores += category_scores[:, index]
+        
+        # calculate_privacy_score(), bonus ajoutés dans le même ordre
+        practices = np.asarray(practices, dtype=bool).reshape(len(keyword_scores), 3)
+        privacy = 100 - np.minimum(risk_scores * 2, 60)
+        for column, bonus in enumerate((10, 5, 5)):
+            privacy = privacy + practices[:, column] * bonus
+        privacy_scores = np.clip(np.trunc(privacy), 0, 100).astype(np.int64)
+        
+        risk_levels = len(RISK_LEVELS) - 1 - np.digitize(privacy_scores, self.level_thresholds)
+        return BatchScores(self, keyword_scores, category_scores, risk_scores, privacy_scores, risk_levels)
+
+    def score_texts(self, texts, chunk_length=ANALYSIS_CHUNK_LENGTH):
+        texts = list(texts)
+        count_matrix, context_matrix = self.count_matrices(
+            self.pack.matcher.scan_state(keyword_chunks(text, chunk_length, self.pack)) for text in texts
+        )
+        return self.score(count_matrix, context_matrix, [privacy_practices(text, self.pack) for text in texts])
+
+def score_documents(texts, chunk_length=ANALYSIS_CHUNK_LENGTH):
+    """Scores d'un lot de textes: [(keyword_analysis, risk_score, privacy_score, (niveau, emoji))],
+    identiques à ceux de analyze_keywords_advanced, calculate_privacy_score et get_risk_level
+
+    Les textes sont regroupés par RulePack (langues détectées), un lot par pack.
+    """
+    texts = list(texts)
+    scores = [None] * len(texts)
+    groups = {}
+    for index, text in enumerate(texts):
+        groups.setdefault(select_rule_pack(text), []).append(index)
+    
+    for pack, indexes in groups.items():
+        if pack.batch_scorer is None:
+            # Sans NumPy: document par document
+            for index in indexes:
+                keyword_analysis, risk_score = analyze_keywords_advanced(texts[index], chunk_length, pack)
+                privacy_score = calculate_privacy_score(risk_score, *privacy_practices(texts[index], pack))
+                scores[index] = (keyword_analysis, risk_score, privacy_score, get_risk_level(privacy_score))
+            continue
+        
+        batch = pack.batch_scorer.score_texts([texts[index] for index in indexes], chunk_length)
+        for row, index in enumerate(indexes):
+            scores[index] = (batch.keyword_analysis(row), batch.risk_score(row),
+                             batch.privacy_scores[row].item(), batch.risk_level(row))
+    return scores
+
+def build_analysis_result(url, content, keyword_analysis, risk_score, structured_data, critical_sentences, ai_summary,
+                          privacy_score=None):
+    """Assemble le résultat structuré d'un document analysé (`privacy_score`: déjà calculé par score_documents)"""
+    # Calculer le score de confidentialité
+    if privacy_score is None:
+        privacy_score = calculate_privacy_score(risk_score, *privacy_practices(content))
+    
+    # Trier les catégories par score (plus risqué en premier)
+    sorted_categories = sorted(
+        keyword_analysis.items(),
+        key=lambda x: x[1]["score"],
+        reverse=True
+    )[:RESULT_MAX_CATEGORIES]
+    
+    truncated = [name for name, values in structured_data.items() if len(values) > STRUCTURED_VALUES_LIMIT]
+    return AnalysisResult(
+        url=url,
+        doc_type=detect_document_type(url, content),
+        privacy_score=privacy_score,
+        risk_score=risk_score,
+        categories=[
+            CategoryScore(category, data["score"], [
+                KeywordHit(item["keyword"], item["count"], item["critical"])
+                for item in data["items"][:RESULT_MAX_ITEMS]
+            ])
+            for category, data in sorted_categories
+        ],
+        structured_data={name: values[:STRUCTURED_VALUES_LIMIT] for name, values in structured_data.items()},
+        critical_sentences=critical_sentences[:RESULT_MAX_SENTENCES],
+        ai_summary=ai_summary,
+        structured_data_truncated=truncated,
+    )
+
+def render_summary(result):
+    """Génère le résumé texte complet et structuré d'un résultat"""
+    url = result.url
+    domain = url.split('/')[2] if '/' in url else url
+    
+    # Extraire le chemin pour plus de contexte
+    path_parts = url.split('/')
+    path_hint = ""
+    if len(path_parts) > 3:
+        # Prendre les 2 derniers segments du chemin (ex: /content/privacy.html)
+        relevant_path = '/'.join(path_parts[-2:])
+        if len(relevant_path) > 40:
+            relevant_path = relevant_path[-40:]
+        path_hint = f" ({relevant_path})"
+    
+    privacy_score = result.privacy_score
+    
+    # Déterminer le niveau de risque
+    risk_level, risk_emoji = get_risk_level(privacy_score)
+    
+    lines = [
         f"{'='*70}",
-        f"{doc_type.upper()}",
+        f"{result.doc_type.upper()}",
         f"🌐 Site: {domain}{path_hint}",
         f"{'='*70}",
         f"",
@@ -390,34 +2478,52 @@ def generate_comprehensive_summary(url, content, keyword_analysis, risk_score, s
     ]
     
     # Résumé IA si disponible
-    if ai_summary:
+    if result.ai_summary:
         lines.append(f"🤖 RÉSUMÉ INTELLIGENT:")
-        lines.append(f"{ai_summary}")
+        lines.append(f"{result.ai_summary}")
+        lines.append(f"")
+    elif result.missing and "ai_summary" in result.missing:
+        lines.append(f"⏱️ Résumé IA non terminé à temps: réessayez pour l'obtenir.")
+        lines.append(f"")
+    
+    # Changements depuis la version précédente de la page
+    changes = result.changes
+    if changes:
+        since = datetime.fromisoformat(changes["since"]).strftime("%d/%m/%Y")
+        lines.append(f"🆕 CHANGEMENTS DEPUIS LE {since}:")
+        lines.append(f"")
+        for sentence in changes["added"]:
+            display = sentence[:250] + "..." if len(sentence) > 250 else sentence
+            lines.append(f"  ➕ Nouveau: \"{display}\"")
+        for sentence in changes["removed"]:
+            display = sentence[:250] + "..." if len(sentence) > 250 else sentence
+            lines.append(f"  ➖ Retiré: \"{display}\"")
+        for name, label in CHANGES_DATA_LABELS.items():
+            if name in changes["data_added"]:
+                lines.append(f"  ➕ {label}: {', '.join(changes['data_added'][name][:RESULT_MAX_ITEMS])}")
+            if name in changes["data_removed"]:
+                lines.append(f"  ➖ {label}: {', '.join(changes['data_removed'][name][:RESULT_MAX_ITEMS])}")
+        if changes["risk_score_before"] != result.risk_score:
+            lines.append(f"  Score de risque: {changes['risk_score_before']} → {result.risk_score}")
+        lines.append(f"  ({changes['blocks_added']} passage(s) ajouté(s) ou modifié(s) sur {changes['blocks_total']})")
         lines.append(f"")
     
     # Analyse par catégories
-    if keyword_analysis:
+    if result.categories:
         lines.append(f"🔍 ANALYSE DÉTAILLÉE:")
         lines.append(f"")
         
-        # Trier les catégories par score (plus risqué en premier)
-        sorted_categories = sorted(
-            keyword_analysis.items(),
-            key=lambda x: x[1]["score"],
-            reverse=True
-        )
-        
-        for category, data in sorted_categories[:5]:  # Top 5 catégories
-            items = data["items"]
-            lines.append(f"{category}")
+        for category in result.categories[:RESULT_MAX_CATEGORIES]:  # Top 5 catégories
+            lines.append(f"{category.name}")
             
-            for item in items[:3]:  # Top 3 items par catégorie
-                critical_marker = "⚠️ " if item["critical"] else ""
-                lines.append(f"  • {critical_marker}{item['keyword']} ({item['count']}x)")
+            for hit in category.items[:RESULT_MAX_ITEMS]:  # Top 3 items par catégorie
+                critical_marker = "⚠️ " if hit.critical else ""
+                lines.append(f"  • {critical_marker}{hit.keyword} ({hit.count}x)")
             
             lines.append(f"")
     
     # Données structurées extraites
+    structured_data = result.structured_data
     if structured_data:
         lines.append(f"📊 INFORMATIONS CLÉS:")
         lines.append(f"")
@@ -426,19 +2532,19 @@ def generate_comprehensive_summary(url, content, keyword_analysis, risk_score, s
             lines.append(f"  Données collectées: {', '.join(structured_data['data_types'])}")
         
         if "retention_periods" in structured_data:
-            lines.append(f"  Durées de rétention: {', '.join(structured_data['retention_periods'])}")
+            lines.append(f"  Durées de rétention: {', '.join(structured_data['retention_periods'][:RESULT_MAX_ITEMS])}")
         
         if "sharing_entities" in structured_data:
-            lines.append(f"  Partage avec: {', '.join(structured_data['sharing_entities'][:3])}")
+            lines.append(f"  Partage avec: {', '.join(structured_data['sharing_entities'][:RESULT_MAX_ITEMS])}")
         
         lines.append(f"")
     
     # Phrases critiques
-    if critical_sentences:
+    if result.critical_sentences:
         lines.append(f"⚠️ EXTRAITS IMPORTANTS:")
         lines.append(f"")
         
-        for i, sentence in enumerate(critical_sentences[:3], 1):
+        for i, sentence in enumerate(result.critical_sentences[:RESULT_MAX_SENTENCES], 1):
             # Tronquer si trop long
             display = sentence[:250] + "..." if len(sentence) > 250 else sentence
             lines.append(f"{i}. \"{display}\"")
@@ -446,155 +2552,1158 @@ def generate_comprehensive_summary(url, content, keyword_analysis, risk_score, s
     
     return "\n".join(lines)
 
-def analyze_single_url(url):
-    """Analyse une seule URL (utilisé pour le threading)"""
-    cache_key = get_cache_key(url)
+def analyze_content(content):
+    """Étapes CPU de l'analyse: langue, mots-clés, données structurées et phrases critiques"""
+    with metrics.stage("language"):
+        pack = select_rule_pack(content)
+    metrics.inc("trustadvisor_documents_analyzed_total", language=pack.name)
+    with metrics.stage("keywords"):
+        keyword_analysis, risk_score = analyze_keywords_advanced(content, pack=pack)
+    with metrics.stage("extraction"):
+        structured_data = extract_structured_data(content, pack=pack)
+    with metrics.stage("sentences"):
+        critical_sentences = extract_critical_sentences(content, pack=pack)
+    return keyword_analysis, risk_score, structured_data, critical_sentences
+
+def extract_details(content):
+    """Étapes CPU de l'analyse sauf les mots-clés, notés par lot (score_documents):
+    données structurées et phrases critiques"""
+    pack = select_rule_pack(content)
+    metrics.inc("trustadvisor_documents_analyzed_total", language=pack.name)
+    with metrics.stage("extraction"):
+        structured_data = extract_structured_data(content, pack=pack)
+    with metrics.stage("sentences"):
+        critical_sentences = extract_critical_sentences(content, pack=pack)
+    return structured_data, critical_sentences
+
+def split_blocks(content):
+    """[(empreinte, texte)] des blocs du document (voir iter_blocks)"""
+    return [(block_hash(content[start:end]), content[start:end]) for start, end in iter_blocks(content)]
+
+def analyze_block(block, pack):
+    """Résultats partiels d'un bloc: [{mot-clé: [occurrences, masque des contextes]},
+    {champ: [valeurs extraites]}, [[phrase critique, score]] (les mieux notées)]
+
+    Les blocs sont coupés entre deux phrases: aucun mot-clé, contexte, phrase
+    ou valeur extraite n'est à cheval sur deux blocs, et leur fusion
+    (merge_block_results) donne le résultat d'analyze_content.
+    """
+    with metrics.stage("keywords"):
+        state = pack.matcher.scan_state(keyword_chunks(block, pack=pack))
+        keywords = {
+            keyword: [count, mask]
+            for keyword, count, mask in zip(pack.matcher.keywords, state["counts"], state["contexts"])
+            if count
+        }
+    with metrics.stage("extraction"):
+        structured_data = extract_structured_data(block, pack=pack)
+    with metrics.stage("sentences"):
+        sentences = top_sentences(scored_sentences(block, pack), CRITICAL_SENTENCES_LIMIT)
+    return [keywords, structured_data, [list(sentence) for sentence in sentences]]
+
+def merge_block_results(partials, pack):
+    """Résultats d'analyze_content à partir des résultats partiels des blocs (dans l'ordre du texte)"""
+    counts = Counter()
+    masks = {}
+    for keywords, _, _ in partials:
+        for keyword, (count, mask) in keywords.items():
+            counts[keyword] += count
+            masks[keyword] = masks.get(keyword, 0) | mask
+    matches = {keyword: (count, bin(masks[keyword]).count("1")) for keyword, count in counts.items()}
+    keyword_analysis, risk_score = score_keyword_matches(matches, pack)
+    
+    found = {name: {} for name in EXTRACTION_PATTERNS}
+    for _, values, _ in partials:
+        for name, field_values in values.items():
+            for value in field_values:
+                found[name].setdefault(value, None)
+    structured_data = {name: list(values) for name, values in found.items() if values}
+    
+    # Les meilleures phrases du document sont parmi les meilleures de chaque bloc
+    sentences = top_sentences(chain.from_iterable(partial[2] for partial in partials), CRITICAL_SENTENCES_LIMIT)
+    return keyword_analysis, risk_score, structured_data, [sentence for sentence, _ in sentences]
+
+def block_partials(blocks, pack):
+    """{empreinte: résultats partiels} des blocs [(empreinte, texte)]: repris de
+    block_cache, sinon calculés (analyze_block) et mis en cache"""
+    prefix = pack.fingerprint + ":"
+    texts = dict(blocks)
+    cached = block_cache.get_many([prefix + key for key in texts])
+    partials = {key: cached[prefix + key] for key in texts if prefix + key in cached}
+    computed = {key: analyze_block(text, pack) for key, text in texts.items() if key not in partials}
+    block_cache.set_many({prefix + key: partial for key, partial in computed.items()})
+    count_dedup("blocks_reused", len(partials))
+    count_dedup("blocks_analyzed", len(computed))
+    return {**partials, **computed}
+
+def analyze_content_blocks(blocks, pack):
+    """Comme analyze_content, bloc par bloc: seuls les blocs jamais analysés (avec
+    ces règles) le sont, les autres reprennent leurs résultats partiels"""
+    metrics.inc("trustadvisor_documents_analyzed_total", language=pack.name)
+    partials = block_partials(blocks, pack)
+    with metrics.stage("merge"):
+        return merge_block_results([partials[key] for key, _ in blocks], pack)
+
+def document_changes(cache_key, blocks, pack, result):
+    """Enregistre la version analysée de la page et retourne ce qui a changé depuis la précédente
+
+    Les changements sont ceux de cette analyse si les blocs diffèrent de la
+    version précédente, ceux de la dernière modification si la page n'a pas
+    changé, None pour une page jamais vue.
+    """
+    keys = [key for key, _ in blocks]
+    cached = document_versions.get(cache_key)
+    previous = cached[0] if cached else None
+    if previous is None:
+        changes, seen_at = None, datetime.now().isoformat(timespec="seconds")
+    elif previous["blocks"] == keys:
+        changes, seen_at = previous["changes"], previous["seen_at"]
+    else:
+        changes, seen_at = diff_versions(previous, blocks, pack, result), datetime.now().isoformat(timespec="seconds")
+    document_versions.set(cache_key, {
+        "rules": pack.fingerprint,
+        "blocks": keys,
+        "seen_at": seen_at,
+        "structured_data": result.structured_data,
+        "structured_data_truncated": result.structured_data_truncated,
+        "risk_score": result.risk_score,
+        "changes": changes,
+    })
+    return changes
+
+def diff_versions(previous, blocks, pack, result):
+    """Différences avec la version précédente: blocs ajoutés et retirés, phrases critiques
+    qu'ils apportent ou retirent, valeurs extraites et score de risque"""
+    current = dict(blocks)
+    added = [(key, text) for key, text in current.items() if key not in set(previous["blocks"])]
+    removed = [key for key in dict.fromkeys(previous["blocks"]) if key not in current]
+    added_partials = block_partials(added, pack).values() if added else []
+    # Les blocs retirés ont été analysés avec les règles de la version précédente (s'ils sont encore en cache)
+    prefix = previous["rules"] + ":"
+    removed_partials = block_cache.get_many([prefix + key for key in removed]).values()
     
+    new_sentences = [tuple(sentence) for partial in added_partials for sentence in partial[2]]
+    old_sentences = [tuple(sentence) for partial in removed_partials for sentence in partial[2]]
+    new_texts = {sentence for sentence, _ in new_sentences}
+    old_texts = {sentence for sentence, _ in old_sentences}
+    
+    # Champ coupé d'un côté: une valeur absente peut n'être qu'au-delà de la limite
+    truncated = {*previous.get("structured_data_truncated", ()), *result.structured_data_truncated}
+    
+    def values_difference(data, other):
+        difference = {}
+        for name, values in data.items():
+            if name in truncated:
+                continue
+            known = set(other.get(name, ()))
+            values = [value for value in values if value not in known]
+            if values:
+                difference[name] = values
+        return difference
+    
+    return {
+        "since": previous["seen_at"],
+        "blocks_total": len(blocks),
+        "blocks_added": len(added),
+        "blocks_removed": len(removed),
+        "added": [s for s, _ in top_sentences((s for s in new_sentences if s[0] not in old_texts), CHANGES_MAX_ITEMS)],
+        "removed": [s for s, _ in top_sentences((s for s in old_sentences if s[0] not in new_texts), CHANGES_MAX_ITEMS)],
+        "data_added": values_difference(result.structured_data, previous["structured_data"]),
+        "data_removed": values_difference(previous["structured_data"], result.structured_data),
+        "risk_score_before": previous["risk_score"],
+    }
+
+def analyze_single_url(url, cache_key=None, deadline=None):
+    """Analyse une seule URL (utilisé pour le threading), avec la durée de chaque étape"""
+    with metrics.trace() as timings:
+        result = analyze_url(url, cache_key or get_cache_key(url), deadline)
+    result.timings = timings
+    return result
+
+def analyze_url(url, cache_key, deadline=None):
     # Vérifier le cache
-    if cache_key in analysis_cache and is_cache_valid(analysis_cache[cache_key]):
-        print(f"💾 Cache hit pour {url}")
-        return analysis_cache[cache_key]["result"]
+    with metrics.stage("cache"):
+        cached = analysis_cache.get(cache_key)
+    if cached:
+        result, is_stale = cached
+        if is_stale and analysis_cache.begin_refresh(cache_key):
+            # Servir le résultat périmé et le rafraîchir en arrière-plan
+            print(f"♻️ Cache périmé pour {url}, rafraîchissement en arrière-plan")
+            analysis_executor.submit(refresh_analysis, url, cache_key)
+        else:
+            print(f"💾 Cache hit pour {url}")
+        result = AnalysisResult.from_row(result)
+        result.url = url
+        return result
     
+    return run_analysis(url, cache_key, deadline=deadline)
+
+def refresh_analysis(url, cache_key):
+    """Ré-analyse une URL dont le résultat en cache est périmé"""
+    try:
+        run_analysis(url, cache_key, fetch=download_page_content)
+    except Exception as e:
+        print(f"❌ Erreur lors du rafraîchissement de {url}: {e}")
+    finally:
+        analysis_cache.end_refresh(cache_key)
+
+def run_analysis(url, cache_key, fetch=None, deadline=None):
+    """Analyse complète d'une URL, sans consulter le cache
+
+    Avec une échéance (time.monotonic), le téléchargement et le résumé IA
+    s'arrêtent quand elle est atteinte: le résultat, partiel, le signale
+    (AnalysisResult.missing) et n'est pas mis en cache.
+    """
     print(f"🔍 Analyse de {url}")
     
-    # Récupérer le contenu
-    content = fetch_page_content(url)
+    # Récupérer le contenu (sans paramètres de suivi ni fragment)
+    try:
+        content = (fetch or fetch_page_content)(canonicalize_url(url), deadline)
+    except DeadlineExceeded:
+        metrics.inc("trustadvisor_deadline_exceeded_total", stage="document")
+        return AnalysisResult(url, "⏱️ Page non téléchargée avant l'échéance", missing=["document"])
     
     if not content or len(content) < 500:
-        return {
-            "url": url,
-            "error": "❌ Contenu insuffisant ou inaccessible",
-            "summary": None
-        }
+        return AnalysisResult(url, "❌ Contenu insuffisant ou inaccessible")
     
-    # Analyses en parallèle (conceptuellement - Python GIL limite le vrai parallélisme)
-    keyword_analysis, risk_score = analyze_keywords_advanced(content)
-    structured_data = extract_structured_data(content)
-    critical_sentences = extract_critical_sentences(content)
-    ai_summary = summarize_with_groq(content, url)
+    with metrics.stage("language"):
+        pack = select_rule_pack(content)
+    with metrics.stage("blocks"):
+        blocks = split_blocks(content)
     
-    # Générer le résumé complet
-    summary = generate_comprehensive_summary(
-        url, content, keyword_analysis, risk_score,
-        structured_data, critical_sentences, ai_summary
-    )
+    # Texte déjà analysé pour une autre URL (miroir, langue par défaut, ancienne adresse)
+    content_key = get_content_key(content)
+    reused = document_cache.get(content_key)
+    if reused:
+        count_dedup("content_hits")
+        print(f"♻️ Texte déjà analysé, résultat réutilisé pour {url}")
+        result = AnalysisResult.from_row(reused[0])
+        result.url = url
+        result.doc_type = detect_document_type(url, content)
+    else:
+        count_dedup("content_misses")
+        
+        # Étapes CPU, limitées aux blocs du texte jamais analysés (une page
+        # modifiée reprend les résultats partiels de ses blocs inchangés)
+        keyword_analysis, risk_score, structured_data, critical_sentences = analyze_content_blocks(blocks, pack)
+        try:
+            ai_summary = summarize_near_duplicate(content, content_key, url, deadline)
+            summary_cut = False
+        except DeadlineExceeded:
+            ai_summary, summary_cut = None, True
+        
+        with metrics.stage("result"):
+            result = build_analysis_result(
+                url, content, keyword_analysis, risk_score,
+                structured_data, critical_sentences, ai_summary
+            )
+        # Résumé interrompu par l'échéance de la requête (pas un échec de Groq):
+        # la prochaine demande le complète (les sections déjà résumées sont en cache)
+        if summary_cut:
+            metrics.inc("trustadvisor_deadline_exceeded_total", stage="ai_summary")
+            result.missing = ["ai_summary"]
+            return result
+        document_cache.set(content_key, result.to_row())
     
-    result = {
-        "url": url,
-        "summary": summary,
-        "error": None,
-        "risk_score": risk_score
-    }
+    # Changements depuis la version précédente de cette page (pas du même texte ailleurs)
+    with metrics.stage("changes"):
+        result.changes = document_changes(cache_key, blocks, pack, result)
     
-    # Mettre en cache
-    analysis_cache[cache_key] = {
-        "timestamp": datetime.now(),
-        "result": result
-    }
+    # Mettre en cache (forme structurée, le texte est rendu à la demande), aussi
+    # sous la page finale si le téléchargement a révélé une redirection
+    row = result.to_row()
+    analysis_cache.set(cache_key, row)
+    final_key = url_key(resolve_redirect(canonicalize_url(url)))
+    if final_key != cache_key:
+        analysis_cache.set(final_key, row)
     
     return result
 
-@app.route("/analyze", methods=["POST"])
-def analyze():
-    try:
-        data = request.get_json()
-        urls = data.get("urls", [])
-        
-        if not urls:
-            return jsonify({"error": "Aucune URL fournie"}), 400
-        
-        # Limiter à 3 URLs pour ne pas surcharger
-        urls = urls[:3]
-        
-        # Analyser les URLs en parallèle avec ThreadPoolExecutor
-        results = []
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            future_to_url = {executor.submit(analyze_single_url, url): url for url in urls}
+def summarize_near_duplicate(content, content_key, url, deadline=None):
+    """Résumé IA, repris d'une politique quasi identique (même modèle, autre éditeur) si possible
+
+    Seul le résumé est repris, avec les noms et le domaine du document
+    d'origine remplacés; les étapes CPU sont toujours refaites sur ce texte.
+    """
+    if not groq_gateway.client:
+        return None
+    with metrics.stage("near_duplicates"):
+        entities = extract_entities(content, url)
+        signature = minhash_signature(template_words(content, entities))
+        match = near_duplicates.find(signature)
+    if match:
+        similarity, previous_entities, summary = match
+        print(f"🧬 Politique quasi identique ({similarity:.0%}), résumé réutilisé pour {url}")
+        return patch_entities(summary, previous_entities, entities)
+    
+    ai_summary = summarize_with_groq(content, url, deadline)
+    if ai_summary:
+        near_duplicates.add(content_key, signature, entities, ai_summary)
+    return ai_summary
+
+class SingleFlight:
+    """Regroupe les analyses concurrentes d'une même clé sur un seul Future
+
+    Chaque analyse en cours garde l'échéance avec laquelle elle a été lancée
+    (None: aucune). Une analyse coupée par cette échéance ne sert pas une
+    requête qui a plus de temps: celle-ci en relance une avec la sienne
+    (voir iter_analysis_results).
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.lock = threading.Lock()
+        self.in_flight = {}  # clé -> (Future, échéance)
+        self.counters = {"started": 0, "coalesced": 0, "relaunched": 0}
+
+    def submit(self, key, deadline, func, *args, later_than=None):
+        """(Future, échéance) de l'analyse en cours pour cette clé, ou d'une nouvelle
+        lancée avec `deadline`
+
+        Avec `later_than`, une analyse en cours dont l'échéance n'est pas
+        postérieure n'est pas rejointe: une nouvelle la remplace.
+        """
+        with self.lock:
+            flight = self.in_flight.get(key)
+            if flight and not flight[0].done() and \
+                    (later_than is None or flight[1] is None or flight[1] > later_than):
+                self.counters["coalesced"] += 1
+                return flight
+            future = self.executor.submit(func, *args)
+            flight = self.in_flight[key] = (future, deadline)
+            self.counters["started"] += 1
+            if later_than is not None:
+                self.counters["relaunched"] += 1
+        future.add_done_callback(lambda _: self.forget(key, future))
+        return flight
+
+    def forget(self, key, future):
+        with self.lock:
+            flight = self.in_flight.get(key)
+            if flight and flight[0] is future:
+                del self.in_flight[key]
+
+    def stats(self):
+        with self.lock:
+            return {"in_flight": len(self.in_flight), **self.counters}
+
+analysis_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analyse")
+analysis_flights = SingleFlight(analysis_executor)
+
+class CacheRefresher:
+    """Rafraîchit les résultats demandés souvent avant qu'ils n'expirent
+
+    Chaque processus compte les accès par clé de cache et les ajoute
+    périodiquement à une table SQLite partagée, où le poids d'un accès diminue
+    de moitié à chaque demi-vie. Un seul processus (celui qui obtient le verrou
+    de fichier) rafraîchit les clés populaires dont l'expiration approche, et
+    les pages à préchauffer absentes du cache: une à la fois, au plus
+    `per_minute` par minute, et seulement quand aucune analyse n'est en cours
+    dans ce processus. Le téléchargement est conditionnel (ETag,
+    Last-Modified): une page inchangée ne coûte qu'une réponse 304. Une entrée
+    périmée reste servie pendant son rafraîchissement (voir analyze_url).
+    """
+
+    def __init__(self, db_path, interval=REFRESH_INTERVAL, ahead=REFRESH_AHEAD, min_hits=REFRESH_MIN_HITS,
+                 half_life=REFRESH_HALF_LIFE, per_minute=REFRESH_PER_MINUTE, max_tracked=REFRESH_MAX_TRACKED):
+        self.db_path = db_path
+        self.interval = interval
+        self.ahead = ahead.total_seconds()
+        self.min_hits = min_hits
+        self.half_life = half_life.total_seconds()
+        self.bucket = TokenBucket(per_minute / 60, 1)
+        self.max_tracked = max_tracked
+        self.lock = threading.Lock()
+        self.pending = {}  # clé -> [url, accès] depuis le dernier envoi vers la table
+        self.retry_after = {}  # clé -> horodatage: page inaccessible, pas de nouvel essai avant
+        self.thread = None
+        self.stopping = threading.Event()
+        self.lock_file = None
+        self.counters = {"passes": 0, "refreshed": 0, "prewarmed": 0, "deferred": 0, "failures": 0}
+        self.db = None
+
+    def open_db(self):
+        if not self.db_path:
+            return
+        try:
+            self.db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS cache_access ("
+                "key TEXT PRIMARY KEY, url TEXT NOT NULL, score REAL NOT NULL, updated_at REAL NOT NULL, "
+                "pinned INTEGER NOT NULL DEFAULT 0)"
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Rafraîchissement en arrière-plan désactivé ({self.db_path}): {e}")
+            self.db = None
+
+    def start(self, seeds=()):
+        """Démarre le planificateur de ce processus (après le fork des workers)"""
+        self.open_db()
+        if not self.db:
+            return
+        self.pin(seeds)
+        self.thread = threading.Thread(target=self.run, name="rafraichissement", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join()
+
+    def record(self, key, url):
+        """Compte une demande de la clé (appelé pour chaque URL de /analyze)"""
+        if self.db is None:
+            return
+        with self.lock:
+            entry = self.pending.get(key)
+            if entry:
+                entry[1] += 1
+            else:
+                self.pending[key] = [url, 1]
+
+    def pin(self, urls):
+        """Pages à préchauffer: rafraîchies dès qu'elles manquent au cache, quelle que soit leur popularité"""
+        now = time.time()
+        rows = [(get_cache_key(url), url, now) for url in urls]
+        with self.lock:
+            self.db.executemany(
+                "INSERT INTO cache_access (key, url, score, updated_at, pinned) VALUES (?, ?, 0, ?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET pinned = 1", rows
+            )
+
+    def decayed(self, score, updated_at, now):
+        return score * 0.5 ** ((now - updated_at) / self.half_life)
+
+    def flush(self):
+        """Ajoute les accès comptés depuis le dernier envoi aux poids de la table partagée"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            if not pending:
+                return
+            now = time.time()
+            try:
+                self.db.execute("BEGIN IMMEDIATE")
+                try:
+                    for key, (url, hits) in pending.items():
+                        row = self.db.execute("SELECT score, updated_at FROM cache_access WHERE key = ?", (key,)).fetchone()
+                        score = hits + (self.decayed(*row, now) if row else 0)
+                        self.db.execute(
+                            "INSERT INTO cache_access (key, url, score, updated_at) VALUES (?, ?, ?, ?) "
+                            "ON CONFLICT(key) DO UPDATE SET url = excluded.url, score = excluded.score, "
+                            "updated_at = excluded.updated_at", (key, url, score, now)
+                        )
+                    self.db.execute(
+                        "DELETE FROM cache_access WHERE pinned = 0 AND key IN ("
+                        "SELECT key FROM cache_access WHERE pinned = 0 ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_tracked,)
+                    )
+                    self.db.execute("COMMIT")
+                except sqlite3.Error:
+                    self.db.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as e:
+                # Table verrouillée par un autre worker: les accès seront envoyés à la passe suivante
+                self.pending = pending
+                print(f"⚠️ Statistiques d'accès non enregistrées: {e}")
+
+    def is_leader(self):
+        """Vrai pour le seul processus qui rafraîchit (verrou de fichier, gardé jusqu'à sa fin)"""
+        if self.lock_file:
+            return True
+        try:
+            import fcntl
+        except ImportError:  # Windows: un seul processus (serveur de développement)
+            self.lock_file = True
+            return True
+        lock_file = open(f"{self.db_path}.refresh.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+        return True
+
+    def due(self, now):
+        """[(clé, url, préchauffage)] à rafraîchir, les plus demandées d'abord"""
+        with self.lock:
+            rows = self.db.execute("SELECT key, url, score, updated_at, pinned FROM cache_access").fetchall()
+        candidates = []
+        for key, url, score, updated_at, pinned in rows:
+            score = self.decayed(score, updated_at, now)
+            if score < self.min_hits and not pinned or self.retry_after.get(key, 0) > now:
+                continue
+            created_at = analysis_cache.created_at(key)
+            if created_at is None:
+                candidates.append((score, key, url, bool(pinned)))
+            elif created_at + analysis_cache.ttl - now < self.ahead:
+                candidates.append((score, key, url, False))
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return [(key, url, prewarm) for _, key, url, prewarm in candidates]
+
+    def run_pass(self):
+        """Une passe du planificateur: envoi des accès puis rafraîchissements dus"""
+        self.flush()
+        if not self.is_leader():
+            return
+        with self.lock:
+            self.counters["passes"] += 1
+        deadline = time.monotonic() + self.interval
+        for key, url, prewarm in self.due(time.time()):
+            # Les demandes des utilisateurs passent d'abord: le reste attendra la passe suivante
+            if analysis_flights.stats()["in_flight"] or not self.bucket.acquire(deadline):
+                with self.lock:
+                    self.counters["deferred"] += 1
+                return
+            if not analysis_cache.begin_refresh(key):
+                continue
+            try:
+                failed = run_analysis(url, key, fetch=download_page_content).error
+            except Exception as e:
+                failed = True
+                print(f"❌ Erreur lors du rafraîchissement de {url}: {e}")
+            finally:
+                analysis_cache.end_refresh(key)
+            with self.lock:
+                if failed:
+                    self.counters["failures"] += 1
+                    self.retry_after[key] = time.time() + self.ahead
+                else:
+                    self.retry_after.pop(key, None)
+                    self.counters["prewarmed" if prewarm else "refreshed"] += 1
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                self.run_pass()
+            except Exception as e:
+                print(f"❌ Erreur du planificateur de rafraîchissement: {e}")
+            self.stopping.wait(self.interval)
+
+    def stats(self):
+        with self.lock:
+            return {"running": self.thread is not None, "leader": bool(self.lock_file),
+                    "pending": len(self.pending), **self.counters}
+
+cache_refresher = CacheRefresher(CACHE_DB_PATH)
+
+def start_cache_refresher():
+    """Démarre le rafraîchissement en arrière-plan et le préchauffage (TRUSTADVISOR_REFRESH=0 pour s'en passer)"""
+    if REFRESH_ENABLED:
+        cache_refresher.start(read_batch_sources(PREWARM_FILE) if PREWARM_FILE else ())
+
+def is_url_source(source):
+    return source.startswith(("http://", "https://"))
+
+def list_saved_pages(directory):
+    """Pages HTML enregistrées d'un répertoire (récursif), dans un ordre stable"""
+    pages = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(BATCH_HTML_EXTENSIONS):
+                pages.append(os.path.join(root, name))
+    return pages
+
+def read_batch_sources(path):
+    """Sources d'un lot: les pages d'un répertoire, ou un fichier d'URLs (une par ligne, # pour commenter)"""
+    if os.path.isdir(path):
+        return list_saved_pages(path)
+    with open(path, encoding="utf-8") as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith("#")]
+
+def analyze_saved_page(path):
+    """Lit une page enregistrée, en extrait le texte et ses détails (exécuté dans le pool de processus)"""
+    with open(path, "rb") as f:
+        raw = f.read(FETCH_MAX_BYTES)
+    text = extract_page_text(html_decoder(raw, None).decode(raw, final=True))
+    if len(text) < 500:
+        return text, None
+    return text, extract_details(text)
+
+batch_pool = None
+batch_pool_lock = threading.Lock()
+
+def get_batch_pool():
+    """Pool de processus partagé par les lots (créé au premier lot)"""
+    global batch_pool
+    with batch_pool_lock:
+        if batch_pool is None:
+            # "spawn": les processus ne héritent pas des threads et verrous du serveur
+            batch_pool = ProcessPoolExecutor(
+                max_workers=BATCH_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+            )
+        return batch_pool
+
+@dataclass(slots=True)
+class PendingDocument:
+    """Document d'un lot extrait (et résumé), en attente du scoring de son groupe"""
+    source: str
+    url: str
+    content: str
+    structured_data: dict
+    critical_sentences: list
+    ai_summary: str | None
+
+class BatchJob:
+    """Analyse en masse d'URLs ou de pages enregistrées, avec reprise après un arrêt
+
+    Chaque source est téléchargée (ou lue), extraite et résumée séparément;
+    les mots-clés sont notés par groupes de `score_batch_size` documents
+    (score_documents, dans le pool de processus).
+
+    Les résultats sont ajoutés à un fichier JSONL au fil de l'eau. Après chaque
+    ligne, le point de reprise reçoit la source terminée et la taille validée de
+    la sortie: au redémarrage, la sortie est tronquée à cette taille (une ligne
+    écrite sans être validée est refaite) et les sources terminées sont sautées.
+    """
+
+    def __init__(self, sources, output_path, use_ai=True, fetch_concurrency=BATCH_FETCH_CONCURRENCY, job_id=None,
+                 score_batch_size=BATCH_SCORE_SIZE):
+        self.job_id = job_id
+        self.sources = list(dict.fromkeys(sources))
+        self.output_path = output_path
+        self.checkpoint_path = output_path + ".checkpoint"
+        self.use_ai = use_ai
+        self.fetch_concurrency = fetch_concurrency
+        self.score_batch_size = score_batch_size
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.state = "pending"
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.counters = {"done": 0, "failed": 0, "resumed": 0}
+
+    def load_checkpoint(self):
+        """Sources déjà terminées, taille validée de la sortie et du point de reprise"""
+        done = set()
+        offset = 0
+        valid_size = 0
+        if not os.path.exists(self.checkpoint_path):
+            return done, offset, valid_size
+        with open(self.checkpoint_path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # Dernière ligne incomplète (arrêt pendant l'écriture)
+                if not line.endswith(b"\n"):
+                    break
+                done.add(entry["source"])
+                offset = entry["offset"]
+                valid_size += len(line)
+        return done, offset, valid_size
+
+    def run(self):
+        """Traite toutes les sources restantes (bloquant)"""
+        self.started_at = time.time()
+        self.state = "running"
+        try:
+            self.process_all()
+            self.state = "cancelled" if self.cancelled.is_set() else "finished"
+        except KeyboardInterrupt:
+            self.state = "cancelled"
+            raise
+        except Exception as e:
+            print(f"❌ Lot {self.job_id or self.output_path} interrompu: {e}")
+            self.state = "failed"
+            self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+
+    def process_all(self):
+        done, offset, checkpoint_size = self.load_checkpoint()
+        pending = [source for source in self.sources if source not in done]
+        self.counters["resumed"] = len(self.sources) - len(pending)
+        if self.counters["resumed"]:
+            print(f"♻️ Reprise: {self.counters['resumed']} source(s) déjà traitée(s)")
+
+        directory = os.path.dirname(os.path.abspath(self.output_path))
+        os.makedirs(directory, exist_ok=True)
+        workers = ThreadPoolExecutor(max_workers=self.fetch_concurrency, thread_name_prefix="lot")
+        with open(self.output_path, "ab") as output, open(self.checkpoint_path, "ab") as checkpoint:
+            output.truncate(offset)
+            checkpoint.truncate(checkpoint_size)
+            try:
+                self.write_results(workers, pending, output, checkpoint)
+            finally:
+                # Arrêt (ou Ctrl+C): les sources non commencées sont abandonnées
+                workers.shutdown(wait=True, cancel_futures=True)
+
+    def write_results(self, workers, pending, output, checkpoint):
+        futures = [workers.submit(self.process_source, source) for source in pending]
+        documents = []
+        for future in as_completed(futures):
+            item = future.result()
+            if item is None:
+                continue
+            if not isinstance(item, PendingDocument):
+                self.write_record(item, len(pending), output, checkpoint)
+                continue
+            documents.append(item)
+            if len(documents) >= self.score_batch_size:
+                for record in self.score_batch(documents):
+                    self.write_record(record, len(pending), output, checkpoint)
+                documents = []
+        if documents:
+            for record in self.score_batch(documents):
+                self.write_record(record, len(pending), output, checkpoint)
+
+    def write_record(self, record, total, output, checkpoint):
+        # Un seul écrivain: la sortie et le point de reprise restent dans le même ordre
+        output.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        output.flush()
+        checkpoint.write((json.dumps({"source": record["source"], "offset": output.tell()}) + "\n").encode("utf-8"))
+        checkpoint.flush()
+        with self.lock:
+            self.counters["failed" if record["error"] else "done"] += 1
+            position = self.counters["done"] + self.counters["failed"]
+        print(f"📦 [{position}/{total}] {record['source']}")
+
+    def process_source(self, source):
+        """Récupère, extrait et résume une source: PendingDocument, ligne JSONL d'erreur,
+        ou None si le lot est annulé"""
+        if self.cancelled.is_set():
+            return None
+        url = source if is_url_source(source) else os.path.basename(source)
+        try:
+            # Les URLs sont extraites pendant le téléchargement (arrêt anticipé du
+            # parsing); les pages enregistrées sont lues et extraites dans le pool
+            if is_url_source(source):
+                content = download_page_content(source)
+                details = get_batch_pool().submit(extract_details, content).result() if len(content) >= 500 else None
+            else:
+                content, details = get_batch_pool().submit(analyze_saved_page, source).result()
             
-            for future in as_completed(future_to_url):
+            if details is None:
+                return self.make_record(source, AnalysisResult(url, "❌ Contenu insuffisant ou inaccessible"))
+            
+            ai_summary = summarize_near_duplicate(content, get_content_key(content), url) if self.use_ai else None
+            return PendingDocument(source, url, content, *details, ai_summary)
+        except Exception as e:
+            print(f"❌ Erreur lors de l'analyse de {source}: {e}")
+            return self.make_record(source, AnalysisResult(url, f"Erreur: {str(e)}"))
+
+    def score_batch(self, documents):
+        """Lignes JSONL d'un groupe de documents, notés ensemble dans le pool de processus"""
+        try:
+            scores = get_batch_pool().submit(score_documents, [document.content for document in documents]).result()
+        except Exception as e:
+            print(f"❌ Erreur lors du scoring de {len(documents)} document(s): {e}")
+            return [self.make_record(document.source, AnalysisResult(document.url, f"Erreur: {str(e)}"))
+                    for document in documents]
+        return [
+            self.make_record(document.source, build_analysis_result(
+                document.url, document.content, keyword_analysis, risk_score,
+                document.structured_data, document.critical_sentences, document.ai_summary, privacy_score
+            ))
+            for document, (keyword_analysis, risk_score, privacy_score, _) in zip(documents, scores)
+        ]
+
+    @staticmethod
+    def make_record(source, result):
+        """Ligne JSONL: le résultat structuré (sans le texte rendu), avec sa source"""
+        return {
+            "source": source,
+            **result.to_dict(),
+            "analyzed_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def status(self):
+        with self.lock:
+            counters = dict(self.counters)
+        return {
+            "job_id": self.job_id,
+            "state": self.state,
+            "error": self.error,
+            "total": len(self.sources),
+            **counters,
+            "output": self.output_path,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+# Lots lancés via l'API /jobs (les specs sont sur disque pour reprendre après un redémarrage)
+batch_jobs = {}
+batch_jobs_lock = threading.Lock()
+
+def job_paths(job_id):
+    base = os.path.join(JOBS_DIR, job_id)
+    return base + ".json", base + ".jsonl"
+
+def start_batch_job(job_id):
+    """Lance (ou reprend) un lot enregistré dans un thread de fond"""
+    spec_path, output_path = job_paths(job_id)
+    with open(spec_path, encoding="utf-8") as f:
+        spec = json.load(f)
+    job = BatchJob(spec["sources"], output_path, use_ai=spec["use_ai"], job_id=job_id)
+    with batch_jobs_lock:
+        current = batch_jobs.get(job_id)
+        if current and current.state in ("pending", "running"):
+            return current
+        batch_jobs[job_id] = job
+    threading.Thread(target=job.run, name=f"lot-{job_id}", daemon=True).start()
+    return job
+
+def run_batch_cli(argv):
+    """python main.py batch <fichier d'URLs | répertoire> -o resultats.jsonl"""
+    parser = argparse.ArgumentParser(prog="main.py batch", description="Analyse en masse de politiques")
+    parser.add_argument("source", help="fichier d'URLs (une par ligne) ou répertoire de pages HTML enregistrées")
+    parser.add_argument("-o", "--output", required=True, help="fichier JSONL de sortie (repris s'il existe un point de reprise)")
+    parser.add_argument("--no-ai", action="store_true", help="ne pas appeler Groq")
+    parser.add_argument("--concurrency", type=int, default=BATCH_FETCH_CONCURRENCY, help="téléchargements simultanés")
+    args = parser.parse_args(argv)
+
+    job = BatchJob(read_batch_sources(args.source), args.output,
+                   use_ai=not args.no_ai, fetch_concurrency=args.concurrency)
+    print(f"📦 Lot de {len(job.sources)} source(s) → {args.output}")
+    try:
+        job.run()
+    except KeyboardInterrupt:
+        job.cancel()
+    finally:
+        if batch_pool is not None:
+            batch_pool.shutdown(cancel_futures=True)
+    status = job.status()
+    print(f"✅ {status['done']} analysée(s), ❌ {status['failed']} en erreur, ♻️ {status['resumed']} reprise(s)")
+    return 0 if status["state"] == "finished" else 1
+
+class AdmissionControl:
+    """File d'admission des requêtes d'analyse d'un worker
+
+    Au plus `max_active` requêtes sont traitées à la fois et `max_queue`
+    attendent une place, chacune au plus `max_wait` secondes (et jamais
+    au-delà de son échéance). Au-delà, la requête est refusée tout de suite
+    (503) au lieu d'occuper un thread jusqu'à son échéance. Chaque client
+    (adresse IP) a en plus son propre débit: `client_rate_per_minute`
+    requêtes par minute, `client_burst` d'avance (429 au-delà, 0 = sans
+    limite). Un refus indique quand réessayer (en-tête Retry-After), estimé
+    d'après la durée moyenne des requêtes admises.
+    """
+
+    def __init__(self, max_active=ADMISSION_MAX_ACTIVE, max_queue=ADMISSION_MAX_QUEUE, max_wait=ADMISSION_MAX_WAIT,
+                 client_rate_per_minute=CLIENT_REQUESTS_PER_MINUTE, client_burst=CLIENT_BURST,
+                 max_clients=CLIENT_MAX_TRACKED):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.client_rate = client_rate_per_minute / 60
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.lock = threading.Lock()
+        self.available = threading.Condition(self.lock)
+        self.active = 0
+        self.waiting = 0
+        self.average_seconds = 1.0  # Durée moyenne (mobile) d'une requête admise
+        self.clients = OrderedDict()  # adresse -> TokenBucket, de la moins à la plus récente
+        self.counters = {"admitted": 0, "queued": 0, "rejected_full": 0, "rejected_wait": 0, "rejected_client": 0}
+
+    def admit(self, client, deadline):
+        """None si la requête est admise (appeler release à la fin),
+        sinon (statut HTTP, secondes avant de réessayer)"""
+        with self.lock:
+            retry_after = self.client_retry_after(client)
+            if retry_after:
+                self.counters["rejected_client"] += 1
+                return 429, retry_after
+            if self.active >= self.max_active:
+                if self.waiting >= self.max_queue:
+                    self.counters["rejected_full"] += 1
+                    return 503, self.retry_after()
+                self.waiting += 1
+                self.counters["queued"] += 1
+                wait_until = min(deadline, time.monotonic() + self.max_wait)
+                try:
+                    while self.active >= self.max_active:
+                        remaining = wait_until - time.monotonic()
+                        if remaining <= 0:
+                            self.counters["rejected_wait"] += 1
+                            return 503, self.retry_after()
+                        self.available.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.counters["admitted"] += 1
+            return None
+
+    def release(self, seconds):
+        """Libère la place d'une requête admise, qui a duré `seconds`"""
+        with self.lock:
+            self.active -= 1
+            self.average_seconds += (seconds - self.average_seconds) * 0.2
+            self.available.notify()
+
+    def client_retry_after(self, client):
+        """0 si le client a encore un jeton (il est pris), sinon les secondes avant le prochain"""
+        if not self.client_rate or not client:
+            return 0
+        bucket = self.clients.get(client)
+        if bucket is None:
+            bucket = self.clients[client] = TokenBucket(self.client_rate, self.client_burst)
+            while len(self.clients) > self.max_clients:
+                self.clients.popitem(last=False)
+        self.clients.move_to_end(client)
+        now = time.monotonic()
+        if bucket.acquire(now):
+            return 0
+        return max(1, math.ceil((1 - bucket.tokens) / self.client_rate))
+
+    def retry_after(self):
+        """Secondes estimées avant qu'une place se libère pour une nouvelle requête"""
+        return max(1, math.ceil(self.average_seconds * (self.waiting + 1) / self.max_active))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "average_ms": round(self.average_seconds * 1000, 1),
+                **self.counters,
+            }
+
+admission = AdmissionControl()
+
+def admission_refused(status, retry_after):
+    """Réponse de refus (file pleine ou client trop rapide), avec l'en-tête Retry-After"""
+    if status == 429:
+        message = f"⏳ Trop de requêtes, réessayez dans {retry_after} s"
+    else:
+        message = f"⏳ Serveur surchargé, réessayez dans {retry_after} s"
+    return jsonify({"error": message, "summary": message, "retry_after": retry_after}), status, \
+        {"Retry-After": str(retry_after)}
+
+def read_analyze_request():
+    """Lit la liste d'URLs du corps JSON (limitée à 3 pour ne pas surcharger),
+    le format demandé: "text" (résumé rendu, par défaut) ou "structured",
+    et le mode trace (?trace=1): durée de chaque étape dans la réponse"""
+    data = request.get_json(silent=True) or {}
+    structured = data.get("format") == "structured"
+    trace = request.args.get("trace") == "1"
+    return (data.get("urls") or [])[:3], structured, trace
+
+def results_etag(endpoint, urls, cache_keys, versions, structured):
+    """Empreinte d'une réponse: l'ensemble d'URLs, le format et la version (date
+    de création) du résultat en cache de chacune"""
+    parts = [endpoint, "structured" if structured else "text", "ai" if groq_client is not None else "no-ai"]
+    parts += [f"{url}\n{cache_key}\n{version!r}" for url, cache_key, version in zip(urls, cache_keys, versions)]
+    return hashlib.blake2b("\n".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+def analysis_etag(urls, cache_keys, structured):
+    """ETag d'une réponse /analyze; None si un résultat manque ou est périmé
+    (il faut alors l'analyser ou le rafraîchir)"""
+    versions = [analysis_cache.fresh_version(cache_key) for cache_key in cache_keys]
+    if None in versions:
+        return None
+    return results_etag("analyze", urls, cache_keys, versions, structured)
+
+def not_modified(etag):
+    """Réponse 304 (sans corps) si le client a déjà la réponse de cet ETag, sinon None"""
+    if etag is None or not request.if_none_match.contains(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+def iter_analysis_results(urls, deadline=None, cache_keys=None):
+    """Lance l'analyse des URLs sur le pool partagé et renvoie les résultats
+    au fil de l'eau, dans l'ordre où ils se terminent
+
+    Une URL déjà en cours d'analyse (par cette requête ou une autre) n'est pas
+    relancée, sauf si cette analyse a été coupée par une échéance antérieure à
+    celle de la requête (page ou résumé IA manquant): elle est alors relancée
+    avec l'échéance de la requête. Avec une échéance (time.monotonic), les
+    analyses pas terminées peu après (REQUEST_DEADLINE_GRACE) sont renvoyées
+    comme manquantes; leurs étapes déjà commencées se terminent en
+    arrière-plan, et le résultat est mis en cache s'il est complet.
+    """
+    pending = {}  # Future -> (échéance de l'analyse, [(url, clé)])
+    for url, cache_key in zip(urls, cache_keys or [get_cache_key(url) for url in urls]):
+        cache_refresher.record(cache_key, url)
+        future, flight_deadline = analysis_flights.submit(cache_key, deadline, analyze_single_url, url, cache_key, deadline)
+        pending.setdefault(future, (flight_deadline, []))[1].append((url, cache_key))
+    
+    while pending:
+        timeout = None if deadline is None else max(0, deadline + REQUEST_DEADLINE_GRACE - time.monotonic())
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            flight_deadline, waiting = pending.pop(future)
+            for url, cache_key in waiting:
                 try:
                     result = future.result()
-                    results.append(result)
                 except Exception as e:
-                    url = future_to_url[future]
                     print(f"❌ Erreur lors de l'analyse de {url}: {e}")
-                    results.append({
-                        "url": url,
-                        "error": f"Erreur: {str(e)}",
-                        "summary": None
-                    })
-        
-        # Compiler le résumé final avec index de documents
-        final_summary_parts = []
-        total_risk = 0
-        analyzed_count = 0
-        document_types = []
+                    yield AnalysisResult(url, f"Erreur: {str(e)}")
+                    continue
+                if result.missing and flight_deadline is not None and \
+                        (deadline is None or flight_deadline < deadline):
+                    # Coupée par l'échéance d'une autre requête: cette requête a plus de temps
+                    retry, retry_deadline = analysis_flights.submit(
+                        cache_key, deadline, analyze_single_url, url, cache_key, deadline, later_than=flight_deadline
+                    )
+                    pending.setdefault(retry, (retry_deadline, []))[1].append((url, cache_key))
+                    continue
+                yield result
+    
+    for url, _ in chain.from_iterable(waiting for _, waiting in pending.values()):
+        print(f"⏱️ Analyse de {url} non terminée avant l'échéance")
+        metrics.inc("trustadvisor_deadline_exceeded_total", stage="analysis")
+        yield AnalysisResult(url, "⏱️ Analyse non terminée avant l'échéance", missing=["analysis"])
+
+def summarize_results(results):
+    """Bilan global des documents analysés (forme structurée)"""
+    analyzed = [result for result in results if not result.error]
+    overview = {
+        "partial": any(result.missing for result in results),
+        "analyzed_count": len(analyzed),
+        "document_types": [result.doc_type for result in analyzed],
+        "average_risk": None,
+        "recommendation": None
+    }
+    
+    if analyzed:
+        avg_risk = sum(result.risk_score for result in analyzed) / len(analyzed)
         
-        # Ajouter un en-tête si plusieurs documents
-        if len([r for r in results if r.get("summary")]) > 1:
-            final_summary_parts.append(
-                f"{'='*70}\n"
-                f"📚 ANALYSE DE {len([r for r in results if r.get('summary')])} DOCUMENTS\n"
-                f"{'='*70}\n"
-            )
+        # Ajouter une recommandation basée sur le score
+        if avg_risk < 30:
+            recommendation = "✅ Ces politiques semblent relativement transparentes et protectrices."
+        elif avg_risk < 60:
+            recommendation = "⚠️ Attention modérée recommandée. Vérifiez les points sensibles."
+        else:
+            recommendation = "🚨 Niveau de risque élevé. Lisez attentivement avant d'accepter."
         
-        for i, result in enumerate(results, 1):
-            if result.get("summary"):
-                # Ajouter un séparateur entre les documents
-                if i > 1:
-                    final_summary_parts.append(f"\n{'─'*70}\n")
-                
-                final_summary_parts.append(result["summary"])
-                total_risk += result.get("risk_score", 0)
-                analyzed_count += 1
-                
-                # Extraire le type de document pour le résumé
-                summary_lines = result["summary"].split('\n')
-                for line in summary_lines[:5]:
-                    if any(emoji in line for emoji in ['🔐', '📜', '🍪', '⚖️', '📝', '📄']):
-                        doc_type = line.split('🌐')[0].strip()
-                        document_types.append(doc_type)
-                        break
-            elif result.get("error"):
-                final_summary_parts.append(f"\n❌ {result['error']}: {result['url']}\n")
+        overview["average_risk"] = avg_risk
+        overview["recommendation"] = recommendation
+    
+    return overview
+
+def build_trace(results, started, render_ms=None):
+    """Détail des durées pour le mode trace (ms)"""
+    trace = {
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+        "documents": [
+            {"url": result.url, "stages": {stage: round(ms, 2) for stage, ms in (result.timings or {}).items()}}
+            for result in results
+        ],
+    }
+    if render_ms is not None:
+        trace["render_ms"] = round(render_ms, 2)
+    return trace
+
+def render_final_summary(results, overview, url_count):
+    """Compile le résumé final avec index de documents et footer global"""
+    final_summary_parts = []
+    analyzed_count = overview["analyzed_count"]
+    
+    # Ajouter un en-tête si plusieurs documents
+    if analyzed_count > 1:
+        final_summary_parts.append(
+            f"{'='*70}\n"
+            f"📚 ANALYSE DE {analyzed_count} DOCUMENTS\n"
+            f"{'='*70}\n"
+        )
+    
+    for i, result in enumerate(results, 1):
+        if not result.error:
+            # Ajouter un séparateur entre les documents
+            if i > 1:
+                final_summary_parts.append(f"\n{'─'*70}\n")
+            
+            final_summary_parts.append(render_summary(result))
+        else:
+            final_summary_parts.append(f"\n❌ {result.error}: {result.url}\n")
+    
+    final_summary = "\n".join(final_summary_parts)
+    
+    # Ajouter un footer global avec résumé
+    if analyzed_count > 0:
+        final_summary += f"\n\n{'='*70}\n"
+        final_summary += f"📊 RÉSUMÉ GLOBAL\n"
+        final_summary += f"{'='*70}\n"
+        final_summary += f"📁 Documents analysés: {analyzed_count}\n"
         
-        final_summary = "\n".join(final_summary_parts)
+        final_summary += f"📋 Types de documents:\n"
+        for doc_type in overview["document_types"]:
+            final_summary += f"   • {doc_type.upper()}\n"
         
-        # Ajouter un footer global avec résumé
-        if analyzed_count > 0:
-            avg_risk = total_risk / analyzed_count
-            
-            final_summary += f"\n\n{'='*70}\n"
-            final_summary += f"📊 RÉSUMÉ GLOBAL\n"
-            final_summary += f"{'='*70}\n"
-            final_summary += f"📁 Documents analysés: {analyzed_count}\n"
-            
-            if document_types:
-                final_summary += f"📋 Types de documents:\n"
-                for doc_type in document_types:
-                    final_summary += f"   • {doc_type}\n"
-            
-            final_summary += f"\n🎯 Score de risque moyen: {avg_risk:.1f}\n"
-            
-            # Ajouter une recommandation basée sur le score
-            if avg_risk < 30:
-                recommendation = "✅ Ces politiques semblent relativement transparentes et protectrices."
-            elif avg_risk < 60:
-                recommendation = "⚠️ Attention modérée recommandée. Vérifiez les points sensibles."
-            else:
-                recommendation = "🚨 Niveau de risque élevé. Lisez attentivement avant d'accepter."
-            
-            final_summary += f"💬 {recommendation}\n"
+        final_summary += f"\n🎯 Score de risque moyen: {overview['average_risk']:.1f}\n"
+        final_summary += f"💬 {overview['recommendation']}\n"
+    
+    final_summary += f"\n💡 Conseil: Lisez toujours les documents complets avant d'accepter.\n"
+    final_summary += f"🕒 Analyse effectuée le {datetime.now().strftime('%d/%m/%Y à %H:%M')}\n"
+    final_summary += f"🔗 Source: {url_count} URL(s) analysée(s)\n"
+    
+    return final_summary
+
+@api.route("/analyze", methods=["POST"])
+def analyze():
+    started = time.perf_counter()
+    deadline = time.monotonic() + REQUEST_DEADLINE
+    urls, structured, trace = read_analyze_request()
+    
+    if not urls:
+        return jsonify({"error": "Aucune URL fournie"}), 400
+    
+    # Requête conditionnelle (If-None-Match): si tous les résultats en cache sont
+    # ceux que le client a déjà, 304 sans analyse ni assemblage de la réponse
+    cache_keys = [get_cache_key(url) for url in urls]
+    response = not_modified(analysis_etag(urls, cache_keys, structured))
+    if response:
+        for url, cache_key in zip(urls, cache_keys):
+            cache_refresher.record(cache_key, url)
+        metrics.inc("trustadvisor_not_modified_total", endpoint="analyze")
+        return response
+    
+    refused = admission.admit(request.remote_addr, deadline)
+    if refused:
+        return admission_refused(*refused)
+    admitted = time.monotonic()
+    try:
+        return analyze_admitted(urls, cache_keys, structured, trace, started, deadline)
+    finally:
+        admission.release(time.monotonic() - admitted)
+
+def analyze_admitted(urls, cache_keys, structured, trace, started, deadline):
+    """Analyse d'une requête /analyze admise: les documents terminés avant
+    l'échéance, les autres signalés comme manquants ("partial")
+
+    Une réponse complète porte l'ETag de ses résultats (voir analysis_etag).
+    """
+    try:
+        results = list(iter_analysis_results(urls, deadline, cache_keys))
+        overview = summarize_results(results)
+        complete = not any(result.error or result.missing for result in results)
+        etag = analysis_etag(urls, cache_keys, structured) if complete else None
         
-        final_summary += f"\n💡 Conseil: Lisez toujours les documents complets avant d'accepter.\n"
-        final_summary += f"🕒 Analyse effectuée le {datetime.now().strftime('%d/%m/%Y à %H:%M')}\n"
-        final_summary += f"🔗 Source: {len(urls)} URL(s) analysée(s)\n"
+        if structured:
+            response = {
+                "documents": [result.to_dict() for result in results],
+                **overview,
+                "has_ai": groq_client is not None
+            }
+            if trace:
+                response["trace"] = build_trace(results, started)
+            return etagged(jsonify(response), etag)
         
-        return jsonify({
-            "summary": final_summary,
-            "analyzed_count": analyzed_count,
+        render_started = time.perf_counter()
+        with metrics.stage("render"):
+            summary = render_final_summary(results, overview, len(urls))
+        response = {
+            "summary": summary,
+            "analyzed_count": overview["analyzed_count"],
+            "partial": overview["partial"],
             "has_ai": groq_client is not None
-        })
+        }
+        if trace:
+            response["trace"] = build_trace(results, started, (time.perf_counter() - render_started) * 1000)
+        return etagged(jsonify(response), etag)
         
     except Exception as e:
         print(f"❌ Erreur serveur: {e}")
@@ -605,30 +3714,397 @@ def analyze():
             "summary": f"❌ Erreur lors de l'analyse: {str(e)}"
         }), 500
 
-@app.route("/health", methods=["GET"])
+def etagged(response, etag):
+    if etag:
+        response.set_etag(etag)
+    return response
+
+@api.route("/analyze/cached", methods=["POST"])
+def analyze_cached():
+    """Résultats déjà en cache des URLs (même corps que /analyze), sans jamais
+    télécharger ni analyser: les URLs sans résultat sont listées dans "uncached".
+    Les résultats périmés sont renvoyés tels quels (stale) et ne sont pas rafraîchis."""
+    urls, structured, _ = read_analyze_request()
+    if not urls:
+        return jsonify({"error": "Aucune URL fournie"}), 400
+    
+    cache_keys = [get_cache_key(url) for url in urls]
+    versions = [analysis_cache.created_at(cache_key) for cache_key in cache_keys]
+    etag = results_etag("cached", urls, cache_keys, versions, structured)
+    response = not_modified(etag)
+    if response:
+        metrics.inc("trustadvisor_not_modified_total", endpoint="cached")
+        return response
+    
+    results, uncached, stale = [], [], []
+    for url, cache_key, version in zip(urls, cache_keys, versions):
+        cached = analysis_cache.get(cache_key) if version is not None else None
+        if not cached:
+            uncached.append(url)
+            continue
+        result = AnalysisResult.from_row(cached[0])
+        result.url = url
+        results.append(result)
+        if cached[1]:
+            stale.append(url)
+    
+    overview = summarize_results(results)
+    response = {**overview, "uncached": uncached, "stale": stale, "has_ai": groq_client is not None}
+    if structured:
+        response["documents"] = [result.to_dict() for result in results]
+    elif results:
+        with metrics.stage("render"):
+            response["summary"] = render_final_summary(results, overview, len(urls))
+    return etagged(jsonify(response), etag)
+
+def ndjson_line(event_type, payload):
+    """Sérialise un événement du flux NDJSON (une ligne JSON par événement)"""
+    return json.dumps({"type": event_type, **payload}, ensure_ascii=False) + "\n"
+
+@api.route("/analyze/stream", methods=["POST"])
+def analyze_stream():
+    """Variante en flux de /analyze (NDJSON) : chaque document est envoyé dès
+    que son analyse se termine, puis le bloc de résumé global"""
+    started = time.perf_counter()
+    deadline = time.monotonic() + REQUEST_DEADLINE
+    urls, structured, trace = read_analyze_request()
+    
+    if not urls:
+        return jsonify({"error": "Aucune URL fournie"}), 400
+    
+    refused = admission.admit(request.remote_addr, deadline)
+    if refused:
+        return admission_refused(*refused)
+    admitted = time.monotonic()
+    
+    def generate():
+        results = []
+        try:
+            for result in iter_analysis_results(urls, deadline):
+                results.append(result)
+                document = result.to_dict()
+                if not structured and not result.error:
+                    with metrics.stage("render"):
+                        document["summary"] = render_summary(result)
+                if trace:
+                    document["timings"] = {stage: round(ms, 2) for stage, ms in (result.timings or {}).items()}
+                yield ndjson_line("document", document)
+            
+            overview = summarize_results(results)
+            if not structured:
+                with metrics.stage("render"):
+                    overview["summary"] = render_final_summary(results, overview, len(urls))
+            if trace:
+                overview["trace"] = build_trace(results, started)
+            yield ndjson_line("summary", {**overview, "has_ai": groq_client is not None})
+        except Exception as e:
+            # Les en-têtes sont déjà partis : l'erreur est signalée dans le flux
+            print(f"❌ Erreur serveur (flux): {e}")
+            yield ndjson_line("error", {
+                "error": str(e),
+                "summary": f"❌ Erreur lors de l'analyse: {str(e)}"
+            })
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    # La place est libérée à la fin de l'envoi du flux (ou à la déconnexion du client)
+    response.call_on_close(lambda: admission.release(time.monotonic() - admitted))
+    return response
+
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{12}")
+
+def find_batch_job(job_id):
+    """Lot en mémoire, sinon lot enregistré sur disque mais interrompu (redémarrage du serveur)"""
+    with batch_jobs_lock:
+        job = batch_jobs.get(job_id)
+    if job or not JOB_ID_PATTERN.fullmatch(job_id):
+        return job
+    spec_path, output_path = job_paths(job_id)
+    if not os.path.exists(spec_path):
+        return None
+    with open(spec_path, encoding="utf-8") as f:
+        spec = json.load(f)
+    job = BatchJob(spec["sources"], output_path, use_ai=spec["use_ai"], job_id=job_id)
+    job.state = "interrupted"
+    job.counters["resumed"] = len(job.load_checkpoint()[0])
+    return job
+
+@api.route("/jobs", methods=["POST"])
+def create_job():
+    """Lance un lot: {"urls": [...]} ou {"directory": "..."}, et "ai": false pour se passer de Groq"""
+    data = request.get_json(silent=True) or {}
+    
+    if data.get("directory"):
+        directory = os.path.abspath(str(data["directory"]))
+        if os.path.commonpath([directory, JOBS_INPUT_ROOT]) != JOBS_INPUT_ROOT or not os.path.isdir(directory):
+            return jsonify({"error": "Répertoire invalide"}), 400
+        sources = list_saved_pages(directory)
+    else:
+        sources = [url for url in data.get("urls") or [] if isinstance(url, str) and is_url_source(url)]
+    
+    if not sources:
+        return jsonify({"error": "Aucune source à analyser"}), 400
+    
+    job_id = uuid.uuid4().hex[:12]
+    spec_path, _ = job_paths(job_id)
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    with open(spec_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "sources": sources,
+            "use_ai": bool(data.get("ai", True)),
+            "created_at": datetime.now().isoformat(timespec="seconds")
+        }, f)
+    
+    job = start_batch_job(job_id)
+    return jsonify(job.status()), 202
+
+@api.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = find_batch_job(job_id)
+    if job is None:
+        return jsonify({"error": "Lot inconnu"}), 404
+    return jsonify(job.status())
+
+@api.route("/jobs/<job_id>/resume", methods=["POST"])
+def resume_job(job_id):
+    """Reprend un lot interrompu à partir de son point de reprise"""
+    if find_batch_job(job_id) is None:
+        return jsonify({"error": "Lot inconnu"}), 404
+    return jsonify(start_batch_job(job_id).status()), 202
+
+@api.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    job = find_batch_job(job_id)
+    if job is None:
+        return jsonify({"error": "Lot inconnu"}), 404
+    job.cancel()
+    return jsonify(job.status())
+
+@api.route("/jobs/<job_id>/results", methods=["GET"])
+def job_results(job_id):
+    """Résultats JSONL du lot (partiels tant qu'il est en cours)"""
+    job = find_batch_job(job_id)
+    if job is None or not os.path.exists(job.output_path):
+        return jsonify({"error": "Aucun résultat"}), 404
+    return send_file(job.output_path, mimetype="application/x-ndjson")
+
+@api.route("/health", methods=["GET"])
 def health():
     """Endpoint de santé"""
     return jsonify({
         "status": "✅ Serveur actif",
         "mode": "🤖 IA + Analyse avancée" if groq_client else "🔍 Analyse avancée seule",
         "cache_size": len(analysis_cache),
+        "cache": analysis_cache.stats(),
+        "fetcher": page_fetcher.stats(),
+        "fetch_cache": fetch_cache.stats(),
+        "analyses": analysis_flights.stats(),
+        "groq": groq_gateway.stats(),
+        "dedup": dedup_stats(),
+        "near_duplicates": near_duplicates.stats(),
+        "documents": document_cache.stats(),
+        "refresher": cache_refresher.stats(),
+        "admission": admission.stats(),
+        "pid": os.getpid(),
         "version": "2.0"
     })
 
-@app.route("/clear-cache", methods=["POST"])
+@api.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Métriques au format texte Prometheus"""
+    cache = analysis_cache.stats()
+    fetcher = page_fetcher.stats()
+    fetched = fetch_cache.stats()
+    groq = groq_gateway.stats()
+    dedup = dedup_stats()
+    similar = near_duplicates.stats()
+    refresher = cache_refresher.stats()
+    admitted = admission.stats()
+    values = [
+        ("trustadvisor_cache_lookups_total", "counter", {"result": "hit"}, cache["hits"]),
+        ("trustadvisor_cache_lookups_total", "counter", {"result": "stale_hit"}, cache["stale_hits"]),
+        ("trustadvisor_cache_lookups_total", "counter", {"result": "miss"}, cache["misses"]),
+        ("trustadvisor_cache_evictions_total", "counter", {}, cache["evictions"]),
+        ("trustadvisor_cache_invalidations_total", "counter", {}, cache["invalidations"]),
+        ("trustadvisor_cache_entries", "gauge", {}, cache["entries"]),
+        ("trustadvisor_cache_bytes", "gauge", {}, cache["bytes"]),
+        ("trustadvisor_fetch_requests_total", "counter", {}, fetcher["requests"]),
+        ("trustadvisor_fetch_not_modified_total", "counter", {}, fetcher["not_modified"]),
+        ("trustadvisor_fetch_bytes_total", "counter", {}, fetcher["bytes"]),
+        ("trustadvisor_fetch_cache_lookups_total", "counter", {"result": "hit"}, fetched["hits"]),
+        ("trustadvisor_fetch_cache_lookups_total", "counter", {"result": "negative_hit"}, fetched["negative_hits"]),
+        ("trustadvisor_fetch_cache_lookups_total", "counter", {"result": "miss"}, fetched["misses"]),
+        ("trustadvisor_fetch_cache_evictions_total", "counter", {}, fetched["evictions"]),
+        ("trustadvisor_fetch_cache_entries", "gauge", {}, fetched["entries"]),
+        ("trustadvisor_fetch_cache_bytes", "gauge", {}, fetched["bytes"]),
+        ("trustadvisor_url_rewrites_total", "counter", {"kind": "canonicalized"}, dedup["canonicalized"]),
+        ("trustadvisor_url_rewrites_total", "counter", {"kind": "redirect"}, dedup["redirects_resolved"]),
+        ("trustadvisor_content_reuse_total", "counter", {"result": "hit"}, dedup["content_hits"]),
+        ("trustadvisor_content_reuse_total", "counter", {"result": "miss"}, dedup["content_misses"]),
+        ("trustadvisor_blocks_total", "counter", {"result": "reused"}, dedup["blocks_reused"]),
+        ("trustadvisor_blocks_total", "counter", {"result": "analyzed"}, dedup["blocks_analyzed"]),
+        ("trustadvisor_near_duplicate_lookups_total", "counter", {"result": "match"}, similar["matches"]),
+        ("trustadvisor_near_duplicate_lookups_total", "counter", {"result": "miss"}, similar["lookups"] - similar["matches"]),
+        ("trustadvisor_near_duplicate_entries_added_total", "counter", {}, similar["added"]),
+        ("trustadvisor_refreshes_total", "counter", {"kind": "refresh"}, refresher["refreshed"]),
+        ("trustadvisor_refreshes_total", "counter", {"kind": "prewarm"}, refresher["prewarmed"]),
+        ("trustadvisor_refreshes_deferred_total", "counter", {}, refresher["deferred"]),
+        ("trustadvisor_requests_active", "gauge", {}, admitted["active"]),
+        ("trustadvisor_requests_waiting", "gauge", {}, admitted["waiting"]),
+        ("trustadvisor_requests_rejected_total", "counter", {"reason": "queue_full"}, admitted["rejected_full"]),
+        ("trustadvisor_requests_rejected_total", "counter", {"reason": "queue_wait"}, admitted["rejected_wait"]),
+        ("trustadvisor_requests_rejected_total", "counter", {"reason": "client_rate"}, admitted["rejected_client"]),
+        ("trustadvisor_analyses_in_flight", "gauge", {}, analysis_flights.stats()["in_flight"]),
+        ("trustadvisor_analyses_coalesced_total", "counter", {}, analysis_flights.stats()["coalesced"]),
+        ("trustadvisor_analyses_relaunched_total", "counter", {}, analysis_flights.stats()["relaunched"]),
+        ("trustadvisor_groq_calls_total", "counter", {}, groq["calls"]),
+        ("trustadvisor_groq_cache_hits_total", "counter", {}, groq["cache_hits"]),
+        ("trustadvisor_groq_failures_total", "counter", {}, groq["failures"]),
+        ("trustadvisor_groq_deadline_exceeded_total", "counter", {}, groq["deadline_exceeded"]),
+        ("trustadvisor_groq_tokens_total", "counter", {"kind": "prompt"}, groq["prompt_tokens"]),
+        ("trustadvisor_groq_tokens_total", "counter", {"kind": "completion"}, groq["completion_tokens"]),
+    ]
+    return Response(metrics.render(values), mimetype="text/plain; version=0.0.4")
+
+@api.route("/clear-cache", methods=["POST"])
 def clear_cache():
-    """Vide le cache"""
+    """Vide le cache (l'historique des versions des pages, document_versions, est conservé)"""
     analysis_cache.clear()
-    fetch_page_content.cache_clear()
+    document_cache.clear()
+    block_cache.clear()
+    redirect_cache.clear()
+    near_duplicates.clear()
+    summary_cache.clear()
+    clear_page_contents()
+    page_fetcher.clear()
     return jsonify({"status": "✅ Cache vidé"})
 
+def create_app():
+    """Application Flask (serveur de développement, gunicorn, benchmarks)"""
+    app = Flask(__name__)
+    # ETag et Retry-After lisibles par les pages (l'extension y a accès sans CORS)
+    CORS(app, expose_headers=["ETag", "Retry-After"])
+    app.register_blueprint(api)
+    return app
+
+app = create_app()
+
+def persistent_stores():
+    """Caches et index adossés au fichier SQLite partagé"""
+    return [analysis_cache, document_cache, block_cache, document_versions, redirect_cache, summary_cache,
+            near_duplicates]
+
+def prepare_runtime():
+    """Charge d'avance ce que la première analyse paierait sinon: groq et son client,
+    requests et sa session, NumPy, les packs de règles et leurs combinaisons"""
+    started = time.perf_counter()
+    if isinstance(groq_client, LazyGroqClient):
+        groq_client.load()
+    page_fetcher.session
+    packs = [RULE_PACKS[language] for language in RULE_PACK_DEFINITIONS]
+    packs += [get_rule_pack(frozenset(languages)) for languages in combinations(RULE_PACK_DEFINITIONS, LANGUAGE_MAX_PACKS)]
+    for pack in packs:
+        pack.batch_scorer
+    print(f"🔥 Préchauffage: {len(packs)} packs de règles et dépendances chargés en "
+          f"{(time.perf_counter() - started) * 1000:.0f} ms")
+
+def start_warm_up(mode):
+    """Préchauffage selon le mode (voir WARM_UP_MODES): avant de servir, en arrière-plan ou pas du tout"""
+    if mode == "preload":
+        prepare_runtime()
+    elif mode == "background":
+        threading.Thread(target=prepare_runtime, name="prechauffage", daemon=True).start()
+
+def warm_up(mode):
+    """Prépare le processus maître avant le fork des workers
+
+    En mode "preload", l'état coûteux (packs de règles, automates de
+    mots-clés, scorers NumPy, dépendances) est construit une fois ici puis
+    partagé par copie sur écriture; gc.freeze() évite que le ramasse-miettes ne
+    recopie ces pages dans chaque worker. Les tables SQLite sont créées à
+    l'import, mais les connexions sont fermées avant le fork et rouvertes par
+    chaque worker (init_worker).
+    """
+    if mode == "preload":
+        prepare_runtime()
+    for store in persistent_stores():
+        store.close_db()
+    gc.collect()
+    gc.freeze()
+
+def init_worker(workers, mode):
+    """Après le fork: connexions SQLite propres au worker, quotas Groq répartis entre
+    les workers et, en mode "background", préchauffage propre au worker"""
+    global groq_gateway
+    for store in persistent_stores():
+        store.open_db()
+    groq_gateway = GroqGateway(
+        groq_client, summary_cache,
+        max_concurrency=max(1, GROQ_MAX_CONCURRENCY // workers),
+        requests_per_minute=GROQ_REQUESTS_PER_MINUTE / workers,
+        split_sections=groq_sections, section_weight=keyword_density,
+    )
+    if mode == "background":
+        start_warm_up(mode)
+    start_cache_refresher()
+
+def run_server(argv):
+    """python main.py serve [--workers N] [--threads N] [--warm-up MODE]: gunicorn, application chargée avant le fork"""
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Serveur de production (workers préforkés)")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_PROCESSES, help="processus servant les requêtes")
+    parser.add_argument("--threads", type=int, default=SERVER_THREADS, help="requêtes simultanées par processus")
+    parser.add_argument("--warm-up", choices=WARM_UP_MODES, default=WARM_UP_MODE,
+                        help="préchauffage: avant le fork (preload), dans chaque worker après le démarrage (background) ou aucun")
+    args = parser.parse_args(argv)
+    
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("❌ gunicorn n'est pas installé (pip install gunicorn)")
+        return 1
+    
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("threads", args.threads)
+            self.cfg.set("timeout", SERVER_TIMEOUT)
+            self.cfg.set("preload_app", True)
+            self.cfg.set("post_fork", lambda server, worker: init_worker(args.workers, args.warm_up))
+
+        def load(self):
+            # Appelé une seule fois, dans le maître (preload_app): avant le fork des workers
+            warm_up(args.warm_up)
+            return app
+    
+    print(f"🚀 Serveur de production: http://{args.host}:{args.port} "
+          f"({args.workers} workers × {args.threads} threads)")
+    Server().run()
+    return 0
+
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["batch"]:
+        sys.exit(run_batch_cli(sys.argv[2:]))
+    if sys.argv[1:2] == ["serve"]:
+        sys.exit(run_server(sys.argv[2:]))
+    
     print("="*70)
     print("🚀 TRUST ADVISOR - Analyseur de Politiques de Confidentialité")
     print("="*70)
     print(f"📊 Mode: {'🤖 IA activée (Groq)' if groq_client else '🔍 Analyse par mots-clés uniquement'}")
     print(f"🌐 Serveur: http://127.0.0.1:5000")
-    print(f"💾 Cache: {CACHE_DURATION.total_seconds()/3600}h")
-    print(f"🧵 Threading: Activé (3 workers)")
+    print(f"💾 Cache: {CACHE_DURATION.total_seconds()/3600}h ({CACHE_DB_PATH})")
+    print(f"🧵 Threading: Activé ({ANALYSIS_WORKERS} workers partagés)")
+    print(f"🏭 Production: python main.py serve --workers {SERVER_PROCESSES}")
     print("="*70)
+    # Avec le rechargement automatique, seul le processus enfant sert les requêtes
+    if os.environ.get("WERKZEUG_RUN_MAIN"):
+        start_warm_up(WARM_UP_MODE)
+        start_cache_refresher()
     app.run(host="127.0.0.1", port=5000, debug=True)
\ No newline at end of file
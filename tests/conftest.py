@@ -0,0 +1,10 @@
+"""Tests hors ligne: le projet et benchmarks/ (implémentations de référence, pages enregistrées) sont importables
+
+Usage: python -m pytest tests
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
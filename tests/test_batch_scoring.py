@@ -0,0 +1,18 @@
+"""Parité du scoring vectoriel des lots (score_documents) avec le calcul document par document"""
+import pytest
+
+import main
+from bench_batch_scoring import load_fixture_texts, random_texts
+
+pytest.importorskip("numpy")
+
+def scalar_scores(text):
+    keyword_analysis, risk_score = main.analyze_keywords_advanced(text)
+    privacy_score = main.calculate_privacy_score(risk_score, *main.privacy_practices(text))
+    return keyword_analysis, risk_score, privacy_score, main.get_risk_level(privacy_score)
+
+def test_parity():
+    texts = load_fixture_texts() + list(random_texts(5000))
+    for text, actual in zip(texts, main.score_documents(texts), strict=True):
+        # repr(): 0 et 0.0 ou 12.600000000000001 et 12.6 doivent aussi être identiques
+        assert repr(actual) == repr(scalar_scores(text)), text[:200]
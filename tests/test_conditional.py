@@ -0,0 +1,104 @@
+"""Requêtes /analyze conditionnelles (ETag, If-None-Match) et /analyze/cached, hors ligne
+
+Les pages sont servies en local (bench_conditional.CountingServer) et
+résumées par le faux client Groq de bench_stages.
+"""
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from bench_conditional import CountingServer
+from bench_stages import install_offline_services, memory_cache
+
+# Services du module remplacés pendant un test, puis remis en place
+OFFLINE_SERVICES = [
+    "groq_client", "groq_gateway", "analysis_cache", "document_cache", "block_cache",
+    "document_versions", "redirect_cache", "near_duplicates", "admission", "cache_refresher",
+]
+
+@pytest.fixture
+def offline(monkeypatch):
+    for name in OFFLINE_SERVICES:
+        monkeypatch.setattr(main, name, getattr(main, name))
+    install_offline_services(0.0)
+    recorded = []
+    main.cache_refresher = main.CacheRefresher(None)
+    main.cache_refresher.record = lambda key, url: recorded.append(url)
+    pages = CountingServer()
+    urls = [pages.url(number) for number in range(3)]
+    yield SimpleNamespace(client=main.app.test_client(), pages=pages, recorded=recorded, urls=urls, body={"urls": urls})
+    pages.close()
+
+def count_calls(monkeypatch, name):
+    """Remplace main.<name> par une version qui compte ses appels"""
+    calls = []
+    original = getattr(main, name)
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(main, name, counted)
+    return calls
+
+def test_etag_per_format_and_urls(offline):
+    response = offline.client.post("/analyze", json=offline.body)
+    etag = response.headers.get("ETag")
+    assert response.status_code == 200 and etag
+    assert offline.client.post("/analyze", json=offline.body).headers.get("ETag") == etag
+    structured = offline.client.post("/analyze", json={**offline.body, "format": "structured"}).headers.get("ETag")
+    other = offline.client.post("/analyze", json={"urls": offline.urls[:2]}).headers.get("ETag")
+    assert len({etag, structured, other}) == 3
+
+def test_repeat_request_not_modified(offline, monkeypatch):
+    etag = offline.client.post("/analyze", json=offline.body).headers["ETag"]
+    renders = count_calls(monkeypatch, "render_final_summary")
+    analyses = count_calls(monkeypatch, "analyze_single_url")
+    fetched = offline.pages.requests
+    offline.recorded.clear()
+
+    response = offline.client.post("/analyze", json=offline.body, headers={"If-None-Match": etag})
+    assert response.status_code == 304 and not response.data and response.headers.get("ETag") == etag
+    # Ni analyse, ni téléchargement, ni assemblage du résumé
+    assert not renders and not analyses and offline.pages.requests == fetched
+    # Toujours compté pour le rafraîchissement des pages populaires
+    assert offline.recorded == offline.urls
+
+    response = offline.client.post("/analyze", json=offline.body, headers={"If-None-Match": '"autre"'})
+    assert response.status_code == 200
+
+def test_reanalyzed_result_changes_etag(offline):
+    etag = offline.client.post("/analyze", json=offline.body).headers["ETag"]
+    # Résultat ré-analysé (rafraîchissement): nouvelle version
+    cache_key = main.get_cache_key(offline.urls[1])
+    time.sleep(0.01)
+    main.analysis_cache.set(cache_key, main.analysis_cache.get(cache_key)[0])
+    response = offline.client.post("/analyze", json=offline.body, headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers.get("ETag") not in (None, etag)
+
+def test_analyze_cached(offline, monkeypatch):
+    offline.client.post("/analyze", json=offline.body)
+    analyses = count_calls(monkeypatch, "analyze_single_url")
+    fetched = offline.pages.requests
+    missing = offline.pages.url(50)
+    lookup = {"urls": offline.urls[:2] + [missing], "format": "structured"}
+
+    response = offline.client.post("/analyze/cached", json=lookup)
+    data = response.get_json()
+    assert [document["url"] for document in data["documents"]] == offline.urls[:2]
+    assert data["uncached"] == [missing]
+    assert offline.pages.requests == fetched and not analyses
+
+    headers = {"If-None-Match": response.headers["ETag"]}
+    assert offline.client.post("/analyze/cached", json=lookup, headers=headers).status_code == 304
+
+def test_stale_result_never_confirmed(offline):
+    main.analysis_cache = memory_cache(timedelta(seconds=0.2))
+    main.analysis_cache.stale_ttl = 60
+    stale_etag = offline.client.post("/analyze", json=offline.body).headers.get("ETag")
+    time.sleep(0.3)
+    response = offline.client.post("/analyze", json=offline.body, headers={"If-None-Match": stale_etag})
+    assert response.status_code == 200 and response.headers.get("ETag") is None
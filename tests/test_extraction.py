@@ -0,0 +1,110 @@
+"""Extraction des données structurées et classement des phrases critiques (bench_extraction)
+
+Parité avec les anciennes regex (.*? paresseux, re.findall) appliquées phrase
+par phrase et avec l'ancien classement des phrases (re.split, re.search
+IGNORECASE, tri stable), sur les pages de référence et des textes aléatoires;
+temps linéaire sur les textes adverses.
+"""
+import os
+import random
+import re
+
+import pytest
+
+import main
+from bench_extraction import ADVERSARIAL_INPUTS, legacy_extract, timed
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+# Anciens patterns de phrases critiques (pattern, poids), avec re.IGNORECASE
+LEGACY_SENTENCE_PATTERNS = [
+    (r"we\s+(?:may\s+)?sell", 3.0),
+    (r"share.*?with.*?third part", 2.5),
+    (r"you.*?right to", 2.0),
+    (r"we\s+(?:collect|gather|obtain)", 1.8),
+    (r"(?:retain|store|keep).*?(?:for|until)", 1.5),
+    (r"(?:encrypt|security|protect)", 1.3),
+]
+
+# Les anciennes regex sont celles du pack anglais
+ENGLISH = main.RULE_PACKS["en"]
+
+# Croissance tolérée du temps quand la taille est multipliée par `factor`:
+# au plus 2 * factor (linéaire, au bruit de mesure près)
+GROWTH_TOLERANCE = 2
+ADVERSARIAL_MAX_SIZE = 64000
+
+def legacy_critical_sentences(text, limit=5):
+    """Ancien classement: toutes les phrases notées puis triées (référence de parité)"""
+    sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
+    scored_sentences = []
+    for sentence in sentences:
+        if len(sentence) < 40 or len(sentence) > 400:
+            continue
+        score = 0
+        for pattern, weight in LEGACY_SENTENCE_PATTERNS:
+            if re.search(pattern, sentence, re.IGNORECASE):
+                score += weight
+        if score > 0:
+            scored_sentences.append((sentence, score))
+    scored_sentences.sort(key=lambda x: x[1], reverse=True)
+    return [s[0] for s in scored_sentences[:limit]]
+
+def load_fixture_texts():
+    texts = []
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+            texts.append(main.extract_page_text(f.read()))
+    return texts
+
+def random_texts(count, seed=13):
+    """Textes aléatoires faits de déclencheurs, cibles et terminaisons"""
+    rng = random.Random(seed)
+    fragments = [
+        "retain", "Store", "keep", "for", "during", "3", "12", "days", "Months", "years",
+        "collect", "GATHER", "obtain", "email", "name", "address", "ip address", "phone", "location", "payment",
+        "share", "disclose", "transfer", "with", "to", "To", "partners", "our vendors", "third parties",
+        ",", ".", "!", "?", ";", "(", ")", "-", "  ", "\t", "\n", "tomorrow", "customers", "x",
+    ]
+    for _ in range(count):
+        parts = [rng.choice(fragments) for _ in range(rng.randint(3, 60))]
+        yield "".join(part + rng.choice(["", " ", "  ", "\n"]) for part in parts)
+
+def random_sentence_texts(count, seed=29):
+    """Textes aléatoires de phrases critiques: scores égaux fréquents, casse et
+    caractères que re.IGNORECASE replie (\u017f, \u212a), longueurs autour de 40 et 400"""
+    rng = random.Random(seed)
+    fragments = [
+        "we may sell", "WE SELL", "we  sell", "share your data with our third parties", "Share", "with",
+        "third part", "you have the right to", "You", "right to", "we collect", "We Gather", "we obtain",
+        "retain", "store", "\u212aeep", "for", "until", "encrypt", "\u017fecurity", "protect", "data",
+        "personal information", "the service", "partners", "and", "x" * 30, "y" * 150, "\u00c9t\u00e9",
+    ]
+    for _ in range(count):
+        sentences = []
+        for _ in range(rng.randint(1, 15)):
+            words = [rng.choice(fragments) for _ in range(rng.randint(1, 12))]
+            sentences.append(" ".join(words) + rng.choice([".", "!", "?", "...", ".\n", "! "]))
+        yield rng.choice(["", " ", "\n"]).join(sentences)
+
+def test_structured_data_parity():
+    for text in load_fixture_texts() + list(random_texts(5000)):
+        assert main.extract_structured_data(text, pack=ENGLISH) == legacy_extract(text), text[:200]
+
+def test_critical_sentences_parity():
+    rng = random.Random(7)
+    for text in load_fixture_texts() + list(random_sentence_texts(5000)):
+        limit = rng.randint(1, 8)
+        assert main.extract_critical_sentences(text, limit, pack=ENGLISH) == legacy_critical_sentences(text, limit), text[:200]
+
+@pytest.mark.parametrize("label", list(ADVERSARIAL_INPUTS))
+def test_adversarial_linear_time(label):
+    build = ADVERSARIAL_INPUTS[label]
+    small = build(ADVERSARIAL_MAX_SIZE // 8)
+    small_ms = timed(main.extract_structured_data, small)
+    for size in (ADVERSARIAL_MAX_SIZE // 4, ADVERSARIAL_MAX_SIZE // 2, ADVERSARIAL_MAX_SIZE):
+        text = build(size)
+        factor = len(text) / len(small)
+        elapsed = timed(main.extract_structured_data, text)
+        assert elapsed <= max(small_ms, 0.5) * factor * GROWTH_TOLERANCE, \
+            f"{small_ms:.1f} ms -> {elapsed:.1f} ms pour x{factor:.0f} caractères"
@@ -0,0 +1,65 @@
+"""Parité de l'extracteur HTML événementiel avec l'ancienne extraction BeautifulSoup (bench_html)"""
+import random
+
+import pytest
+
+pytest.importorskip("bs4")
+
+from bench_html import load_fixture, reference_extract, streaming_extract
+
+EDGE_CASES = [
+    "<p>Hello <b>world</b>!</p>",
+    "<p>a<br>b</br>c<br/>d</p>",
+    "<div><nav>menu <p>item</nav> after</div>",
+    "<nav>never closed <p>still hidden",
+    "<p>stray</nav> end tag</p>",
+    "<p>&amp; &lt;tag&gt; &eacute;t&eacute; &foo; &amp &copy2025</p>",
+    "<p>&#233;&#x41;&#X42;&#150;&#0;&#1114112;&#xD800;&#12ab &#x1g</p>",
+    "<p>a<!-- comment -->b<![CDATA[ cdata ]]>c<?pi x?>d<!DOCTYPE html>e</p>",
+    "<template><p>hidden</p></template><ruby>漢<rt>kan</rt><rp>(</rp></ruby>",
+    "<p>\xa0non breaking spaces　</p>",
+    "<script>var a = '<p>not text</p>';</script><style>p{}</style>text",
+    "<title>Title</title><header>head</header><main>body<aside>side</aside></main><footer>foot</footer>",
+    "<p>unclosed <div>nested <span>deep",
+    "a < b and c > d & e",
+    "<img src=x>alt</img>after<input>in</input>",
+]
+
+def random_html(rng):
+    tags = ["p", "div", "span", "b", "nav", "footer", "script", "style", "template", "rt", "br", "img", "aside"]
+    pieces = []
+    for _ in range(rng.randint(1, 60)):
+        kind = rng.random()
+        tag = rng.choice(tags)
+        if kind < 0.2:
+            pieces.append(f"<{tag}>")
+        elif kind < 0.35:
+            pieces.append(f"</{tag}>")
+        elif kind < 0.4:
+            pieces.append(f"<{tag}/>")
+        elif kind < 0.5:
+            pieces.append(rng.choice([
+                "&amp;", "&foo;", "&#233;", "&#x41;", "&#150;", "&#0;", "&copy", "&#12ab", "<!--c-->",
+                "<![CDATA[x y]]>", "<!DOCTYPE html>", "<?pi?>", " < ", " & ", "\xa0", "\n\t",
+            ]))
+        else:
+            words = rng.choice(["policy", "data", "we share", "cookies", "  ", "third parties", "é"])
+            pieces.append(words + rng.choice(["", " ", "\n"]))
+    return "".join(pieces)
+
+# Sans limite de longueur: tout le texte est comparé
+NO_LIMIT = 10 ** 9
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 7, 64])
+@pytest.mark.parametrize("html", [load_fixture()] + EDGE_CASES,
+                         ids=["privacy_policy"] + [f"cas_{number}" for number in range(len(EDGE_CASES))])
+def test_parity(html, chunk_size):
+    assert streaming_extract(html, NO_LIMIT, chunk_size) == reference_extract(html, NO_LIMIT)
+
+def test_random_html_parity():
+    # html.parser lui-même ne découpe pas toujours pareil le balisage invalide
+    # selon les morceaux reçus: la lecture par morceaux est vérifiée sur du HTML réel
+    rng = random.Random(7)
+    for _ in range(3000):
+        html = random_html(rng)
+        assert streaming_extract(html, NO_LIMIT) == reference_extract(html, NO_LIMIT), html[:200]
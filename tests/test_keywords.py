@@ -0,0 +1,31 @@
+"""Parité du moteur de mots-clés en une passe avec l'ancienne implémentation (bench_keywords)"""
+import random
+
+import pytest
+
+import main
+from bench_keywords import ENGLISH, legacy_analyze_keywords, load_policy_text
+
+def random_texts(count, seed=42):
+    """Textes aléatoires construits à partir de fragments de mots-clés et de contextes"""
+    rng = random.Random(seed)
+    fragments = list(ENGLISH.matcher.keywords) + [
+        "we", "we may", "your", "is", "are", "collected", "used", "shared", "data",
+        "ion", "s", "  ", "\n", ",", ".", "we  share", "your\t", "is  shared", "x",
+    ]
+    for _ in range(count):
+        parts = [rng.choice(fragments) for _ in range(rng.randint(5, 80))]
+        yield "".join(p + rng.choice(["", " ", "  ", "\n"]) for p in parts)
+
+# Le texte est aussi parcouru en petits morceaux pour vérifier les raccords
+CHUNK_LENGTHS = (main.ANALYSIS_CHUNK_LENGTH, 1000, 333)
+
+@pytest.mark.parametrize("chunk_length", CHUNK_LENGTHS)
+def test_policy_parity(chunk_length):
+    text = load_policy_text()
+    assert main.analyze_keywords_advanced(text, chunk_length, ENGLISH) == legacy_analyze_keywords(text)
+
+@pytest.mark.parametrize("chunk_length", CHUNK_LENGTHS)
+def test_random_parity(chunk_length):
+    for text in random_texts(2000):
+        assert main.analyze_keywords_advanced(text, chunk_length, ENGLISH) == legacy_analyze_keywords(text), text[:200]